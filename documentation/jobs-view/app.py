@@ -1,20 +1,52 @@
-from flask import Flask, jsonify, render_template, abort
+from collections import OrderedDict
+from flask import Flask, jsonify, render_template, abort, make_response, request, url_for
 import networkx as nx
+import gzip
+import hashlib
 import os
+import threading
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 
 app = Flask(__name__)
 
+# One directory per app, each holding a jobs.txt
+DATA_DIR = 'data'
+# Bytes read at a time when rehashing the parsed part of a grown file
+HASH_BLOCK = 1 << 20
+# Jobs in a slice of a graph by default, and at most
+SLICE_LIMIT = 500
+MAX_SLICE_LIMIT = 5000
+# Serialized responses kept per graph, the least recently requested dropped first
+RESPONSE_CACHE = 64
+# Responses smaller than this are sent uncompressed
+MIN_COMPRESS = 1024
+# Spacing between jobs in a row, as in tree_viz.js
+NODE_WIDTH = 220
+
+# Content encodings offered, in order of preference
+COMPRESSORS = OrderedDict()
+if brotli is not None:
+    COMPRESSORS['br'] = lambda body: brotli.compress(body, quality=9)
+COMPRESSORS['gzip'] = lambda body: gzip.compress(body, compresslevel=9)
+
+def add_edges(G, lines):
+    """Adds the edges of 'A --> B' lines to G."""
+    for line in lines:
+        if '-->' in line:
+            parent, child = line.split('-->')
+            G.add_edge(parent.strip(), child.strip())
+
 def parse_data(file_path):
     """Parses 'A --> B' format from a file into a NetworkX DiGraph."""
     G = nx.DiGraph()
     if not os.path.exists(file_path):
         return None
     with open(file_path, 'r') as f:
-        lines = f.readlines()
-    for line in lines:
-        if '-->' in line:
-            parent, child = line.split('-->')
-            G.add_edge(parent.strip(), child.strip())
+        add_edges(G, f)
     return G
 
 def build_hierarchy(G, node):
@@ -25,37 +57,597 @@ def build_hierarchy(G, node):
     else:
         return {"name": node}
 
+def cycle_error(G):
+    """The error response for a graph with a cycle, naming the jobs on one."""
+    cycle = [parent for parent, child in nx.find_cycle(G)]
+    return {"error": "Dependency cycle", "cycle": cycle + cycle[:1]}, 409
+
+def tree_data(G):
+    """
+    Builds the nested tree of the original API, from the graph's root nodes.
+    A job with several parents is repeated under each of them, with its whole
+    subtree, so this grows exponentially on diamond-heavy schedules.
+    """
+    if not nx.is_directed_acyclic_graph(G):
+        return cycle_error(G)
+
+    # Find root nodes (nodes with in-degree 0)
+    roots = [n for n, d in G.in_degree() if d == 0]
+
+    if not roots:
+        return {"name": "No Data", "children": []}, 200
+
+    # Assuming single root for simplicity based on example, but handling multiple just in case
+    if len(roots) == 1:
+        return build_hierarchy(G, roots[0]), 200
+    # Create a dummy root if multiple roots exist
+    return {"name": "Root", "children": [build_hierarchy(G, root) for root in roots]}, 200
+
+def graph_data(G):
+    """
+    Lists each job once, in topological order with its depth (the longest
+    path to it from a root) and any attributes (the apps naming it, in the
+    combined graph), and the edges as [parent, child] indexes into that list.
+    Linear in the size of the graph.
+    """
+    nodes = []
+    index = {}
+    try:
+        for depth, generation in enumerate(nx.topological_generations(G)):
+            for node in generation:
+                index[node] = len(nodes)
+                nodes.append({"name": node, "depth": depth, **G.nodes[node]})
+    except nx.NetworkXUnfeasible:
+        return cycle_error(G)
+    edges = [[index[parent], index[child]] for parent, child in G.edges()]
+    return {"nodes": nodes, "edges": edges}, 200
+
+def apps_data(G):
+    """
+    Summarizes each app from the combined graph: its jobs, dependencies and
+    roots (jobs with no parent in that app), and the jobs it shares with
+    each other app.
+    """
+    summary = {name: {"name": name, "jobs": 0, "dependencies": 0, "roots": 0, "shared_with": {}}
+               for name in G.graph.get('apps', [])}
+    for node, apps in G.nodes(data='apps'):
+        for name in apps:
+            entry = summary[name]
+            entry["jobs"] += 1
+            for other in apps:
+                if other != name:
+                    entry["shared_with"][other] = entry["shared_with"].get(other, 0) + 1
+    has_parent = set()
+    for parent, child, apps in G.edges(data='apps'):
+        for name in apps:
+            summary[name]["dependencies"] += 1
+            has_parent.add((name, child))
+    for node, apps in G.nodes(data='apps'):
+        for name in apps:
+            if (name, node) not in has_parent:
+                summary[name]["roots"] += 1
+    return {"apps": list(summary.values())}, 200
+
+def add_layout(data):
+    """
+    Gives each node of graph_data's format the x position tree_viz.js would
+    (from the middle of the page; rows are by depth), so the page can draw
+    them without laying them out first.
+    """
+    nodes = data["nodes"]
+    parents = [[] for node in nodes]
+    for parent, child in data["edges"]:
+        parents[child].append(parent)
+    rows = {}
+    for k, node in enumerate(nodes):
+        rows.setdefault(node["depth"], []).append(k)
+    for depth in sorted(rows):
+        row = rows[depth]
+        # Order each row by where its parents are, to keep links short
+        order = {k: sum(nodes[p]["x"] for p in parents[k]) / len(parents[k]) if parents[k] else 0 for k in row}
+        row.sort(key=order.get)
+        for position, k in enumerate(row):
+            nodes[k]["x"] = (position - (len(row) - 1) / 2) * NODE_WIDTH
+    return data
+
+class ReachabilityIndex:
+    """
+    A graph's jobs numbered in topological order, with the parents and
+    children of each as lists of numbers, so impact queries walk plain lists
+    rather than the NetworkX graph. A job can only reach jobs numbered after
+    it, which bounds the search for paths between two jobs.
+    Raises NetworkXUnfeasible if the graph has a cycle.
+    """
+
+    def __init__(self, G):
+        self.names = list(nx.topological_sort(G))
+        self.rank = {name: i for i, name in enumerate(self.names)}
+        self.attributes = [G.nodes[name] for name in self.names]
+        self.children = [[self.rank[child] for child in G.successors(name)] for name in self.names]
+        self.parents = [[self.rank[parent] for parent in G.predecessors(name)] for name in self.names]
+        self.roots = [i for i, parents in enumerate(self.parents) if not parents]
+        # Longest path to each job from a root, as in graph_data
+        self.depths = [0] * len(self.names)
+        for i, parents in enumerate(self.parents):
+            if parents:
+                self.depths[i] = max(self.depths[parent] for parent in parents) + 1
+
+    def slice(self, root, depth, offset=0, limit=SLICE_LIMIT):
+        """
+        Returns the part of the graph below root, in graph_data's format: a
+        page of limit of root's children from offset (or of the graph's roots
+        if root is None), and their descendants up to depth levels down, as
+        long as the slice stays within limit jobs. Every job has its number
+        of children and is "expanded" if they all are in the slice, with the
+        edges to them; root is once the last page of its children is.
+        """
+        top = self.roots if root is None else self.children[self.rank[root]]
+        page = top[offset:offset + limit]
+        next_offset = offset + limit if offset + limit < len(top) else None
+
+        included = set(page)
+        expanded = set()
+        frontier = page
+        for _ in range(depth - 1):
+            next_frontier = []
+            for i in frontier:
+                new = [j for j in self.children[i] if j not in included]
+                if len(included) + len(new) > limit:
+                    continue
+                included.update(new)
+                next_frontier.extend(new)
+                expanded.add(i)
+            frontier = next_frontier
+
+        edges = [(i, j) for i in expanded for j in self.children[i]]
+        if root is not None:
+            parent = self.rank[root]
+            included.add(parent)
+            edges.extend((parent, j) for j in page)
+            if next_offset is None:
+                expanded.add(parent)
+
+        order = sorted(included)
+        index = {i: k for k, i in enumerate(order)}
+        nodes = [{"name": self.names[i], "depth": self.depths[i], "child_count": len(self.children[i]),
+                  "expanded": i in expanded, **self.attributes[i]} for i in order]
+        return {"nodes": nodes, "edges": [[index[i], index[j]] for i, j in edges], "root": root,
+                "total": len(top), "offset": offset, "next_offset": next_offset}
+
+    def descendants(self, job):
+        """Jobs that depend on job, directly or not, in topological order."""
+        start = self.rank[job]
+        return [self.names[i] for i in sorted(self._reach(start, self.children) - {start})]
+
+    def ancestors(self, job):
+        """Jobs job depends on, directly or not, in topological order."""
+        start = self.rank[job]
+        return [self.names[i] for i in sorted(self._reach(start, self.parents) - {start})]
+
+    def paths(self, source, target):
+        """
+        Returns the shortest path (fewest dependencies) and the critical path
+        (longest chain of jobs) from source to target, or None if target does
+        not depend on source.
+        """
+        start, end = self.rank[source], self.rank[target]
+        if start > end:
+            return None
+        # Jobs on some path from start to end: reachable from start, and reaching end
+        between = self._reach(start, self.children, high=end) & self._reach(end, self.parents, low=start)
+        if end not in between:
+            return None
+
+        # Fewest dependencies: breadth-first from start, through jobs between only
+        previous = {start: None}
+        frontier = [start]
+        while end not in previous:
+            next_frontier = []
+            for i in frontier:
+                for j in self.children[i]:
+                    if j in between and j not in previous:
+                        previous[j] = i
+                        next_frontier.append(j)
+            frontier = next_frontier
+        shortest = self._trace(previous, end)
+
+        # Longest chain: in topological order, each job extends the longest chain to one of its parents
+        length = {start: 0}
+        previous = {start: None}
+        for j in sorted(between):
+            if j != start:
+                parent = max((i for i in self.parents[j] if i in length), key=length.get)
+                length[j] = length[parent] + 1
+                previous[j] = parent
+        return shortest, self._trace(previous, end)
+
+    def _reach(self, start, neighbours, low=0, high=None):
+        """Numbers of the jobs reachable from start (itself included) without leaving [low, high]."""
+        high = len(self.names) - 1 if high is None else high
+        seen = {start}
+        stack = [start]
+        while stack:
+            for j in neighbours[stack.pop()]:
+                if low <= j <= high and j not in seen:
+                    seen.add(j)
+                    stack.append(j)
+        return seen
+
+    def _trace(self, previous, end):
+        path = []
+        while end is not None:
+            path.append(self.names[end])
+            end = previous[end]
+        return path[::-1]
+
+class CachedGraph:
+    """
+    A job graph and what is built from it (responses, the reachability
+    index), kept until the graph changes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.graph = nx.DiGraph()
+        self.changed()
+
+    def changed(self):
+        """Drops what was built from the graph."""
+        # Request path -> its CachedResponse
+        self.responses = OrderedDict()
+        self._reachability = None
+
+    def reachability(self):
+        """Returns the graph's ReachabilityIndex, built once per version of the graph."""
+        with self.lock:
+            if self._reachability is None:
+                self._reachability = ReachabilityIndex(self.graph)
+            return self._reachability
+
+    def response(self, key, build):
+        """
+        Returns the CachedResponse for build(), which returns data and a
+        status, building it once per version of the graph for each key.
+        """
+        with self.lock:
+            responses = self.responses
+            cached = responses.get(key)
+            if cached is not None:
+                responses.move_to_end(key)
+                return cached
+        # Built unlocked: build() may need the reachability index
+        data, status = build()
+        cached = CachedResponse(app.json.response(data).get_data(), status)
+        with self.lock:
+            # Unless the graph changed meanwhile
+            if self.responses is responses:
+                responses[key] = cached
+                while len(responses) > RESPONSE_CACHE:
+                    responses.popitem(last=False)
+        return cached
+
+class CachedResponse:
+    """
+    A serialized JSON response, with a strong ETag from its content, and
+    its compressed encodings, each made when first requested.
+    """
+
+    def __init__(self, body, status):
+        self.body = body
+        self.status = status
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        """Returns the body in the encoding, and the ETag of that representation."""
+        if encoding is None:
+            return self.body, self.etag
+        if encoding not in self._encoded:
+            self._encoded[encoding] = COMPRESSORS[encoding](self.body)
+        return self._encoded[encoding], f"{self.etag}-{encoding}"
+
+class AppGraph(CachedGraph):
+    """
+    An app's parsed jobs.txt, reparsed only once the file's size or mtime
+    changes. Lines appended to the file are parsed on their own; any other
+    change reparses it. A grown file counts as appended to only if it is
+    the same file (inode) and its first bytes still hash to what was parsed.
+    """
+
+    def __init__(self, file_path):
+        super().__init__()
+        self.file_path = file_path
+        # (size, mtime) of the file when last parsed, its inode, the bytes
+        # parsed, a hash of them and whether they ended on a newline
+        self.version = None
+        self.inode = None
+        self.offset = 0
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.ends_line = False
+
+    def refresh(self):
+        """Brings the graph up to date with the file. Returns False if there is no file."""
+        try:
+            stat = os.stat(self.file_path)
+        except OSError:
+            return False
+        version = (stat.st_size, stat.st_mtime_ns)
+        if version == self.version:
+            return True
+
+        # Requests read self.graph without the lock, so it is never modified:
+        # appends go to a copy, which replaces it once complete
+        with open(self.file_path, 'rb') as f:
+            if self._appended(f, stat):
+                graph = self.graph.copy()
+            else:
+                graph = nx.DiGraph()
+                self.offset = 0
+                self.digest = hashlib.blake2b(digest_size=16)
+            f.seek(self.offset)
+            data = f.read()
+        add_edges(graph, data.decode('utf-8', errors='replace').splitlines())
+        if data:
+            self.offset += len(data)
+            self.digest.update(data)
+            self.ends_line = data.endswith(b'\n')
+        self.version = version
+        self.inode = stat.st_ino
+        # The new graph before the new response cache, so nothing built from
+        # the old graph is cached as the new one's
+        self.graph = graph
+        self.changed()
+        return True
+
+    def _appended(self, f, stat):
+        # A line cut short when last parsed may since have been completed, so
+        # only a parse that ended on a newline can be extended
+        if self.version is None or stat.st_ino != self.inode or stat.st_size <= self.offset \
+                or not self.ends_line:
+            return False
+        # Any byte of what was parsed may have been edited, not just the last
+        digest = hashlib.blake2b(digest_size=16)
+        remaining = self.offset
+        while remaining:
+            block = f.read(min(HASH_BLOCK, remaining))
+            if not block:
+                return False
+            digest.update(block)
+            remaining -= len(block)
+        return digest.digest() == self.digest.digest()
+
+class GraphStore:
+    """
+    Every app under data_dir, loaded up front, and the combined graph of all
+    of them, where a job named in several apps' files is one node listing
+    those apps (as are edges). Requests reparse only the jobs.txt files that
+    changed, and the combined graph is rebuilt only after one did.
+    """
+
+    def __init__(self, data_dir):
+        self.data_dir = data_dir
+        self.lock = threading.Lock()
+        self.apps = {}
+        self.combined = CachedGraph()
+        # (app, version) of each app the combined graph was built from
+        self._combined_from = None
+        self.combined_graph()
+
+    def app(self, name):
+        """Returns the up to date AppGraph of an app, or None if it has no jobs.txt."""
+        with self.lock:
+            if name not in self.apps:
+                # A directory may have been added since the last scan
+                self._scan()
+            entry = self.apps.get(name)
+        if entry is None:
+            return None
+        with entry.lock:
+            if entry.refresh():
+                return entry
+        with self.lock:
+            if self.apps.get(name) is entry:
+                del self.apps[name]
+        return None
+
+    def all_apps(self):
+        """Returns (name, AppGraph) of every app, up to date, sorted by name."""
+        with self.lock:
+            self._scan()
+            names = sorted(self.apps)
+        apps = []
+        for name in names:
+            entry = self.app(name)
+            if entry is not None:
+                apps.append((name, entry))
+        return apps
+
+    def combined_graph(self):
+        """Returns the combined graph of all apps, rebuilt if any of them changed."""
+        apps = self.all_apps()
+        built_from = [(name, entry.version) for name, entry in apps]
+        with self.combined.lock:
+            if built_from != self._combined_from:
+                G = nx.DiGraph(apps=[name for name, entry in apps])
+                for name, entry in apps:
+                    with entry.lock:
+                        for node in entry.graph:
+                            G.add_node(node)
+                            G.nodes[node].setdefault('apps', []).append(name)
+                        for parent, child in entry.graph.edges():
+                            G.add_edge(parent, child)
+                            G.edges[parent, child].setdefault('apps', []).append(name)
+                self.combined.graph = G
+                self.combined.changed()
+                self._combined_from = built_from
+        return self.combined
+
+    def _scan(self):
+        try:
+            entries = list(os.scandir(self.data_dir))
+        except OSError:
+            entries = []
+        names = {entry.name for entry in entries
+                 if entry.is_dir() and os.path.isfile(os.path.join(entry.path, 'jobs.txt'))}
+        for name in list(self.apps):
+            if name not in names:
+                del self.apps[name]
+        for name in names:
+            if name not in self.apps:
+                self.apps[name] = AppGraph(os.path.join(self.data_dir, name, 'jobs.txt'))
+
+store = GraphStore(DATA_DIR)
+
 @app.route('/')
 def index_redirect():
     # Redirect to default app or show a landing page
-    return render_template('index.html', app_name='default')
+    return index('default')
+
+@app.route('/combined')
+def combined_index():
+    # Jobs of every app in one view (shadows an app named "combined")
+    return render_template('index.html', app_name='combined', graph_url=url_for('get_combined_graph'))
 
 @app.route('/<app_name>')
 def index(app_name):
-    return render_template('index.html', app_name=app_name)
+    return render_template('index.html', app_name=app_name, graph_url=url_for('get_graph', app_name=app_name))
+
+def send(graph, build):
+    """
+    Sends the response build() makes for this request's path and arguments,
+    cached with the graph. The client gets 304 Not Modified if it already
+    has it, and otherwise the smallest encoding it accepts.
+    """
+    cached = graph.response(request.full_path, build)
+    encoding = request.accept_encodings.best_match(COMPRESSORS) if len(cached.body) >= MIN_COMPRESS else None
+    body, etag = cached.encoded(encoding)
+
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(body, status=cached.status, mimetype='application/json')
+        if encoding is not None:
+            response.headers['Content-Encoding'] = encoding
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    # Pollers revalidate each time, and mostly get a 304
+    response.cache_control.no_cache = True
+    return response
+
+def serve(graph, build):
+    """Sends build(graph), with node positions added when ?layout=1."""
+    if graph is None:
+        return jsonify({"error": "Application not found"}), 404
+
+    def build_response():
+        # One read of graph.graph: a refresh may replace it meanwhile
+        data, status = build(graph.graph)
+        return (add_layout(data) if status == 200 and layout_requested() else data), status
+    return send(graph, build_response)
+
+def layout_requested():
+    return request.args.get('layout') in ('1', 'true')
+
+@app.route('/api/apps')
+def get_apps():
+    return serve(store.combined_graph(), apps_data)
+
+@app.route('/api/graph')
+def get_combined_graph():
+    if 'root' in request.args or 'depth' in request.args:
+        return impact(store.combined_graph(), graph_slice)
+    return serve(store.combined_graph(), graph_data)
 
 @app.route('/api/data/<app_name>')
 def get_data(app_name):
-    file_path = os.path.join('data', app_name, 'jobs.txt')
-    G = parse_data(file_path)
-    
-    if G is None:
+    return serve(store.app(app_name), tree_data)
+
+@app.route('/api/graph/<app_name>')
+def get_graph(app_name):
+    if 'root' in request.args or 'depth' in request.args:
+        return impact(store.app(app_name), graph_slice)
+    return serve(store.app(app_name), graph_data)
+
+def impact(graph, query):
+    """
+    Sends query(index), which returns data and a status, answered from the
+    graph's reachability index for the request's arguments.
+    """
+    if graph is None:
         return jsonify({"error": "Application not found"}), 404
 
-    # Find root nodes (nodes with in-degree 0)
-    roots = [n for n, d in G.in_degree() if d == 0]
-    
-    if not roots:
-        return jsonify({"name": "No Data", "children": []})
+    def build_response():
+        try:
+            index = graph.reachability()
+        except nx.NetworkXUnfeasible:
+            return cycle_error(graph.graph)
+        return query(index)
+    return send(graph, build_response)
 
-    # Assuming single root for simplicity based on example, but handling multiple just in case
-    if len(roots) == 1:
-        tree_data = build_hierarchy(G, roots[0])
-    else:
-        # Create a dummy root if multiple roots exist
-        tree_data = {"name": "Root", "children": [build_hierarchy(G, root) for root in roots]}
-        
-    return jsonify(tree_data)
+def job_argument(index, name):
+    job = request.args.get(name)
+    if job is None:
+        abort(make_response(jsonify({"error": f"Missing '{name}' argument"}), 400))
+    if job not in index.rank:
+        abort(make_response(jsonify({"error": "Job not found", "job": job}), 404))
+    return job
+
+def int_argument(name, default, low, high=None):
+    try:
+        value = int(request.args.get(name, default))
+    except ValueError:
+        value = None
+    if value is None or value < low or high is not None and value > high:
+        bounds = f"from {low} to {high}" if high is not None else f"of at least {low}"
+        abort(make_response(jsonify({"error": f"'{name}' must be a whole number {bounds}"}), 400))
+    return value
+
+def graph_slice(index):
+    """A slice of the graph below ?root= (default: its roots), ?depth= levels deep (default 1)."""
+    root = job_argument(index, 'root') if 'root' in request.args else None
+    depth = int_argument('depth', 1, 1)
+    offset = int_argument('offset', 0, 0)
+    limit = int_argument('limit', SLICE_LIMIT, 1, MAX_SLICE_LIMIT)
+    data = index.slice(root, depth, offset, limit)
+    return (add_layout(data) if layout_requested() else data), 200
+
+def related_jobs(index, relation):
+    job = job_argument(index, 'job')
+    jobs = getattr(index, relation)(job)
+    return {"job": job, relation: jobs, "count": len(jobs)}, 200
+
+def job_paths(index):
+    source, target = job_argument(index, 'from'), job_argument(index, 'to')
+    paths = index.paths(source, target)
+    if paths is None:
+        return {"error": "No path", "from": source, "to": target}, 404
+    shortest, critical = paths
+    return {"from": source, "to": target, "shortest": shortest, "critical": critical}, 200
+
+@app.route('/api/graph/<app_name>/ancestors')
+def get_ancestors(app_name):
+    return impact(store.app(app_name), lambda index: related_jobs(index, 'ancestors'))
+
+@app.route('/api/graph/<app_name>/descendants')
+def get_descendants(app_name):
+    return impact(store.app(app_name), lambda index: related_jobs(index, 'descendants'))
+
+@app.route('/api/graph/<app_name>/path')
+def get_path(app_name):
+    return impact(store.app(app_name), job_paths)
+
+@app.route('/api/combined/ancestors')
+def get_combined_ancestors():
+    return impact(store.combined_graph(), lambda index: related_jobs(index, 'ancestors'))
+
+@app.route('/api/combined/descendants')
+def get_combined_descendants():
+    return impact(store.combined_graph(), lambda index: related_jobs(index, 'descendants'))
+
+@app.route('/api/combined/path')
+def get_combined_path():
+    return impact(store.combined_graph(), job_paths)
 
 if __name__ == '__main__':
+    # Development server only; wsgi.py is the production entry point
     app.run(host='0.0.0.0', debug=True)
@@ -0,0 +1,400 @@
+import unittest
+from unittest.mock import patch
+import gzip
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+# Add this directory to path to import the app
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import app as jobs_view
+
+class JobsViewTestCase(unittest.TestCase):
+    """Serves a temporary data directory instead of data/."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+        self.write_app('default', 'JobA --> JobB\nJobA --> JobC\nJobB --> JobD\nJobC --> JobD\nJobD --> JobE\n')
+        self.store = jobs_view.GraphStore(self.data_dir)
+        patcher = patch.object(jobs_view, 'store', self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = jobs_view.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_app(self, name, text, mode='w'):
+        os.makedirs(os.path.join(self.data_dir, name), exist_ok=True)
+        with open(os.path.join(self.data_dir, name, 'jobs.txt'), mode) as f:
+            f.write(text)
+
+class TestAppGraph(JobsViewTestCase):
+    """Lines appended to jobs.txt are parsed on their own; any other change reparses it."""
+
+    def setUp(self):
+        super().setUp()
+        self.path = os.path.join(self.data_dir, 'default', 'jobs.txt')
+        self.graph = jobs_view.AppGraph(self.path)
+        self.graph.refresh()
+
+    def edges(self):
+        return sorted(self.graph.graph.edges())
+
+    def refresh(self):
+        """Refreshes the graph, returning the lines it parsed."""
+        with patch.object(jobs_view, 'add_edges', wraps=jobs_view.add_edges) as add_edges:
+            self.graph.refresh()
+        return [line for call in add_edges.call_args_list for line in call.args[1]]
+
+    def test_append(self):
+        before = self.graph.graph
+        self.write_app('default', 'JobE --> JobF\n', mode='a')
+        self.assertEqual(self.refresh(), ['JobE --> JobF'])
+        self.assertIn(('JobE', 'JobF'), self.edges())
+        self.assertEqual(len(self.edges()), 6)
+        # Readers of the old graph never see it change
+        self.assertEqual(len(before.edges()), 5)
+        self.assertEqual(self.refresh(), [])
+
+    def test_edit_then_append(self):
+        # Lines enough that the edit is far from the end
+        self.write_app('default', ''.join(f'Pad{i} --> Pad{i + 1}\n' for i in range(1000)), mode='a')
+        self.graph.refresh()
+        # The same file edited in the middle, then grown: the prefix no longer matches what was parsed
+        with open(self.path, 'r+b') as f:
+            f.seek(len('JobA --> JobB\n'))
+            f.write(b'JobA --> JobX')
+        self.write_app('default', 'JobE --> JobF\n', mode='a')
+        self.assertEqual(len(self.refresh()), 1006)
+        self.assertNotIn(('JobA', 'JobC'), self.edges())
+        self.assertIn(('JobA', 'JobX'), self.edges())
+
+    def test_replaced(self):
+        # A new file renamed over the old one is reparsed, whatever it starts with
+        with open(self.path) as f:
+            text = f.read()
+        replacement = self.path + '.new'
+        with open(replacement, 'w') as f:
+            f.write(text + 'JobE --> JobF\n')
+        os.replace(replacement, self.path)
+        self.assertEqual(len(self.refresh()), 6)
+
+    def test_partial_line(self):
+        self.write_app('default', 'JobE --> Jo', mode='a')
+        self.refresh()
+        self.assertIn(('JobE', 'Jo'), self.edges())
+        # The cut line is completed, so the file is parsed again
+        self.write_app('default', 'bF\n', mode='a')
+        self.assertEqual(len(self.refresh()), 6)
+        self.assertNotIn(('JobE', 'Jo'), self.edges())
+        self.assertIn(('JobE', 'JobF'), self.edges())
+
+    def test_removed(self):
+        os.remove(self.path)
+        self.assertFalse(self.graph.refresh())
+
+class TestGraphData(unittest.TestCase):
+    """Graphs are served as lists of jobs and edges, each shared job listed once."""
+
+    def diamonds(self, levels):
+        G = jobs_view.nx.DiGraph()
+        for i in range(levels):
+            G.add_edges_from([(f'Top{i}', f'Left{i}'), (f'Top{i}', f'Right{i}'),
+                              (f'Left{i}', f'Top{i + 1}'), (f'Right{i}', f'Top{i + 1}')])
+        return G
+
+    def test_shared_jobs_once(self):
+        # As a tree, 30 stacked diamonds would repeat the last job 2**30 times
+        data, status = jobs_view.graph_data(self.diamonds(30))
+        self.assertEqual(status, 200)
+        self.assertEqual(len(data['nodes']), 91)
+        self.assertEqual(len(data['edges']), 120)
+        depths = {node['name']: node['depth'] for node in data['nodes']}
+        self.assertEqual((depths['Top0'], depths['Left0'], depths['Top1'], depths['Top30']), (0, 1, 2, 60))
+        # Parents come before their children
+        self.assertTrue(all(parent < child for parent, child in data['edges']))
+
+    def test_longest_path_depth(self):
+        G = jobs_view.nx.DiGraph([('A', 'B'), ('B', 'C'), ('A', 'C')])
+        data, status = jobs_view.graph_data(G)
+        self.assertEqual([(node['name'], node['depth']) for node in data['nodes']], [('A', 0), ('B', 1), ('C', 2)])
+
+    def test_cycle(self):
+        data, status = jobs_view.graph_data(jobs_view.nx.DiGraph([('A', 'B'), ('B', 'A')]))
+        self.assertEqual(status, 409)
+        self.assertEqual(data['cycle'][0], data['cycle'][-1])
+
+    def test_layout(self):
+        data = {'nodes': [{'name': 'R1', 'depth': 0}, {'name': 'R2', 'depth': 0},
+                          {'name': 'C1', 'depth': 1}, {'name': 'C2', 'depth': 1}, {'name': 'D', 'depth': 2}],
+                'edges': [[1, 2], [0, 3], [2, 4], [3, 4]]}
+        jobs_view.add_layout(data)
+        x = {node['name']: node['x'] for node in data['nodes']}
+        width = jobs_view.NODE_WIDTH
+        # Rows are centred; a row is ordered by where its parents are, so C2 (under R1) comes first
+        self.assertEqual(x, {'R1': -width / 2, 'R2': width / 2, 'C2': -width / 2, 'C1': width / 2, 'D': 0})
+
+class TestGraphStore(JobsViewTestCase):
+    """Every app's graph, and the combined one, kept up to date with the data directory."""
+
+    def test_apps_come_and_go(self):
+        self.assertEqual([name for name, entry in self.store.all_apps()], ['default'])
+        self.write_app('other', 'JobD --> JobF\n')
+        # A new directory is found when asked for by name, as well as on a full scan
+        self.assertIsNotNone(self.store.app('other'))
+        shutil.rmtree(os.path.join(self.data_dir, 'other'))
+        self.assertIsNone(self.store.app('other'))
+        self.assertEqual([name for name, entry in self.store.all_apps()], ['default'])
+        # A directory without jobs.txt is not an app
+        os.makedirs(os.path.join(self.data_dir, 'empty'))
+        self.assertIsNone(self.store.app('empty'))
+
+    def test_combined(self):
+        self.write_app('other', 'JobD --> JobF\nJobB --> JobD\n')
+        G = self.store.combined_graph().graph
+        self.assertEqual(G.graph['apps'], ['default', 'other'])
+        self.assertEqual(G.nodes['JobD']['apps'], ['default', 'other'])
+        self.assertEqual(G.edges['JobB', 'JobD']['apps'], ['default', 'other'])
+        self.assertEqual(G.edges['JobD', 'JobF']['apps'], ['other'])
+
+        # Rebuilt only once an app changes
+        self.assertIs(self.store.combined_graph().graph, G)
+        self.write_app('other', 'JobF --> JobG\n', mode='a')
+        rebuilt = self.store.combined_graph().graph
+        self.assertIsNot(rebuilt, G)
+        self.assertIn(('JobF', 'JobG'), rebuilt.edges())
+
+    def test_apps_summary(self):
+        self.write_app('other', 'JobD --> JobF\nJobB --> JobD\n')
+        data, status = jobs_view.apps_data(self.store.combined_graph().graph)
+        summary = {entry['name']: entry for entry in data['apps']}
+        self.assertEqual(summary['default'], {'name': 'default', 'jobs': 5, 'dependencies': 5, 'roots': 1,
+                                              'shared_with': {'other': 2}})
+        self.assertEqual(summary['other'], {'name': 'other', 'jobs': 3, 'dependencies': 2, 'roots': 1,
+                                            'shared_with': {'default': 2}})
+
+class TestReachabilityIndex(unittest.TestCase):
+    """Impact queries on the index agree with NetworkX's own."""
+
+    def random_dag(self, seed, jobs=60, edges=150):
+        import random
+        rng = random.Random(seed)
+        G = jobs_view.nx.DiGraph()
+        G.add_nodes_from(f'Job{i}' for i in range(jobs))
+        while G.number_of_edges() < edges:
+            parent, child = sorted(rng.sample(range(jobs), 2))
+            G.add_edge(f'Job{parent}', f'Job{child}')
+        return G
+
+    def test_against_networkx(self):
+        nx = jobs_view.nx
+        for seed in range(5):
+            G = self.random_dag(seed)
+            index = jobs_view.ReachabilityIndex(G)
+            order = {name: i for i, name in enumerate(index.names)}
+            self.assertTrue(all(order[parent] < order[child] for parent, child in G.edges()))
+            for job in list(G)[::7]:
+                self.assertEqual(set(index.descendants(job)), nx.descendants(G, job))
+                self.assertEqual(set(index.ancestors(job)), nx.ancestors(G, job))
+                self.assertEqual(index.descendants(job), sorted(index.descendants(job), key=order.get))
+
+            for source, target in [('Job0', 'Job59'), ('Job3', 'Job40'), ('Job10', 'Job12'), ('Job50', 'Job5')]:
+                paths = index.paths(source, target)
+                if not nx.has_path(G, source, target):
+                    self.assertIsNone(paths, (seed, source, target))
+                    continue
+                shortest, critical = paths
+                self.assertEqual(len(shortest), nx.shortest_path_length(G, source, target) + 1)
+                # Every job between the two lies on some path from source to target
+                between = G.subgraph((nx.descendants(G, source) | {source}) & (nx.ancestors(G, target) | {target}))
+                self.assertEqual(len(critical), nx.dag_longest_path_length(between) + 1)
+                for path in (shortest, critical):
+                    self.assertEqual((path[0], path[-1]), (source, target))
+                    self.assertTrue(all(G.has_edge(a, b) for a, b in zip(path, path[1:])))
+
+    def test_critical_path(self):
+        G = jobs_view.nx.DiGraph([('A', 'D'), ('A', 'B'), ('B', 'C'), ('C', 'D'), ('D', 'E')])
+        shortest, critical = jobs_view.ReachabilityIndex(G).paths('A', 'E')
+        self.assertEqual(shortest, ['A', 'D', 'E'])
+        self.assertEqual(critical, ['A', 'B', 'C', 'D', 'E'])
+        self.assertIsNone(jobs_view.ReachabilityIndex(G).paths('E', 'A'))
+
+    def test_cycle(self):
+        with self.assertRaises(jobs_view.nx.NetworkXUnfeasible):
+            jobs_view.ReachabilityIndex(jobs_view.nx.DiGraph([('A', 'B'), ('B', 'A')]))
+
+class TestSlices(JobsViewTestCase):
+
+    def get(self, path):
+        response = self.client.get(path)
+        return response.status_code, response.get_json()
+
+    def names(self, data):
+        return [node['name'] for node in data['nodes']]
+
+    def test_roots(self):
+        status, data = self.get('/api/graph/default?depth=1')
+        self.assertEqual(status, 200)
+        self.assertEqual(self.names(data), ['JobA'])
+        self.assertEqual(data['nodes'][0]['child_count'], 2)
+        self.assertFalse(data['nodes'][0]['expanded'])
+        self.assertEqual((data['root'], data['total'], data['next_offset']), (None, 1, None))
+
+    def test_depth(self):
+        status, data = self.get('/api/graph/default?depth=3')
+        names = self.names(data)
+        self.assertEqual(sorted(names), ['JobA', 'JobB', 'JobC', 'JobD'])
+        # JobD is shared by JobB and JobC, yet listed once; its own child is beyond the depth
+        expanded = {node['name'] for node in data['nodes'] if node['expanded']}
+        self.assertEqual(expanded, {'JobA', 'JobB', 'JobC'})
+        edges = {(names[parent], names[child]) for parent, child in data['edges']}
+        self.assertEqual(edges, {('JobA', 'JobB'), ('JobA', 'JobC'), ('JobB', 'JobD'), ('JobC', 'JobD')})
+        self.assertEqual([node['depth'] for node in data['nodes']], [0, 1, 1, 2])
+
+    def test_pages(self):
+        status, data = self.get('/api/graph/default?root=JobA&limit=1')
+        self.assertEqual(sorted(self.names(data)), ['JobA', 'JobB'])
+        self.assertEqual((data['root'], data['total'], data['next_offset']), ('JobA', 2, 1))
+        # JobA is expanded only once its last page is loaded
+        self.assertFalse(data['nodes'][self.names(data).index('JobA')]['expanded'])
+
+        status, data = self.get('/api/graph/default?root=JobA&limit=1&offset=1')
+        self.assertEqual(sorted(self.names(data)), ['JobA', 'JobC'])
+        self.assertIsNone(data['next_offset'])
+        self.assertTrue(data['nodes'][self.names(data).index('JobA')]['expanded'])
+
+    def test_limit(self):
+        self.write_app('wide', ''.join(f'Root --> Job{i}\nJob{i} --> Leaf{i}\n' for i in range(20)))
+        status, data = self.get('/api/graph/wide?root=Root&depth=5&limit=10')
+        # A page of 10 children, their own children left out as they would go over the limit
+        self.assertEqual(len(data['nodes']), 11)
+        self.assertEqual(data['next_offset'], 10)
+        self.assertFalse(any(node['expanded'] for node in data['nodes']))
+
+    def test_combined_and_layout(self):
+        self.write_app('other', 'JobD --> JobF\n')
+        status, data = self.get('/api/graph?root=JobD&depth=1&layout=1')
+        self.assertEqual(status, 200)
+        apps = {node['name']: node['apps'] for node in data['nodes']}
+        self.assertEqual(apps, {'JobD': ['default', 'other'], 'JobE': ['default'], 'JobF': ['other']})
+        self.assertTrue(all('x' in node for node in data['nodes']))
+
+    def test_errors(self):
+        self.assertEqual(self.get('/api/graph/default?root=Nope')[0], 404)
+        self.assertEqual(self.get('/api/graph/missing?depth=1')[0], 404)
+        for query in ('depth=0', 'depth=x', 'depth=1&offset=-1', 'depth=1&limit=0', 'depth=1&limit=100000'):
+            status, data = self.get(f'/api/graph/default?{query}')
+            self.assertEqual(status, 400, query)
+            self.assertIn('must be a whole number', data['error'])
+        self.write_app('loop', 'JobA --> JobB\nJobB --> JobA\n')
+        status, data = self.get('/api/graph/loop?depth=1')
+        self.assertEqual(status, 409)
+        self.assertEqual(data['error'], 'Dependency cycle')
+
+class TestResponses(JobsViewTestCase):
+
+    def test_etag(self):
+        response = self.client.get('/api/data/default')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers['ETag']
+        self.assertEqual(response.headers['Cache-Control'], 'no-cache')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+
+        response = self.client.get('/api/data/default', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b'')
+        self.assertEqual(response.headers['ETag'], etag)
+
+        # Once the file changes, so does the response
+        self.write_app('default', 'JobE --> JobF\n', mode='a')
+        response = self.client.get('/api/data/default', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertIn('JobF', response.get_data(as_text=True))
+
+    def test_arguments_cached_apart(self):
+        shallow = self.client.get('/api/graph/default?depth=1')
+        deep = self.client.get('/api/graph/default?depth=2')
+        self.assertNotEqual(shallow.headers['ETag'], deep.headers['ETag'])
+        self.assertEqual(self.client.get('/api/graph/default?depth=1').data, shallow.data)
+
+    def test_gzip(self):
+        self.write_app('big', ''.join(f'Job{i} --> Job{i + 1}\n' for i in range(200)))
+        plain = self.client.get('/api/graph/big')
+        self.assertNotIn('Content-Encoding', plain.headers)
+
+        response = self.client.get('/api/graph/big', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertLess(len(response.data), len(plain.data))
+        # Each encoding is its own representation
+        etag = response.headers['ETag']
+        self.assertNotEqual(etag, plain.headers['ETag'])
+        response = self.client.get('/api/graph/big', headers={'Accept-Encoding': 'gzip', 'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get('/api/graph/big', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    @unittest.skipIf(jobs_view.brotli is None, "needs brotli")
+    def test_brotli_preferred(self):
+        self.write_app('big', ''.join(f'Job{i} --> Job{i + 1}\n' for i in range(200)))
+        plain = self.client.get('/api/graph/big')
+        response = self.client.get('/api/graph/big', headers={'Accept-Encoding': 'gzip, br'})
+        self.assertEqual(response.headers['Content-Encoding'], 'br')
+        self.assertEqual(jobs_view.brotli.decompress(response.data), plain.data)
+
+    def test_small_responses_uncompressed(self):
+        response = self.client.get('/api/graph/default?depth=1', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(json.loads(response.data)['nodes'][0]['name'], 'JobA')
+
+    def test_errors_not_cached_as_success(self):
+        response = self.client.get('/api/graph/default/descendants?job=Nope')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(self.client.get('/api/graph/default/descendants?job=JobB').get_json()['descendants'],
+                         ['JobD', 'JobE'])
+
+class TestConcurrency(JobsViewTestCase):
+
+    def test_reads_during_appends(self):
+        # Big enough that building a response takes a while
+        self.write_app('feed', ''.join(f'Base{i // 2} --> Base{i}\n' for i in range(1, 5000)) + 'Job0 --> Job1\n')
+        failures = []
+        done = threading.Event()
+
+        def append():
+            for i in range(1, 300):
+                self.write_app('feed', f'Job{i} --> Job{i + 1}\nJob0 --> Extra{i}\n', mode='a')
+                time.sleep(0.002)
+            done.set()
+
+        def read():
+            client = jobs_view.app.test_client()
+            paths = ['/api/graph/feed', '/api/data/feed', '/api/graph/feed?depth=2&layout=1',
+                     '/api/graph/feed/descendants?job=Job0', '/api/graph?depth=2', '/api/apps']
+            k = 0
+            while not done.is_set():
+                response = client.get(paths[k % len(paths)])
+                k += 1
+                if response.status_code != 200:
+                    failures.append((response.request.path, response.status_code))
+
+        threads = [threading.Thread(target=append)] + [threading.Thread(target=read) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+        # Once the writer stops, readers see every appended line
+        response = self.client.get('/api/graph/feed/descendants?job=Job0')
+        self.assertEqual(response.get_json()['count'], 300 + 299)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,16 @@
+# gunicorn settings for wsgi.py; each can be overridden on the command line
+import multiprocessing
+import os
+
+bind = os.environ.get('JOBS_VIEW_BIND', '0.0.0.0:8000')
+# Requests are short and mostly served from cache: a few threads per worker
+# cover slow clients, and one worker per core covers the CPU
+workers = int(os.environ.get('JOBS_VIEW_WORKERS', multiprocessing.cpu_count()))
+worker_class = 'gthread'
+threads = int(os.environ.get('JOBS_VIEW_THREADS', 4))
+# Load the graphs once in the master and share them with the workers
+preload_app = True
+# data/ is found relative to the working directory
+chdir = os.path.dirname(os.path.abspath(__file__))
+# Dashboards poll over the same connection
+keepalive = 30
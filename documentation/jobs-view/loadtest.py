@@ -0,0 +1,121 @@
+"""
+Load test for a running jobs-view server: requests per second and latency
+at each concurrency level, over the requests the page and polling
+dashboards make for every app the server lists.
+
+    python loadtest.py http://localhost:8000 --concurrency 1 8 32 --duration 10
+
+Each simulated client keeps one connection open and cycles through the
+paths. With --revalidate, clients send back the ETag they last got for a
+path, as browsers do, so cached responses come back as 304 Not Modified.
+The clients are Python threads, so for high rates run the script on a
+different machine (or several copies of it) than the server.
+"""
+import argparse
+import http.client
+import json
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+def request_paths(host, port):
+    """The page's first requests and its fallback tree, for every app and the combined view."""
+    connection = http.client.HTTPConnection(host, port, timeout=30)
+    connection.request('GET', '/api/apps')
+    apps = [entry['name'] for entry in json.loads(connection.getresponse().read())['apps']]
+    connection.close()
+    paths = ['/api/apps', '/api/graph?depth=3&layout=1']
+    for name in apps:
+        paths.append(f'/api/graph/{quote(name)}?depth=3&layout=1')
+        paths.append(f'/api/data/{quote(name)}')
+    return paths
+
+class Client(threading.Thread):
+    """Sends requests over one connection until the deadline, timing each."""
+
+    def __init__(self, host, port, paths, start, deadline, revalidate):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.paths = paths
+        self.start_index = start
+        self.deadline = deadline
+        self.revalidate = revalidate
+        self.latencies = []
+        self.not_modified = 0
+        self.errors = 0
+
+    def run(self):
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        etags = {}
+        i = self.start_index
+        while time.perf_counter() < self.deadline:
+            path = self.paths[i % len(self.paths)]
+            i += 1
+            headers = {'Accept-Encoding': 'gzip'}
+            if self.revalidate and path in etags:
+                headers['If-None-Match'] = etags[path]
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            if response.status == 304:
+                self.not_modified += 1
+            elif response.status != 200:
+                self.errors += 1
+            elif response.getheader('ETag'):
+                etags[path] = response.getheader('ETag')
+        connection.close()
+
+def run_level(host, port, paths, concurrency, duration, revalidate):
+    deadline = time.perf_counter() + duration
+    clients = [Client(host, port, paths, k, deadline, revalidate) for k in range(concurrency)]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for client in clients for latency in client.latencies)
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000 if latencies else float('nan')
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'rate': len(latencies) / elapsed,
+        'p50': percentile(50),
+        'p95': percentile(95),
+        'p99': percentile(99),
+        'not_modified': sum(client.not_modified for client in clients),
+        'errors': sum(client.errors for client in clients),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure jobs-view requests per second at several concurrency levels")
+    parser.add_argument('url', nargs='?', default='http://localhost:8000', help="Server to test (default: %(default)s)")
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16, 64],
+                        help="Simultaneous clients, one run per level (default: %(default)s)")
+    parser.add_argument('--duration', type=float, default=10.0, help="Seconds per level (default: %(default)s)")
+    parser.add_argument('--revalidate', action='store_true', help="Send If-None-Match with the last ETag, as browsers do")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    paths = request_paths(host, port)
+    print(f"{len(paths)} paths on {args.url}, {args.duration:g}s per level"
+          f"{', revalidating' if args.revalidate else ''}")
+    print(f"{'clients':>8} {'requests':>9} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'304s':>7} {'errors':>7}")
+    for concurrency in args.concurrency:
+        r = run_level(host, port, paths, concurrency, args.duration, args.revalidate)
+        print(f"{r['concurrency']:>8} {r['requests']:>9} {r['rate']:>9.0f} {r['p50']:>8.2f} {r['p95']:>8.2f} "
+              f"{r['p99']:>8.2f} {r['not_modified']:>7} {r['errors']:>7}")
+
+if __name__ == '__main__':
+    main()
@@ -28,46 +28,177 @@ svg.append("defs").append("marker")
     .attr("d", "M0,-5L10,0L0,5")
     .attr("fill", "#64748b"); // Darker slate color
 
-let i = 0,
-    duration = 750,
-    root;
+let duration = 750;
 
-// Declares a tree layout and assigns the size
-// Increased nodeSize width to accommodate wider boxes
-const treeMap = d3.tree().nodeSize([220, 120]);
+// Jobs loaded so far, each linked to its loaded parents and children
+let nodes = [];
+const jobsByName = new Map(),
+    loadedEdges = new Set();
+
+// Spacing between jobs in a row, and between rows
+// Wide enough to accommodate wider boxes
+const nodeWidth = 220,
+    rowHeight = 120;
+
+// Levels fetched on first paint, and below a job when it is expanded
+const initialDepth = 3,
+    expandDepth = 2;
+
+// Until the first expand or collapse, jobs stay where the server laid them out
+let presetLayout = true;
 
 // Fetch data
-fetch(`/api/data/${appName}`)
+load({ depth: initialDepth, layout: 1 }, { x0: width / 2, y0: 0 });
+
+// Fetches a slice of the graph and adds it to the jobs already loaded
+function load(params, source) {
+    return fetch(`${graphUrl}?${new URLSearchParams(params)}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data.error) {
+                showError(data);
+                return;
+            }
+            merge(data);
+            if (data.root === null && data.next_offset !== null) {
+                showNote(`Showing the first ${data.next_offset} of ${data.total} root jobs`);
+            }
+            update(source);
+        });
+}
+
+function merge(data) {
+    // Each job appears once, however many parents it has
+    const slice = data.nodes.map(function (d) {
+        let job = jobsByName.get(d.name);
+        if (!job) {
+            job = {
+                id: d.name, name: d.name, depth: d.depth, apps: d.apps, childCount: d.child_count,
+                expanded: false, parents: [], children: [], collapsed: false
+            };
+            jobsByName.set(d.name, job);
+            nodes.push(job);
+        }
+        job.expanded = job.expanded || d.expanded;
+        job.presetX = d.x;
+        return job;
+    });
+    data.edges.forEach(function ([parent, child]) {
+        const key = slice[parent].id + "→" + slice[child].id;
+        if (loadedEdges.has(key)) return;
+        loadedEdges.add(key);
+        slice[parent].children.push(slice[child]);
+        slice[child].parents.push(slice[parent]);
+    });
+    if (data.root !== null) {
+        // Where the next page of the root's children starts, if it has more
+        jobsByName.get(data.root).nextOffset = data.next_offset;
+    }
+}
+
+// Whether a job has children that are hidden or not loaded yet
+function folded(d) {
+    return d.childCount > 0 && (d.collapsed || !d.expanded);
+}
+
+// List the apps, and the combined view of all of them, in the header
+fetch("/api/apps")
     .then(response => response.json())
     .then(data => {
-        root = d3.hierarchy(data, function (d) { return d.children; });
-        root.x0 = width / 2;
-        root.y0 = 0;
+        const links = [{ name: "combined", label: "All apps" }]
+            .concat(data.apps.map(function (d) { return { name: d.name, label: d.name }; }));
+        d3.select("#app-nav").selectAll("a")
+            .data(links)
+            .enter().append("a")
+            .attr("href", function (d) { return "/" + encodeURIComponent(d.name); })
+            .classed("active", function (d) { return d.name === appName; })
+            .text(function (d) { return d.label; });
+    });
+
+function showError(data) {
+    const message = data.cycle ? `${data.error}: ${data.cycle.join(" → ")}` : data.error;
+    d3.select("#tree-container").insert("p", "svg")
+        .attr("class", "error")
+        .text(message);
+}
 
-        update(root);
+function showNote(message) {
+    d3.select("#tree-container").insert("p", "svg")
+        .attr("class", "note")
+        .text(message);
+}
+
+// Places the jobs reachable from the roots without passing through a
+// collapsed job, one row per depth, and returns them
+function layout() {
+    const visible = new Set();
+    const stack = nodes.filter(function (d) { return d.parents.length === 0; });
+    stack.forEach(function (d) { visible.add(d); });
+    while (stack.length) {
+        const d = stack.pop();
+        if (d.collapsed) continue;
+        d.children.forEach(function (child) {
+            if (!visible.has(child)) {
+                visible.add(child);
+                stack.push(child);
+            }
+        });
+    }
+    const visibleNodes = nodes.filter(function (d) { return visible.has(d); });
+
+    if (presetLayout) {
+        visibleNodes.forEach(function (d) {
+            d.x = width / 2 + d.presetX;
+            d.y = d.depth * rowHeight; // Vertical spacing
+        });
+        return visibleNodes;
+    }
+
+    // Rows are filled in topological order, so parents are placed before their children
+    const rows = [];
+    nodes.forEach(function (d) {
+        if (visible.has(d)) (rows[d.depth] = rows[d.depth] || []).push(d);
     });
+    rows.forEach(function (row) {
+        // Order each row by where its parents are, to keep links short
+        row.forEach(function (d) {
+            const parents = d.parents.filter(function (p) { return visible.has(p) && !p.collapsed; });
+            d.order = parents.length ? d3.mean(parents, function (p) { return p.x; }) : 0;
+        });
+        row.sort(function (a, b) { return a.order - b.order; });
+        row.forEach(function (d, k) {
+            d.x = width / 2 + (k - (row.length - 1) / 2) * nodeWidth;
+            d.y = d.depth * rowHeight; // Vertical spacing
+        });
+    });
+    return visibleNodes;
+}
 
 function update(source) {
 
-    // Assigns the x and y position for the nodes
-    const treeData = treeMap(root);
-
-    // Compute the new tree layout.
-    const nodes = treeData.descendants(),
-        links = treeData.descendants().slice(1);
+    // Assigns the x and y position for the visible nodes
+    const visibleNodes = layout();
 
-    // Normalize for fixed-depth.
-    nodes.forEach(function (d) { d.y = d.depth * 120 }); // Vertical spacing
+    // One link per dependency out of an expanded job
+    const links = [];
+    visibleNodes.forEach(function (d) {
+        if (d.collapsed) return;
+        d.children.forEach(function (child) {
+            links.push({ id: d.id + "→" + child.id, source: d, target: child });
+        });
+    });
 
     // ****************** Nodes section ***************************
 
     // Update the nodes...
     const node = g.selectAll('g.node')
-        .data(nodes, function (d) { return d.id || (d.id = ++i); });
+        .data(visibleNodes, function (d) { return d.id; });
 
     // Enter any new modes at the parent's previous position.
     const nodeEnter = node.enter().append('g')
         .attr('class', 'node')
+        // In the combined view, jobs named by several apps stand out
+        .classed('shared', function (d) { return d.apps && d.apps.length > 1; })
         .attr("transform", function (d) {
             return "translate(" + source.x0 + "," + source.y0 + ")";
         })
@@ -81,20 +212,25 @@ function update(source) {
         .attr('x', 0)
         .attr('y', 0)
         .style("fill", function (d) {
-            return d._children ? "#0ea5e9" : "#ffffff";
+            return folded(d) ? "#0ea5e9" : "#ffffff";
         });
 
     // Add labels for the nodes
     nodeEnter.append('text')
         .attr("dy", ".35em")
         .attr("text-anchor", "middle")
-        .text(function (d) { return d.data.name; })
+        .text(function (d) { return d.name; })
         .each(function (d) {
             // Calculate width based on text length
             d.width = this.getComputedTextLength() + 20; // Padding
             d.height = 30; // Fixed height
         });
 
+    // Hovering a job in the combined view lists its apps
+    nodeEnter.filter(function (d) { return d.apps; })
+        .append('title')
+        .text(function (d) { return d.apps.join(", "); });
+
     // UPDATE
     const nodeUpdate = nodeEnter.merge(node);
 
@@ -112,7 +248,7 @@ function update(source) {
         .attr('x', function (d) { return -d.width / 2; }) // Center horizontally
         .attr('y', function (d) { return -d.height / 2; }) // Center vertically
         .style("fill", function (d) {
-            return d._children ? "#0ea5e9" : "#ffffff";
+            return folded(d) ? "#0ea5e9" : "#ffffff";
         })
         .attr('cursor', 'pointer');
 
@@ -157,7 +293,7 @@ function update(source) {
     // Transition back to the parent element position
     linkUpdate.transition()
         .duration(duration)
-        .attr('d', function (d) { return diagonal(d.parent, d) });
+        .attr('d', function (d) { return diagonal(d.source, d.target) });
 
     // Remove any exiting links
     const linkExit = link.exit().transition()
@@ -169,7 +305,7 @@ function update(source) {
         .remove();
 
     // Store the old positions for transition.
-    nodes.forEach(function (d) {
+    visibleNodes.forEach(function (d) {
         d.x0 = d.x;
         d.y0 = d.y;
     });
@@ -190,15 +326,17 @@ function update(source) {
         return path
     }
 
-    // Toggle children on click.
+    // Toggle children on click, fetching them (a page at a time) the first time.
+    // A job stays visible while another expanded parent leads to it.
     function click(event, d) {
-        if (d.children) {
-            d._children = d.children;
-            d.children = null;
-        } else {
-            d.children = d._children;
-            d._children = null;
+        presetLayout = false;
+        if (!d.expanded && d.childCount) {
+            d.collapsed = false;
+            load({ root: d.name, depth: expandDepth, offset: d.nextOffset || 0 }, d);
+            return;
         }
+        if (!d.children.length) return;
+        d.collapsed = !d.collapsed;
         update(d);
     }
 }
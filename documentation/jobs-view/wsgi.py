@@ -0,0 +1,35 @@
+"""
+Production entry point for jobs-view, for gunicorn with the settings in
+gunicorn.conf.py (run from this directory):
+
+    gunicorn -c gunicorn.conf.py wsgi:application
+
+The master process imports this module once before forking its workers
+(preload_app), so every app is parsed, indexed and its first-paint
+responses built and compressed there, and the workers start out sharing
+them copy-on-write instead of each loading the graphs again. After that,
+each worker reparses a jobs.txt on its own when the file changes. ETags
+come from response content, so they agree across workers.
+"""
+import gc
+from app import app, store
+
+# The page's first requests, per app and for the combined view
+WARM_PATHS = ['/api/graph/{app}?depth=3&layout=1']
+COMBINED_WARM_PATHS = ['/api/apps', '/api/graph?depth=3&layout=1']
+
+def warm():
+    """Builds (and gzips) the responses dashboards ask for first, before workers fork."""
+    client = app.test_client()
+    paths = list(COMBINED_WARM_PATHS)
+    for name, entry in store.all_apps():
+        paths.extend(path.format(app=name) for path in WARM_PATHS)
+    for path in paths:
+        client.get(path, headers={'Accept-Encoding': 'gzip'})
+
+warm()
+# Leave what is loaded so far to the workers untouched: the collector would
+# otherwise write to (and so copy) its pages in every worker
+gc.freeze()
+
+application = app
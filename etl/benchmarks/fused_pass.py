@@ -0,0 +1,70 @@
+"""
+Validator-by-validator execution vs the fused ValidationPlan on a wide file.
+
+Run from the etl directory:
+
+    python -m benchmarks.fused_pass --rows 200000 --columns 40
+
+Every column gets a datatype and a length rule, so the fused plan extracts
+and null-masks each column once instead of once per validator.
+"""
+import argparse
+import time
+import numpy as np
+import pandas as pd
+
+from validator.file_validator import FileValidator
+from validator.planner import ValidationPlan
+
+def wide_frame(rows: int, columns: int, seed: int = 0) -> pd.DataFrame:
+    """Half integer columns, half short code columns, with a few blanks in each."""
+    rng = np.random.default_rng(seed)
+    data = {}
+    for i in range(columns):
+        if i % 2 == 0:
+            values = pd.Series(rng.integers(0, 1_000_000, size=rows)).astype(float)
+        else:
+            values = pd.Series(np.char.add('C', rng.integers(0, 10_000, size=rows).astype(str)))
+        values[rng.random(rows) < 0.001] = np.nan
+        data[f"col_{i:03d}"] = values
+    return pd.DataFrame(data)
+
+def wide_config(df: pd.DataFrame) -> dict:
+    return {'validators': [
+        {'type': 'datatype', 'columns': {col: 'int' for col in df.columns}},
+        {'type': 'length', 'columns': {col: 8 for col in df.columns}},
+    ]}
+
+def best_of(repeat: int, fn) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200_000)
+    parser.add_argument('--columns', type=int, default=40)
+    parser.add_argument('--repeat', type=int, default=2)
+    args = parser.parse_args()
+
+    df = wide_frame(args.rows, args.columns)
+    validators = FileValidator(wide_config(df)).validators
+
+    def per_validator():
+        return [e for v in validators for e in v.validate(df)]
+
+    def fused():
+        plan = ValidationPlan(validators, streaming=False)
+        plan.consume(df)
+        return plan.finish()
+
+    assert per_validator() == fused()
+    print(f"{args.rows} rows x {args.columns} columns, {2 * args.columns} rules")
+    print(f"  per validator: {best_of(args.repeat, per_validator):.2f}s")
+    print(f"  fused plan:    {best_of(args.repeat, fused):.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Parse backends compared on synthetic files shaped like enterprise-survey-2024.csv.
+
+Run from the etl directory:
+
+    python -m benchmarks.parse_backends --rows 1000000 10000000
+
+For each backend and mode this reports the time to parse the configured
+columns alone, the time for the full FileValidator run and its peak RSS.
+Each measurement runs in a fresh interpreter.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.synthetic import write_survey_csv
+
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALIDATORS = [
+    {'type': 'duplicate', 'columns': ['Year', 'Industry_code_NZSIOC', 'Variable_code']},
+    {'type': 'datatype', 'columns': {'Year': 'int', 'Value': 'int'}},
+    {'type': 'length', 'columns': {'Industry_code_NZSIOC': 10, 'Variable_code': 5}},
+]
+
+def child(file_path: str, backend: str, mode: str) -> None:
+    from validator.file_validator import FileValidator
+
+    validator = FileValidator({'backend': backend, 'mode': mode, 'validators': VALIDATORS})
+    start = time.perf_counter()
+    if mode == 'stream':
+        for _ in validator.reader.iter_chunks(file_path, validator.usecols, validator.dtypes, validator.chunksize):
+            pass
+    else:
+        validator.reader.read(file_path, validator.usecols, validator.dtypes)
+    parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    errors = validator.validate_file(file_path)
+    total = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else float('nan')
+    print(f"{parse:.3f} {total:.3f} {peak_mb:.1f} {len(errors)}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--backends', nargs='+', default=['pandas', 'pyarrow'])
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(*args.child)
+        return
+
+    print(f"{'rows':>10} {'backend':>8} {'mode':>7} {'parse s':>8} {'validate s':>11} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"survey_{rows}.csv")
+            write_survey_csv(path, rows)
+            for backend in args.backends:
+                for mode in ('memory', 'stream'):
+                    out = subprocess.run(
+                        [sys.executable, '-m', 'benchmarks.parse_backends', '--child', path, backend, mode],
+                        cwd=ETL_DIR, capture_output=True, text=True, check=True,
+                    ).stdout.split()
+                    print(f"{rows:>10} {backend:>8} {mode:>7} {float(out[0]):>8.2f} {float(out[1]):>11.2f} {float(out[2]):>12.1f}")
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Peak RSS of FileValidator in memory vs streaming mode as file size grows.
+
+Run from the etl directory:
+
+    python -m benchmarks.streaming_rss --rows 250000 1000000 4000000
+
+Each measurement runs in a fresh interpreter so ru_maxrss reflects that run only.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from benchmarks.synthetic import write_survey_csv
+
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALIDATORS = [
+    {'type': 'duplicate', 'columns': ['Year', 'Industry_code_NZSIOC', 'Variable_code']},
+    {'type': 'datatype', 'columns': {'Year': 'int', 'Value': 'int'}},
+    {'type': 'length', 'columns': {'Industry_code_NZSIOC': 10, 'Variable_code': 5}},
+]
+
+def child(file_path: str, mode: str, chunksize: int) -> None:
+    from validator.file_validator import FileValidator
+
+    start = time.perf_counter()
+    config = {'mode': mode, 'chunksize': chunksize, 'validators': VALIDATORS}
+    errors = FileValidator(config).validate_file(file_path)
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024 if resource else float('nan')
+    print(f"{elapsed:.3f} {peak_mb:.1f} {len(errors)}")
+
+def measure(file_path: str, mode: str, chunksize: int):
+    out = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.streaming_rss', '--child', file_path, mode, str(chunksize)],
+        cwd=ETL_DIR, capture_output=True, text=True, check=True,
+    ).stdout.split()
+    return float(out[0]), float(out[1]), int(out[2])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[250_000, 1_000_000, 4_000_000])
+    parser.add_argument('--chunksize', type=int, default=100_000)
+    parser.add_argument('--child', nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], args.child[1], int(args.child[2]))
+        return
+
+    print(f"{'rows':>10} {'file MB':>8} {'mode':>7} {'seconds':>8} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.rows:
+            path = os.path.join(tmp, f"survey_{rows}.csv")
+            write_survey_csv(path, rows)
+            size_mb = os.path.getsize(path) / 2**20
+            for mode in ('memory', 'stream'):
+                elapsed, peak_mb, _ = measure(path, mode, args.chunksize)
+                print(f"{rows:>10} {size_mb:>8.1f} {mode:>7} {elapsed:>8.2f} {peak_mb:>12.1f}")
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
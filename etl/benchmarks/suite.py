@@ -0,0 +1,154 @@
+"""
+Throughput and peak memory of each validator and of the full FileValidator pipeline.
+
+Run from the etl directory:
+
+    python -m benchmarks.suite --rows 100000 1000000 --extra-columns 0 40 \\
+        --duplicate-rate 0.01 --error-rate 0.001 --results bench.jsonl
+
+Synthetic files are shaped like enterprise-survey-2024.csv and checked with
+its rules from validation_config.yaml (plus a rule per extra column). Every
+validator is timed on its own and then the whole config, in each mode and
+backend, each in a fresh interpreter. One JSON line per measurement is
+appended to the results file, labelled with the current commit, so runs
+from two commits can be compared:
+
+    python -m benchmarks.suite --compare base.jsonl bench.jsonl
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, Optional
+
+from benchmarks.synthetic import SURVEY_COLUMNS, survey_config, write_survey_csv
+
+ETL_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Fields that identify a measurement across runs
+KEY_FIELDS = ('rows', 'extra_columns', 'duplicate_rate', 'error_rate', 'target', 'mode', 'backend')
+
+def child(file_path: str, target: str, mode: str, backend: str, extra_columns: int) -> None:
+    from validator.file_validator import FileValidator
+
+    config = survey_config(extra_columns)
+    if target != 'pipeline':
+        config['validators'] = [v for v in config['validators'] if v['type'] == target]
+    validator = FileValidator(dict(config, mode=mode, backend=backend))
+    errors = validator.validate_file(file_path)
+    stats = validator.stats
+    print(json.dumps({
+        'rows': stats.rows,
+        'seconds': stats.seconds,
+        'peak_memory_bytes': stats.peak_memory,
+        'errors': len(errors),
+        'validators': {v.validator: v.seconds for v in stats.validators},
+    }))
+
+def measure(file_path: str, target: str, mode: str, backend: str, extra_columns: int) -> Dict[str, Any]:
+    out = subprocess.run(
+        [sys.executable, '-m', 'benchmarks.suite', '--child', file_path, target, mode, backend, str(extra_columns)],
+        cwd=ETL_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+def commit() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ETL_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def load_results(path: str) -> Dict[tuple, Dict[str, Any]]:
+    """Returns the latest measurement per KEY_FIELDS in a results file."""
+    results = {}
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                results[tuple(record[k] for k in KEY_FIELDS)] = record
+    return results
+
+def compare(base_path: str, new_path: str) -> None:
+    base, new = load_results(base_path), load_results(new_path)
+    print(f"{'rows':>10} {'extra':>5} {'dup':>6} {'err':>6} {'target':>9} {'mode':>7} {'backend':>8}"
+          f" {'base rows/s':>12} {'new rows/s':>12} {'speedup':>8} {'base MB':>8} {'new MB':>8}")
+    for key in sorted(set(base) & set(new), key=str):
+        b, n = base[key], new[key]
+        rows, extra, dup, err, target, mode, backend = key
+        print(f"{rows:>10} {extra:>5} {dup:>6} {err:>6} {target:>9} {mode:>7} {backend:>8}"
+              f" {b['rows_per_sec']:>12.0f} {n['rows_per_sec']:>12.0f} {n['rows_per_sec'] / b['rows_per_sec']:>7.2f}x"
+              f" {_mb(b):>8.1f} {_mb(n):>8.1f}")
+    missing = len(set(base) ^ set(new))
+    if missing:
+        print(f"{missing} measurements appear in only one of the files")
+
+def _mb(record: Dict[str, Any]) -> float:
+    peak = record['peak_memory_bytes']
+    return peak / 2**20 if peak is not None else float('nan')
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    parser.add_argument('--extra-columns', type=int, nargs='+', default=[0],
+                        help=f"Columns added to the survey's {SURVEY_COLUMNS}, each with a rule")
+    parser.add_argument('--duplicate-rate', type=float, default=0.01, help="Fraction of rows repeating an earlier key")
+    parser.add_argument('--error-rate', type=float, default=0.001, help="Fraction of rows with a bad value")
+    parser.add_argument('--targets', nargs='+', default=['duplicate', 'datatype', 'length', 'pipeline'])
+    parser.add_argument('--modes', nargs='+', default=['memory', 'stream'])
+    parser.add_argument('--backends', nargs='+', default=['pandas'])
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per measurement; the fastest is kept")
+    parser.add_argument('--results', default='benchmark_results.jsonl', help="JSON lines file to append to")
+    parser.add_argument('--label', help="Label stored with each result (default: the current commit)")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="Compare two results files and exit")
+    parser.add_argument('--child', nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        file_path, target, mode, backend, extra_columns = args.child
+        child(file_path, target, mode, backend, int(extra_columns))
+        return
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    run = {
+        'label': args.label or commit(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+    }
+    print(f"{'rows':>10} {'cols':>5} {'file MB':>8} {'target':>9} {'mode':>7} {'backend':>8}"
+          f" {'seconds':>8} {'rows/s':>10} {'peak MB':>8} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as tmp, open(args.results, 'a') as results:
+        for rows in args.rows:
+            for extra_columns in args.extra_columns:
+                path = os.path.join(tmp, f"survey_{rows}_{extra_columns}.csv")
+                write_survey_csv(path, rows, extra_columns=extra_columns,
+                                 duplicate_rate=args.duplicate_rate, error_rate=args.error_rate)
+                size_mb = os.path.getsize(path) / 2**20
+                for target in args.targets:
+                    for mode in args.modes:
+                        for backend in args.backends:
+                            runs = [measure(path, target, mode, backend, extra_columns) for _ in range(args.repeat)]
+                            best = min(runs, key=lambda r: r['seconds'])
+                            record = dict(
+                                run, rows=rows, extra_columns=extra_columns, columns=SURVEY_COLUMNS + extra_columns,
+                                duplicate_rate=args.duplicate_rate, error_rate=args.error_rate, file_mb=size_mb,
+                                target=target, mode=mode, backend=backend, seconds=best['seconds'],
+                                rows_per_sec=rows / best['seconds'], peak_memory_bytes=best['peak_memory_bytes'],
+                                errors=best['errors'], validator_seconds=best['validators'],
+                            )
+                            results.write(json.dumps(record) + '\n')
+                            results.flush()
+                            print(f"{rows:>10} {record['columns']:>5} {size_mb:>8.1f} {target:>9} {mode:>7}"
+                                  f" {backend:>8} {best['seconds']:>8.2f} {record['rows_per_sec']:>10.0f}"
+                                  f" {_mb(record):>8.1f} {best['errors']:>7}")
+                os.remove(path)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+import numpy as np
+import pandas as pd
+
+# Rows generated per to_csv call, so large files never sit in memory at once
+WRITE_CHUNK = 200_000
+
+ANZSIC06 = "ANZSIC06 divisions A-S (excluding classes K6330, L6711, O7552, O760, O771, O772, S9540, S9601, S9602, and S9603)"
+
+# Columns of enterprise-survey-2024.csv
+SURVEY_COLUMNS = 10
+
+def survey_chunk(start: int, rows: int, rng: np.random.Generator, extra_columns: int = 0,
+                 duplicate_rate: float = 0.0, error_rate: float = 0.0) -> pd.DataFrame:
+    """
+    Builds rows [start, start + rows) shaped like enterprise-survey-2024.csv.
+
+    The (Year, Industry_code_NZSIOC, Variable_code) key is unique per row, except
+    that about `duplicate_rate` of rows repeat the key of an earlier row. About
+    `error_rate` of rows get one value that breaks a rule of survey_config():
+    a non-integer Year or Value, or an overlong industry or variable code.
+    `extra_columns` adds that many columns (alternately integers and short
+    codes) to make the file wider.
+    """
+    idx = np.arange(start, start + rows)
+    keys = idx.copy()
+    if duplicate_rate and start + rows > 1:
+        repeat = (rng.random(rows) < duplicate_rate) & (idx > 0)
+        keys[repeat] = (rng.random(repeat.sum()) * idx[repeat]).astype(np.int64)
+
+    df = pd.DataFrame({
+        'Year': 2024 - (keys // 10_000_000),
+        'Industry_aggregation_NZSIOC': 'Level 1',
+        'Industry_code_NZSIOC': (keys // 100) % 100_000,
+        'Industry_name_NZSIOC': 'All industries',
+        'Units': 'Dollars (millions)',
+        'Variable_code': np.char.add('H', np.char.zfill((keys % 100).astype(str), 2)),
+        'Variable_name': 'Total income',
+        'Variable_category': 'Financial performance',
+        'Value': rng.integers(0, 1_000_000, size=rows),
+        'Industry_code_ANZSIC06': ANZSIC06,
+    })
+    for i in range(extra_columns):
+        if i % 2 == 0:
+            df[f"Extra_{i:03d}"] = rng.integers(0, 1_000_000, size=rows)
+        else:
+            df[f"Extra_{i:03d}"] = np.char.add('C', rng.integers(0, 10_000, size=rows).astype(str))
+
+    if error_rate:
+        bad = np.flatnonzero(rng.random(rows) < error_rate)
+        kind = rng.integers(0, 4, size=len(bad))
+        for k, (col, value) in enumerate([
+            ('Year', '20x4'),
+            ('Value', '1.5'),
+            ('Industry_code_NZSIOC', '12345678901'),
+            ('Variable_code', 'H123456'),
+        ]):
+            rows_of_kind = bad[kind == k]
+            if len(rows_of_kind):
+                df[col] = df[col].astype(object)
+                df.iloc[rows_of_kind, df.columns.get_loc(col)] = value
+    return df
+
+def survey_config(extra_columns: int = 0) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    The validation_config.yaml entry for enterprise-survey-2024.csv, plus a
+    datatype or length rule on each extra column.
+    """
+    extra = [f"Extra_{i:03d}" for i in range(extra_columns)]
+    return {'validators': [
+        {'type': 'duplicate', 'columns': ['Year', 'Industry_code_NZSIOC', 'Variable_code']},
+        {'type': 'datatype', 'columns': dict({'Year': 'int', 'Value': 'int'}, **{c: 'int' for c in extra[0::2]})},
+        {'type': 'length', 'columns': dict({'Industry_code_NZSIOC': 10, 'Variable_code': 5},
+                                           **{c: 8 for c in extra[1::2]})},
+    ]}
+
+def write_survey_csv(path: str, rows: int, seed: int = 0, extra_columns: int = 0,
+                     duplicate_rate: float = 0.0, error_rate: float = 0.0) -> None:
+    """Writes a synthetic survey extract of `rows` rows to path; see survey_chunk()."""
+    rng = np.random.default_rng(seed)
+    for start in range(0, max(rows, 1), WRITE_CHUNK):
+        chunk = survey_chunk(start, min(WRITE_CHUNK, rows - start), rng, extra_columns, duplicate_rate, error_rate)
+        chunk.to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
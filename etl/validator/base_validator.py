@@ -1,22 +1,145 @@
 from abc import ABC, abstractmethod
 import pandas as pd
-from typing import List
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Union
+from .errors import ValidationError
+
+if TYPE_CHECKING:
+    from .prescan import ScanChunk
 
 class BaseValidator(ABC):
     """
     Abstract base class for all validators.
     """
-    
+
+    # Validators that can check a file one chunk at a time set this to True
+    # and implement start/consume/finish. FileValidator only uses them in
+    # streaming mode.
+    supports_streaming = False
+
+    # Error budget, from the validator's `max_errors` config. Once
+    # error_count() exceeds it, ValidationPlan stops running the validator
+    # on the rest of the file.
+    max_errors: Optional[int] = None
+
+    # Validators that can check the raw pre-scan of a CSV file (see
+    # prescan.py) set this to True and implement consume_scan(). One that
+    # requires no columns is only ever fed pre-scans.
+    reads_scan = False
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'BaseValidator':
+        """
+        Builds the validator from its entry in validation_config.yaml.
+        By default passes the entry's `columns`.
+        """
+        return cls(config['columns'])
+
     @abstractmethod
-    def validate(self, df: pd.DataFrame) -> List[str]:
+    def validate(self, df: pd.DataFrame) -> List[Union[ValidationError, str]]:
         """
-        Validates the given DataFrame and returns a list of error messages.
-        
+        Validates the given DataFrame and returns a list of errors.
+
         Args:
             df: The pandas DataFrame to validate.
-            
+
         Returns:
-            A list of strings, where each string is an error message.
+            A list of ValidationError, whose messages are only formatted when
+            reported. Plain message strings are accepted too.
             Returns an empty list if validation passes.
         """
         pass
+
+    def required_columns(self) -> Optional[List[str]]:
+        """
+        Returns the columns this validator reads, or None if it needs all of
+        them. FileValidator only parses columns some validator requires.
+        """
+        return None
+
+    def text_columns(self) -> List[str]:
+        """
+        Returns the columns this validator checks as raw text. Unless another
+        validator needs them parsed, they are read as str, skipping type
+        inference and keeping values like leading zeros as written.
+        """
+        return []
+
+    def scan_columns(self) -> List[str]:
+        """
+        Returns the columns this validator can check from a pre-scan alone.
+        With `prescan: true`, columns that only such validators need are
+        never parsed; consume_scan() gets their value lengths instead.
+        """
+        return []
+
+    def start(self) -> None:
+        """
+        Resets any state left over from a previous streaming run.
+        """
+        pass
+
+    def consume_scan(self, chunk: 'ScanChunk') -> None:
+        """
+        Accumulates results for one block of rows of a raw pre-scan. Its
+        lengths only cover the columns ValidationPlan assigned to the scan.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not read pre-scans")
+
+    def consume(self, chunk: pd.DataFrame) -> None:
+        """
+        Accumulates results for one chunk of a file.
+
+        Args:
+            chunk: A slice of the file. Its index holds the global row
+                numbers, so errors can be reported against the whole file.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    def second_pass_columns(self) -> Optional[List[str]]:
+        """
+        Called once every chunk has been consumed. A validator that needs to
+        see the file again returns the columns it wants; FileValidator then
+        streams just those columns through consume_second_pass().
+        """
+        return None
+
+    def consume_second_pass(self, chunk: pd.DataFrame) -> None:
+        """
+        Accumulates results for one chunk of the second pass.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not request a second pass")
+
+    def finish(self) -> List[Union[ValidationError, str]]:
+        """
+        Returns the errors accumulated since start(), as validate() does.
+        """
+        raise NotImplementedError(f"{type(self).__name__} does not support streaming")
+
+    def error_count(self) -> int:
+        """
+        Returns the number of failing values found since start(), for error
+        budgets. Validators that only know their errors in finish() return 0.
+        """
+        return 0
+
+    def stopped_early(self) -> None:
+        """
+        Called before finish() when this validator did not see the whole file:
+        an error budget, its own or the file's, stopped reading. A verdict
+        that only holds over every row (e.g. a share of them) is not reported.
+        """
+        pass
+
+    def save_state(self) -> Any:
+        """
+        Returns the picklable state accumulated so far, so an append-aware
+        run can later resume from it with only the new rows of a file.
+        Called after the second pass and before finish().
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot save its state")
+
+    def load_state(self, state: Any) -> None:
+        """
+        Restores state returned by save_state(), in place of start().
+        """
+        raise NotImplementedError(f"{type(self).__name__} cannot load its state")
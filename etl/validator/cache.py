@@ -0,0 +1,151 @@
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+from .errors import ValidationError
+
+# Bytes read at a time when hashing file contents
+HASH_BLOCK = 1 << 20
+
+class Fingerprint(NamedTuple):
+    size: int
+    mtime_ns: int
+    content_hash: str
+
+# Marks content hashes of append-only feeds, which cover only their edges
+EDGES = 'edges:'
+
+def fingerprint(file_path: str, append_only: bool = False) -> Fingerprint:
+    """
+    Stats and hashes a file. Taken before validating, so a file rewritten
+    mid-run is never cached under its new contents.
+
+    Feeds validated incrementally (append_only) are not read in full, or each
+    run would cost as much as validating the whole file did: only their first
+    and last bytes are hashed, as their saved AppendState checks.
+    """
+    stat = os.stat(file_path)
+    if append_only:
+        return Fingerprint(stat.st_size, stat.st_mtime_ns, _edges_hash(file_path, stat.st_size))
+    return Fingerprint(stat.st_size, stat.st_mtime_ns, _content_hash(file_path))
+
+def _edges_hash(file_path: str, size: int) -> str:
+    # Imported here, as incremental imports this module
+    from .incremental import edge_hashes
+    return EDGES + ''.join(edge_hashes(file_path, size))
+
+def _content_hash(file_path: str) -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _code_hash() -> str:
+    """Hash of the validator package source, so changing a validator invalidates old verdicts."""
+    digest = hashlib.blake2b(digest_size=16)
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), '*.py'))):
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+def _input_versions(file_config: Dict[str, Any]) -> List[Any]:
+    """
+    Path, size and mtime of each file rules read besides the data file, from
+    column specs with a `file` key (reference rules). ReferenceIndex reloads
+    on the same change.
+    """
+    files = set()
+    for validator in file_config.get('validators') or []:
+        columns = validator.get('columns') if isinstance(validator, dict) else None
+        if isinstance(columns, dict):
+            files.update(spec['file'] for spec in columns.values() if isinstance(spec, dict) and 'file' in spec)
+    versions = []
+    for path in sorted(files):
+        try:
+            stat = os.stat(path)
+            versions.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            versions.append([os.path.abspath(path), None, None])
+    return versions
+
+def config_hash(file_config: Dict[str, Any], code_hash: Optional[str] = None) -> str:
+    """
+    Hash of a file's section of validation_config.yaml, the reference files
+    it names and the validator code.
+    """
+    text = json.dumps([file_config, _input_versions(file_config)], sort_keys=True, default=str) \
+        + (code_hash or _code_hash())
+    return hashlib.blake2b(text.encode(), digest_size=16).hexdigest()
+
+class ResultCache:
+    """
+    Verdicts of previous runs, stored in SQLite and keyed by file path.
+
+    An entry is reused only while the file's size, contents, its section of
+    validation_config.yaml, the reference files it names and the validator
+    code are all unchanged. If only the mtime moved (e.g. the feed re-copied
+    an identical file), the contents (or, for append-only feeds, their edges)
+    are rehashed to confirm before the entry is reused.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.code_hash = _code_hash()
+        self.conn = sqlite3.connect(db_path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, content_hash TEXT,"
+            " config_hash TEXT, errors TEXT, validated_at REAL)"
+        )
+        self.conn.commit()
+
+    def config_hash(self, file_config: Dict[str, Any]) -> str:
+        return config_hash(file_config, self.code_hash)
+
+    def get(self, file_path: str, file_config: Dict[str, Any]) -> Optional[List[ValidationError]]:
+        """Returns the cached errors for an unchanged file, or None."""
+        path = os.path.abspath(file_path)
+        row = self.conn.execute(
+            "SELECT size, mtime_ns, content_hash, config_hash, errors FROM results WHERE path = ?", (path,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        size, mtime_ns, content_hash, config_hash, errors = row
+        stat = os.stat(path)
+        if size != stat.st_size or config_hash != self.config_hash(file_config):
+            return None
+        if mtime_ns != stat.st_mtime_ns:
+            if content_hash.startswith(EDGES):
+                current_hash = _edges_hash(path, stat.st_size)
+            else:
+                current_hash = _content_hash(path)
+            if current_hash != content_hash:
+                return None
+            self.conn.execute("UPDATE results SET mtime_ns = ? WHERE path = ?", (stat.st_mtime_ns, path))
+            self.conn.commit()
+        return [ValidationError.from_dict(error) for error in json.loads(errors)]
+
+    def put(self, file_path: str, file_config: Dict[str, Any], file_print: Fingerprint,
+            errors: List[ValidationError]) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (os.path.abspath(file_path), file_print.size, file_print.mtime_ns, file_print.content_hash,
+             self.config_hash(file_config), json.dumps([error.to_dict() for error in errors], default=str),
+             time.time()),
+        )
+        self.conn.commit()
+
+    def prune(self, file_paths: Iterable[str]) -> None:
+        """Drops entries for files that are no longer present."""
+        keep = {os.path.abspath(p) for p in file_paths}
+        stale = [(path,) for (path,) in self.conn.execute("SELECT path FROM results") if path not in keep]
+        self.conn.executemany("DELETE FROM results WHERE path = ?", stale)
+        self.conn.commit()
+
+    def close(self) -> None:
+        self.conn.close()
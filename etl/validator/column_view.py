@@ -0,0 +1,150 @@
+from functools import cached_property
+from typing import Dict, Optional
+import numpy as np
+import pandas as pd
+from .duplicate_index import canonical_keys
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except ImportError:  # Arrow-backed columns only exist when pyarrow is installed
+    pa = None
+
+# 10**1 .. 10**19, for counting the digits of 64-bit integers
+_POWERS_OF_TEN = 10 ** np.arange(1, 20, dtype=np.uint64)
+
+# Python writes floats at or above this magnitude in exponent form ('1e+16')
+_FLOAT_EXPONENT_FORM = 1e16
+
+def _int_text_lengths(values: np.ndarray) -> np.ndarray:
+    """len(str(v)) for each int64 value, without building the strings."""
+    magnitude = np.abs(values).astype(np.uint64)
+    return np.searchsorted(_POWERS_OF_TEN, magnitude, side='right') + 1 + (values < 0)
+
+def _numeric_text_lengths(values: pd.Series) -> pd.Series:
+    """
+    len(str(v)) for a non-null int or float Series.
+
+    Whole floats below 1e16 are written as '<int>.0', so their length follows
+    from the integer part; anything else falls back to formatting.
+    """
+    if pd.api.types.is_integer_dtype(values):
+        return pd.Series(_int_text_lengths(values.to_numpy(dtype=np.int64)), index=values.index)
+
+    floats = values.to_numpy(dtype=np.float64)
+    with np.errstate(invalid='ignore'):
+        whole = (floats % 1 == 0) & (np.abs(floats) < _FLOAT_EXPONENT_FORM)
+    ints = floats[whole].astype(np.int64)
+    lengths = np.empty(len(floats), dtype=np.int64)
+    # +2 for '.0', +1 more for the sign of -0.0
+    lengths[whole] = _int_text_lengths(ints) + 2 + (np.signbit(floats[whole]) & (ints == 0))
+    if not whole.all():
+        lengths[~whole] = values[~whole].astype(str).str.len().to_numpy()
+    return pd.Series(lengths, index=values.index)
+
+def is_arrow_string(series: pd.Series) -> bool:
+    """True for Arrow-backed text: pd.ArrowDtype strings or 'string[pyarrow]'."""
+    dtype = series.dtype
+    if isinstance(dtype, pd.ArrowDtype):
+        return pa.types.is_string(dtype.pyarrow_dtype) or pa.types.is_large_string(dtype.pyarrow_dtype)
+    return isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow'
+
+def _arrow_cast_numeric(series: pd.Series) -> Optional[pd.Series]:
+    """
+    Parses Arrow text as int64, else float64, natively in Arrow.
+
+    Returns None if some value isn't a number; the caller then falls back to
+    pd.to_numeric to find which. Clean columns, the common case, stay fast.
+    """
+    values = pa.array(series)
+    for target in (pa.int64(), pa.float64()):
+        try:
+            return pd.Series(pd.arrays.ArrowExtensionArray(pc.cast(values, target)), index=series.index)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return None
+
+class ColumnView:
+    """
+    One column of a chunk plus the conversions rules need, each computed at most once.
+
+    ValidationPlan hands the same view to every rule configured on a column, so
+    e.g. a datatype and a length check on it share the null mask, and lengths
+    of numeric columns come straight from the parsed values.
+    """
+
+    def __init__(self, series: pd.Series):
+        self.series = series
+        self._datetimes: Dict[Optional[str], pd.Series] = {}
+
+    @cached_property
+    def notna(self) -> pd.Series:
+        return self.series.notna()
+
+    @cached_property
+    def numeric(self) -> pd.Series:
+        if is_arrow_string(self.series):
+            parsed = _arrow_cast_numeric(self.series)
+            if parsed is not None:
+                return parsed
+            # Arrow keeps unparseable values as NaN rather than null, which isna() misses
+            coerced = pd.to_numeric(self.series, errors='coerce')
+            return pd.Series(coerced.to_numpy(dtype=np.float64, na_value=np.nan), index=self.series.index)
+        return pd.to_numeric(self.series, errors='coerce')
+
+    @cached_property
+    def non_numeric(self) -> pd.Series:
+        """True where a value is present but doesn't parse as a number."""
+        return self.numeric.isna() & self.notna
+
+    @cached_property
+    def fractional(self) -> pd.Series:
+        """
+        For columns whose values parse as floats, True where a value is a
+        number but not a whole one. Missing values and values that aren't
+        numbers at all (see non_numeric) are not fractional.
+        """
+        floats = self.numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            fractional = pd.Series(floats % 1 != 0, index=self.series.index)
+        return fractional & self.notna & ~self.non_numeric
+
+    @cached_property
+    def text(self) -> pd.Series:
+        """
+        Each non-null value as text, indexed by the non-null rows. Columns read
+        as str keep their values as written; parsed numeric ones are written
+        back as canonical_keys() does, so a whole float 7.0 reads as '7'.
+        """
+        values = self.series[self.notna]
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+            return canonical_keys(values)
+        if not isinstance(values.dtype, pd.StringDtype) and not is_arrow_string(values):
+            values = values.astype(str)
+        return values
+
+    @cached_property
+    def keys(self) -> pd.Series:
+        """
+        Each non-null value as canonical_keys() writes it, indexed by the
+        non-null rows: text that is a number reads as that number, so '7.0',
+        '007' and 7 all match '7', however the column was read.
+        """
+        return canonical_keys(self.series, self.numeric)[self.notna]
+
+    def datetimes(self, fmt: Optional[str] = None) -> pd.Series:
+        """Values parsed as datetimes with an optional strptime format; NaT where they don't parse."""
+        if fmt not in self._datetimes:
+            self._datetimes[fmt] = pd.to_datetime(self.series, format=fmt, errors='coerce')
+        return self._datetimes[fmt]
+
+    @cached_property
+    def lengths(self) -> pd.Series:
+        """String length of each non-null value, indexed by the non-null rows."""
+        values = self.series[self.notna]
+        if pd.api.types.is_integer_dtype(values) or pd.api.types.is_float_dtype(values):
+            # Numeric columns are measured from their values instead of formatting each one
+            return _numeric_text_lengths(values)
+        if not isinstance(values.dtype, pd.StringDtype) and not is_arrow_string(values):
+            values = values.astype(str)
+        return values.str.len()
@@ -0,0 +1,120 @@
+"""
+Watch mode for main.py: validates files in etl/data as they land.
+
+The process stays up, so the interpreter, pandas, FileValidators (one per
+configured file) and shared reference indexes stay warm between files, and a
+file is validated as soon as it is fully written rather than on the next cron
+tick. validation_config.yaml is reloaded when it changes; files whose section
+changed are validated again.
+"""
+import argparse
+import json
+import os
+import signal
+from typing import Any, Dict, Optional, Tuple
+from validator.cache import ResultCache, fingerprint
+from validator.file_validator import FileValidator
+from validator.main import DATA_PATTERNS, data_files, find_config, load_config, print_result
+from validator.report import append_report, file_record
+from validator.watcher import DirectoryWatcher
+
+def run(args: argparse.Namespace, etl_dir: str, data_dir: str, config_path: str, config: Dict[str, Any]) -> None:
+    if args.workers > 1:
+        print("Warning: --watch validates one file at a time; ignoring --workers")
+    report = args.report
+    if report and (args.report_format or ('parquet' if report.endswith('.parquet') else 'jsonl')) != 'jsonl':
+        print("Warning: --watch only writes JSON lines reports; ignoring --report")
+        report = None
+
+    cache = None
+    state_dir = None
+    if not args.no_cache:
+        state_dir = os.path.join(etl_dir, '.validation_state')
+        cache = ResultCache(args.cache or os.path.join(etl_dir, '.validation_cache.sqlite'))
+
+    config = config or {}
+    config_version = _version(config_path)
+    # File name -> its config section (as JSON) and the FileValidator built from it
+    validators: Dict[str, Tuple[str, FileValidator]] = {}
+
+    # Service managers stop daemons with SIGTERM; shut down as on Ctrl+C
+    signal.signal(signal.SIGTERM, _interrupt)
+
+    watcher = DirectoryWatcher(data_dir, DATA_PATTERNS, settle=args.settle)
+    how = "inotify" if watcher.uses_inotify else f"polling every {args.poll_interval:g}s"
+    print(f"Watching {data_dir} for CSV and Parquet files ({how}). Press Ctrl+C to stop.")
+    try:
+        while True:
+            version = _version(config_path)
+            if version != config_version:
+                config_version = version
+                try:
+                    new_config = load_config(config_path) or {}
+                except Exception as e:
+                    print(f"Warning: Could not reload configuration, keeping the previous one: {str(e)}")
+                else:
+                    # Keys may be glob patterns, so compare the section each file resolves to
+                    changed = [path for path in data_files(data_dir)
+                               if _section(find_config(config, os.path.basename(path)))
+                               != _section(find_config(new_config, os.path.basename(path)))]
+                    config = new_config
+                    print(f"\nReloaded configuration from {config_path}")
+                    for path in changed:
+                        validators.pop(os.path.basename(path), None)
+                    watcher.rescan(changed)
+
+            for file_path in watcher.poll(args.poll_interval):
+                try:
+                    _validate(file_path, config, validators, cache, state_dir, report)
+                except Exception as e:
+                    # One bad file must not take the watcher down
+                    print(f"Error validating {os.path.basename(file_path)}: {str(e)}")
+    except KeyboardInterrupt:
+        print("\nStopped watching.")
+    finally:
+        watcher.close()
+        if cache:
+            cache.close()
+
+def _validate(file_path: str, config: Dict[str, Any], validators: Dict[str, Tuple[str, FileValidator]],
+              cache: Optional[ResultCache], state_dir: Optional[str], report: Optional[str]) -> None:
+    file_name = os.path.basename(file_path)
+    print(f"\nProcessing {file_name}...")
+    file_config = find_config(config, file_name)
+    if file_config is None:
+        print(f"No configuration found for {file_name}, skipping.")
+        return
+
+    stats = None
+    errors = cache.get(file_path, file_config) if cache else None
+    if errors is not None:
+        print("Unchanged since last run, using cached result.")
+        status = 'cached'
+    else:
+        section = _section(file_config)
+        if file_name not in validators or validators[file_name][0] != section:
+            validators[file_name] = (section, FileValidator(file_config, state_dir))
+        validator = validators[file_name][1]
+        file_print = fingerprint(file_path, append_only=validator.resumes(file_path)) if cache else None
+        errors = validator.validate_file(file_path)
+        stats = validator.stats
+        if cache:
+            cache.put(file_path, file_config, file_print, errors)
+        status = 'failed' if errors else 'passed'
+
+    print_result(file_name, errors)
+    if report:
+        append_report(report, file_record(file_path, status, errors, stats))
+
+def _interrupt(signum, frame) -> None:
+    raise KeyboardInterrupt
+
+def _section(file_config: Any) -> str:
+    return json.dumps(file_config, sort_keys=True, default=str)
+
+def _version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
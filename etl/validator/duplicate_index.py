@@ -0,0 +1,137 @@
+import os
+import shutil
+import tempfile
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+
+# Whole floats at or above this magnitude may not be the integer written
+_EXACT_FLOAT_INTS = 2.0 ** 53
+
+def canonical_keys(s: pd.Series, numeric: Optional[pd.Series] = None) -> pd.Series:
+    """
+    Returns the text form of a key column, writing whole floats as ints.
+
+    Chunks of the same file can infer different dtypes for a column (int,
+    float once a chunk holds a blank, text once it holds a word or when a rule
+    reads the column as written), so keys are compared by text, and text that
+    is a number is written as that number would be: '7.0', '007' and 7 all
+    read '7'. numeric is s already parsed with pd.to_numeric, if at hand.
+    """
+    out = s.astype(str)
+    if pd.api.types.is_integer_dtype(s):
+        return out.where(s.notna())
+    if pd.api.types.is_float_dtype(s):
+        floats = s.to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore'):
+            whole = floats % 1 == 0
+        out[whole] = floats[whole].astype(np.int64).astype(str)
+        return out.where(s.notna())
+
+    if numeric is None:
+        numeric = pd.to_numeric(s, errors='coerce')
+    if pd.api.types.is_integer_dtype(numeric):
+        out[:] = numeric.astype(str).to_numpy()
+    else:
+        floats = numeric.to_numpy(dtype=np.float64, na_value=np.nan)
+        parsed = ~np.isnan(floats) & s.notna().to_numpy()
+        with np.errstate(invalid='ignore'):
+            whole = parsed & (floats % 1 == 0) & (np.abs(floats) < _EXACT_FLOAT_INTS)
+            fractional = parsed & (floats % 1 != 0)
+        out[whole] = floats[whole].astype(np.int64).astype(str)
+        out[fractional] = floats[fractional].astype(str)
+    return out.where(s.notna())
+
+def hash_keys(df: pd.DataFrame, columns: List[str]) -> np.ndarray:
+    """Hashes the given key columns of each row into one uint64 per row."""
+    keys = pd.DataFrame({col: canonical_keys(df[col]) for col in columns})
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy()
+
+class HashedKeyIndex:
+    """
+    Compact set of 64-bit key hashes that remembers which were seen more than once.
+
+    In memory, distinct hashes live in one sorted uint64 array (8 bytes per key)
+    and incoming hashes are buffered and merged in batches. With spill_dir set,
+    hashes are appended to `partitions` files on disk instead and each partition
+    is deduplicated on its own, so only one partition has to fit in memory.
+    """
+
+    # Smallest batch of buffered hashes worth a merge
+    MIN_BUFFER = 1_000_000
+
+    def __init__(self, spill_dir: Optional[str] = None, partitions: int = 16):
+        self.partitions = partitions
+        self._seen = np.empty(0, dtype=np.uint64)
+        self._dups = np.empty(0, dtype=np.uint64)
+        self._buffer: List[np.ndarray] = []
+        self._buffered = 0
+        self._spill_path = None
+        if spill_dir:
+            os.makedirs(spill_dir, exist_ok=True)
+            self._spill_path = tempfile.mkdtemp(prefix='dupkeys_', dir=spill_dir)
+
+    def add(self, hashes: np.ndarray) -> None:
+        if self._spill_path:
+            self._spill(hashes)
+            return
+        self._buffer.append(hashes)
+        self._buffered += len(hashes)
+        # Merging once the buffer is as large as the set keeps the total cost O(n log n)
+        if self._buffered >= max(self.MIN_BUFFER, len(self._seen)):
+            self._merge()
+
+    def duplicates(self) -> np.ndarray:
+        """Returns the sorted hashes that were added more than once."""
+        if not self._spill_path:
+            self._merge()
+            return self._dups
+
+        dups = []
+        for part in range(self.partitions):
+            path = self._partition_path(part)
+            if os.path.exists(path):
+                values, counts = np.unique(np.fromfile(path, dtype=np.uint64), return_counts=True)
+                dups.append(values[counts > 1])
+        return np.sort(np.concatenate(dups)) if dups else self._dups
+
+    def snapshot(self) -> np.ndarray:
+        """Returns the sorted distinct hashes seen so far, to be passed to restore()."""
+        if self._spill_path:
+            raise NotImplementedError("a spilled key index cannot be snapshotted")
+        self._merge()
+        return self._seen
+
+    def restore(self, seen: np.ndarray, duplicates: np.ndarray) -> None:
+        self._seen = seen
+        self._dups = duplicates
+        self._buffer = []
+        self._buffered = 0
+
+    def close(self) -> None:
+        """Releases memory and removes any spill files."""
+        self._seen = self._dups = np.empty(0, dtype=np.uint64)
+        self._buffer = []
+        self._buffered = 0
+        if self._spill_path:
+            shutil.rmtree(self._spill_path, ignore_errors=True)
+            self._spill_path = None
+
+    def _merge(self) -> None:
+        if not self._buffer:
+            return
+        # _seen holds each hash once, so any count above one is a repeat
+        values, counts = np.unique(np.concatenate([self._seen] + self._buffer), return_counts=True)
+        self._dups = np.union1d(self._dups, values[counts > 1])
+        self._seen = values
+        self._buffer = []
+        self._buffered = 0
+
+    def _partition_path(self, part: int) -> str:
+        return os.path.join(self._spill_path, f"part_{part:04d}.bin")
+
+    def _spill(self, hashes: np.ndarray) -> None:
+        parts = hashes % np.uint64(self.partitions)
+        for part in np.unique(parts):
+            with open(self._partition_path(int(part)), 'ab') as f:
+                hashes[parts == part].tofile(f)
@@ -0,0 +1,58 @@
+from typing import Any, Dict, List, NamedTuple, Union
+
+class ValidationError(NamedTuple):
+    """
+    One failed check, kept structured until it is reported.
+
+    Validators record counts and a capped sample of row indices with vectorized
+    operations; the message is only formatted from `template` by str(), so a
+    file with millions of bad rows never builds millions of strings.
+    """
+    # Name of the validator class that reported it
+    validator: str
+    # What failed, e.g. 'non-integer', 'too long', 'duplicate key', 'missing column'
+    check: str
+    columns: List[str]
+    # Rows that failed the check (for duplicate keys, occurrences of the key)
+    count: int = 0
+    # First offending row indices, up to the validator's sample size
+    sample: List[int] = []
+    # Extra values for the template, e.g. the max length or the duplicated key
+    params: Dict[str, Any] = {}
+    # str.format template; may use any field above, `column` (the first
+    # column) and the keys of params
+    template: str = "{message}"
+
+    def __str__(self) -> str:
+        return self.template.format(
+            validator=self.validator,
+            check=self.check,
+            columns=self.columns,
+            column=self.columns[0] if self.columns else None,
+            count=self.count,
+            sample=list(self.sample),
+            **self.params,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Returns a JSON-serializable dict, the inverse of from_dict()."""
+        return {
+            'validator': self.validator,
+            'check': self.check,
+            'columns': list(self.columns),
+            'count': int(self.count),
+            'sample': list(self.sample),
+            'params': dict(self.params),
+            'template': self.template,
+        }
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> 'ValidationError':
+        return cls(**d)
+
+def message(validator: str, text: str, check: str = 'message') -> ValidationError:
+    """Wraps a plain error message, e.g. from a validator that returns strings."""
+    return ValidationError(validator, check, [], params={'message': text})
+
+def as_error(validator: str, error: Union[ValidationError, str]) -> ValidationError:
+    return error if isinstance(error, ValidationError) else message(validator, str(error))
@@ -1,47 +1,292 @@
+import io
+import time
 import pandas as pd
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 from .base_validator import BaseValidator
-from .validators import DuplicateRowValidator, DataTypeValidator, LengthValidator
+from .cache import config_hash
+from .errors import ValidationError
+from .incremental import (AppendState, ByteRange, edge_hashes, last_complete_line, load_append_state,
+                          read_header, save_append_state)
+from .planner import ValidationPlan
+from .prescan import can_scan, scan_csv
+from .readers import BACKENDS, ArrowCsvReader, CsvReader, PandasCsvReader, ParquetReader, compression, is_parquet
+from . import registry
+from .report import FileStats, peak_memory, reset_peak_memory
+
+# Rows per chunk when a file is validated in streaming mode
+DEFAULT_CHUNKSIZE = 100_000
 
 class FileValidator:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], state_dir: Optional[str] = None):
         self.config = config
+        # 'memory' loads the whole file at once; 'stream' reads it in chunks
+        # of `chunksize` rows so peak memory doesn't grow with the file.
+        self.mode = config.get('mode', 'memory')
+        if self.mode not in ('memory', 'stream'):
+            print(f"Warning: Unknown mode '{self.mode}', using 'memory'")
+            self.mode = 'memory'
+        # Append-only feeds can be validated incrementally: validator state and
+        # the byte offset reached are saved in state_dir, and the next run only
+        # parses rows appended since. Incremental runs always stream.
+        self.incremental = bool(config.get('incremental', False)) and state_dir is not None
+        self.state_dir = state_dir
+        self.chunksize = int(config.get('chunksize', DEFAULT_CHUNKSIZE))
+        # Failing values after which the rest of the file is not read
+        self.max_errors = int(config['max_errors']) if config.get('max_errors') is not None else None
+        # With prescan, value lengths of length-only columns are measured over
+        # the raw bytes of the file instead of parsing those columns
+        self.prescan = bool(config.get('prescan', False))
+        self.reader = self._initialize_reader()
+        # Created on the first Parquet file
+        self._parquet_reader: Optional[ParquetReader] = None
         self.validators = self._initialize_validators()
+        self.usecols, self.dtypes = self._read_hints()
+        self.scan_columns = self._scan_columns()
+        # Validators such as StructureValidator only ever read the pre-scan
+        self.scan_only = [v for v in self.validators if v.reads_scan and v.required_columns() == []]
+        # Timings, rows and peak memory of the last validate_file() call
+        self.stats: Optional[FileStats] = None
+
+    def _initialize_reader(self) -> CsvReader:
+        backend = self.config.get('backend', 'pandas')
+        if backend not in BACKENDS:
+            print(f"Warning: Unknown backend '{backend}', using 'pandas'")
+            backend = 'pandas'
+        try:
+            return BACKENDS[backend]()
+        except ImportError as e:
+            print(f"Warning: {str(e)}, using 'pandas'")
+            return PandasCsvReader()
+
+    def _reader_for(self, file_path: str) -> CsvReader:
+        """The configured CSV backend, or a ParquetReader for .parquet files."""
+        if not is_parquet(file_path):
+            return self.reader
+        if self._parquet_reader is None:
+            self._parquet_reader = ParquetReader(arrow_dtypes=isinstance(self.reader, ArrowCsvReader))
+        return self._parquet_reader
 
     def _initialize_validators(self) -> List[BaseValidator]:
         validators = []
         validator_configs = self.config.get('validators', [])
-        
+
         for v_conf in validator_configs:
             v_type = v_conf.get('type')
-            if v_type == 'duplicate':
-                validators.append(DuplicateRowValidator(v_conf['columns']))
-            elif v_type == 'datatype':
-                validators.append(DataTypeValidator(v_conf['columns']))
-            elif v_type == 'length':
-                validators.append(LengthValidator(v_conf['columns']))
-            else:
+            try:
+                validator_cls = registry.get(v_type)
+            except KeyError:
                 print(f"Warning: Unknown validator type '{v_type}'")
-        
+                continue
+            except ImportError as e:
+                print(f"Warning: Could not load validator type '{v_type}': {str(e)}")
+                continue
+            validator = validator_cls.from_config(v_conf)
+            if v_conf.get('max_errors') is not None:
+                validator.max_errors = int(v_conf['max_errors'])
+            validators.append(validator)
+
         return validators
 
-    def validate_file(self, file_path: str) -> List[str]:
+    def _read_hints(self) -> Tuple[Optional[Set[str]], Dict[str, Any]]:
+        """
+        Derives read_csv usecols and dtypes from the configured validators, so
+        columns no rule looks at are never parsed.
+
+        Returns:
+            The set of columns to read (None for all of them) and dtype hints.
+            Explicit `dtypes` in the file's config override derived hints.
+        """
+        usecols: Optional[Set[str]] = set()
+        text: Set[str] = set()
+        for validator in self.validators:
+            required = validator.required_columns()
+            if required is None:
+                usecols = None
+                continue
+            if usecols is not None:
+                usecols.update(required)
+            text.update(validator.text_columns())
+
+        # A column some rule checks as written is read as str whatever other
+        # rules it has, so its values never depend on the rest of the config;
+        # those rules parse the text themselves (ColumnView.numeric)
+        dtypes: Dict[str, Any] = {col: str for col in text}
+        dtypes.update(self.config.get('dtypes') or {})
+        return usecols, dtypes
+
+    def _scan_columns(self) -> Set[str]:
+        """
+        Columns that can be left to the pre-scan: read as text (no explicit
+        dtype) and only needed by validators that accept scanned lengths.
+        """
+        if not self.prescan:
+            return set()
+        explicit = set(self.config.get('dtypes') or {})
+        columns = {col for col, hint in self.dtypes.items() if hint is str and col not in explicit}
+        for validator in self.validators:
+            required = validator.required_columns()
+            if required is None:
+                return set()
+            columns -= set(required) - set(validator.scan_columns())
+        return columns
+
+    def _scan_plan(self, file_path: str) -> Optional[Set[str]]:
+        """The columns to measure in a pre-scan of file_path, or None if it isn't pre-scanned."""
+        if not self.scan_columns and not self.scan_only:
+            return None
+        if not can_scan(file_path):
+            if self.scan_only:
+                print(f"Warning: structure checks need an uncompressed CSV file, skipping them for {file_path}")
+            return None
+        return self.scan_columns
+
+    def _usecols(self, plan: ValidationPlan) -> Optional[Set[str]]:
+        # Columns measured by the pre-scan are not parsed
+        if plan.scan_columns is None or self.usecols is None:
+            return self.usecols
+        return self.usecols - plan.scan_columns
+
+    def validate_file(self, file_path: str) -> List[ValidationError]:
+        plan = ValidationPlan(self.validators, streaming=self.mode == 'stream' or self.incremental,
+                              scan_columns=self._scan_plan(file_path))
+        reset_peak_memory()
+        started = time.perf_counter()
+        errors = self._validate(file_path, plan)
+        self.stats = FileStats(plan.rows, time.perf_counter() - started, peak_memory(), plan.validator_stats())
+        return errors
+
+    def resumes(self, file_path: str) -> bool:
+        """Whether runs over file_path only parse rows appended since the last one."""
+        # Byte offsets into a compressed or Parquet file can't be resumed from
+        return self.incremental and not is_parquet(file_path) and compression(file_path) is None
+
+    def _validate(self, file_path: str, plan: ValidationPlan) -> List[ValidationError]:
+        if self.resumes(file_path):
+            return self._validate_incremental(file_path, plan)
+        if self.incremental:
+            print(f"Warning: incremental validation needs a plain CSV file, validating {file_path} in full")
+            return self._validate_stream(file_path, plan)
+        if self.mode == 'stream':
+            return self._validate_stream(file_path, plan)
+
         try:
+            if not self._prescan(file_path, plan):
+                return self._finish(plan, stopped=True)
+            if not plan.needs_rows:
+                return self._finish(plan)
             # Read CSV
-            # Using dtype=str to preserve original format for validation (e.g. leading zeros, etc)
-            # But for DataType validation we might want to infer, or handle inside validator.
-            # Let's read as default and let validators handle types, or read as object.
-            # Reading as object is safer for length validation.
-            df = pd.read_csv(file_path)
+            # Only columns some validator needs are parsed. Columns that are only
+            # length-checked are read as str to preserve the original format
+            # (e.g. leading zeros); the rest are inferred and validators handle types.
+            df = self._reader_for(file_path).read(file_path, self._usecols(plan), self.dtypes)
         except Exception as e:
-            return [f"Error reading file {file_path}: {str(e)}"]
+            return [read_error(file_path, e)]
 
-        all_errors = []
-        for validator in self.validators:
-            try:
-                errors = validator.validate(df)
-                all_errors.extend(errors)
-            except Exception as e:
-                all_errors.append(f"Validator {type(validator).__name__} failed: {str(e)}")
-        
-        return all_errors
+        # The whole file is a single chunk
+        if self._consume(plan, df) and plan.second_pass_columns():
+            plan.consume_second_pass(df)
+        return self._finish(plan)
+
+    def _validate_stream(self, file_path: str, plan: ValidationPlan) -> List[ValidationError]:
+        stopped = False
+        try:
+            if not self._prescan(file_path, plan):
+                return self._finish(plan, stopped=True)
+            if not plan.needs_rows:
+                return self._finish(plan)
+            # Parquet files are read a row group at a time, compressed CSVs decompressed as they stream
+            reader = self._reader_for(file_path)
+            for chunk in reader.iter_chunks(file_path, self._usecols(plan), self.dtypes, self.chunksize):
+                if not self._consume(plan, chunk):
+                    stopped = True
+                    break
+            else:
+                # Validators such as DuplicateRowValidator may need another look at a few columns
+                usecols = plan.second_pass_columns()
+                if usecols:
+                    for chunk in reader.iter_chunks(file_path, set(usecols), self.dtypes, self.chunksize):
+                        plan.consume_second_pass(chunk)
+        except Exception as e:
+            return [read_error(file_path, e)]
+
+        return self._finish(plan, stopped)
+
+    def _validate_incremental(self, file_path: str, plan: ValidationPlan) -> List[ValidationError]:
+        try:
+            state = load_append_state(self.state_dir, file_path, self.config)
+            if state is not None:
+                plan.load_state(state.validators)
+                header, header_line, start, rows = state.header, state.header_line, state.offset, state.rows
+            else:
+                header, header_line = read_header(file_path)
+                start, rows = len(header_line), 0
+            end = max(last_complete_line(file_path), start)
+
+            scanned_rows = plan.rows
+            stopped = not self._prescan(file_path, plan, start, end, rows)
+            if not plan.needs_rows:
+                rows += plan.rows - scanned_rows
+            with open(file_path, 'rb') as f:
+                # Nothing appended since the last run leaves no rows to parse
+                if end > start and not stopped and plan.needs_rows:
+                    tail = io.BufferedReader(ByteRange(f, start, end, prefix=header_line))
+                    for chunk in self.reader.iter_chunks(tail, self._usecols(plan), self.dtypes, self.chunksize,
+                                                         names=header, first_row=rows):
+                        rows += len(chunk)
+                        if not self._consume(plan, chunk):
+                            stopped = True
+                            break
+
+                # Keys that first repeat in the new rows may have their first
+                # occurrence earlier in the file, so the second pass covers it all
+                usecols = None if stopped else plan.second_pass_columns()
+                if usecols:
+                    body = io.BufferedReader(ByteRange(f, len(header_line), end, prefix=header_line))
+                    for chunk in self.reader.iter_chunks(body, set(usecols), self.dtypes, self.chunksize, names=header):
+                        plan.consume_second_pass(chunk)
+        except Exception as e:
+            return [read_error(file_path, e)]
+
+        # A run stopped by an error budget has not seen every row, so it saves nothing
+        states = None if stopped else plan.save_state()
+        if states is not None:
+            prefix_hash, edge_hash = edge_hashes(file_path, end)
+            save_append_state(self.state_dir, file_path, AppendState(
+                header, header_line, end, rows, prefix_hash, edge_hash, config_hash(self.config), states,
+            ))
+        return self._finish(plan, stopped)
+
+    def _prescan(self, file_path: str, plan: ValidationPlan, start: Optional[int] = None,
+                 end: Optional[int] = None, first_row: int = 0) -> bool:
+        """Feeds the raw pre-scan of file_path, if planned, to the plan; False if validation stopped early."""
+        if plan.scan_columns is None:
+            return True
+        for chunk in scan_csv(file_path, sorted(plan.scan_columns), start, end, first_row):
+            plan.consume_scan(chunk)
+            if self._over_budget(plan):
+                return False
+        return True
+
+    def _consume(self, plan: ValidationPlan, chunk: pd.DataFrame) -> bool:
+        """Feeds a chunk to the plan; False once the rest of the file need not be read."""
+        plan.consume(chunk)
+        return not plan.done and not self._over_budget(plan)
+
+    def _over_budget(self, plan: ValidationPlan) -> bool:
+        return self.max_errors is not None and plan.error_count() > self.max_errors
+
+    def _finish(self, plan: ValidationPlan, stopped: bool = False) -> List[ValidationError]:
+        """Reports the plan's errors; stopped is True if reading ended before the end of the file."""
+        errors = plan.finish(stopped)
+        if self._over_budget(plan):
+            errors.append(ValidationError(
+                'FileValidator', 'error budget', [], plan.error_count(),
+                params={'rows': plan.rows, 'max_errors': self.max_errors},
+                template="Validation stopped after {rows} rows: {count} failing values exceed the file's "
+                         "budget of {max_errors}",
+            ))
+        return errors
+
+def read_error(file_path: str, e: Exception) -> ValidationError:
+    return ValidationError('FileValidator', 'read error', [], params={'file_path': file_path, 'message': str(e)},
+                           template="Error reading file {file_path}: {message}")
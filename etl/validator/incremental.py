@@ -0,0 +1,119 @@
+import csv
+import hashlib
+import io
+import os
+import pickle
+from typing import Any, BinaryIO, Dict, List, NamedTuple, Optional, Tuple
+from .cache import config_hash
+
+# Bytes hashed at the start and at the end of the validated region to notice a
+# file that was rewritten rather than appended to
+EDGE_BYTES = 64 * 1024
+
+class AppendState(NamedTuple):
+    header: List[str]
+    # Raw header line; data rows start just past it
+    header_line: bytes
+    # Byte offset just past the last row validated so far
+    offset: int
+    rows: int
+    prefix_hash: str
+    edge_hash: str
+    config_hash: str
+    # One entry per configured validator, from ValidationPlan.save_state()
+    validators: List[Any]
+
+class ByteRange(io.RawIOBase):
+    """
+    Read-only stream over bytes [start, end) of an open binary file, after
+    `prefix` (e.g. the header line, so the range parses as a CSV of its own).
+    """
+
+    def __init__(self, f: BinaryIO, start: int, end: int, prefix: bytes = b''):
+        self._f = f
+        self._f.seek(start)
+        self._prefix = prefix
+        self._left = end - start
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        if self._prefix:
+            n = min(len(b), len(self._prefix))
+            b[:n] = self._prefix[:n]
+            self._prefix = self._prefix[n:]
+            return n
+        n = min(len(b), self._left)
+        if n <= 0:
+            return 0
+        data = self._f.read(n)
+        b[:len(data)] = data
+        self._left -= len(data)
+        return len(data)
+
+def read_header(file_path: str) -> Tuple[List[str], bytes]:
+    """Returns the header's column names and the raw header line."""
+    with open(file_path, 'rb') as f:
+        line = f.readline()
+    return next(csv.reader([line.decode('utf-8-sig')]), []), line
+
+def last_complete_line(file_path: str) -> int:
+    """
+    Returns the byte offset just past the last newline. A writer may be midway
+    through the final line; it is picked up by the next run once complete.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        pos = size
+        while pos > 0:
+            start = max(0, pos - EDGE_BYTES)
+            f.seek(start)
+            block = f.read(pos - start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                return start + newline + 1
+            pos = start
+    return 0
+
+def edge_hashes(file_path: str, offset: int) -> Tuple[str, str]:
+    """Hashes of the first and last EDGE_BYTES before offset."""
+    with open(file_path, 'rb') as f:
+        head = f.read(min(offset, EDGE_BYTES))
+        f.seek(max(0, offset - EDGE_BYTES))
+        tail = f.read(offset - max(0, offset - EDGE_BYTES))
+    return (hashlib.blake2b(head, digest_size=16).hexdigest(),
+            hashlib.blake2b(tail, digest_size=16).hexdigest())
+
+def state_path(state_dir: str, file_path: str) -> str:
+    return os.path.join(state_dir, os.path.basename(file_path) + '.state')
+
+def load_append_state(state_dir: str, file_path: str, file_config: Dict[str, Any]) -> Optional[AppendState]:
+    """
+    Returns the saved state if file_path only grew since it was saved under
+    the same config, else None.
+    """
+    path = state_path(state_dir, file_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, 'rb') as f:
+            state = pickle.load(f)
+    except Exception:
+        return None
+
+    if not isinstance(state, AppendState) or state.config_hash != config_hash(file_config):
+        return None
+    if os.path.getsize(file_path) < state.offset:
+        return None
+    if edge_hashes(file_path, state.offset) != (state.prefix_hash, state.edge_hash):
+        return None
+    return state
+
+def save_append_state(state_dir: str, file_path: str, state: AppendState) -> None:
+    os.makedirs(state_dir, exist_ok=True)
+    path = state_path(state_dir, file_path)
+    # Write then rename, so a crash never leaves a half-written state behind
+    with open(path + '.tmp', 'wb') as f:
+        pickle.dump(state, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(path + '.tmp', path)
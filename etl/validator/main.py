@@ -1,14 +1,91 @@
+import argparse
+import fnmatch
 import os
 import yaml
 import glob
-from typing import Dict, Any
-from validator.file_validator import FileValidator
+from typing import Dict, Any, List, Optional, Tuple
+from validator.cache import Fingerprint, ResultCache, fingerprint
+from validator.errors import ValidationError, message
+from validator.report import FileStats, file_record, write_report
+
+# Files in etl/data that are validated: CSV, compressed CSV and Parquet
+DATA_PATTERNS = ('*.csv', '*.csv.gz', '*.csv.zst', '*.parquet')
 
 def load_config(config_path: str) -> Dict[str, Any]:
     with open(config_path, 'r') as f:
         return yaml.safe_load(f)
 
+def find_config(config: Dict[str, Any], file_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Returns the section of validation_config.yaml for a file: the one keyed by
+    its exact name, else the first whose key is a glob pattern matching it
+    (e.g. 'orders-*.csv.gz'), else None.
+    """
+    if file_name in config:
+        return config[file_name]
+    for key, file_config in config.items():
+        if any(c in key for c in '*?[') and fnmatch.fnmatchcase(file_name, key):
+            return file_config
+    return None
+
+def data_files(data_dir: str) -> List[str]:
+    """Paths of the files in data_dir matching DATA_PATTERNS, sorted."""
+    return sorted({path for pattern in DATA_PATTERNS for path in glob.glob(os.path.join(data_dir, pattern))})
+
+def validate_file(file_path: str, file_config: Dict[str, Any], with_fingerprint: bool = False,
+                  state_dir: Optional[str] = None
+                  ) -> Tuple[List[ValidationError], Optional[Fingerprint], Optional[FileStats]]:
+    # Module-level so it can be sent to a worker process.
+    # Imported here so a run with nothing to validate never loads pandas
+    from validator.file_validator import FileValidator
+
+    validator = FileValidator(file_config, state_dir)
+    # The fingerprint for the result cache is taken here, before validating,
+    # so hashing large files also runs in parallel
+    file_print = None
+    if with_fingerprint:
+        try:
+            file_print = fingerprint(file_path, append_only=validator.resumes(file_path))
+        except OSError:
+            pass
+    errors = validator.validate_file(file_path)
+    return errors, file_print, validator.stats
+
+def print_result(file_name: str, errors: List[ValidationError]) -> None:
+    if errors:
+        print(f"Validation FAILED for {file_name}:")
+        for error in errors:
+            print(f"  - {error}")
+    else:
+        print(f"Validation PASSED for {file_name}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Validate CSV and Parquet files in etl/data against "
+                                                 "validation_config.yaml")
+    parser.add_argument("--workers", type=int, default=1, help="Number of files to validate in parallel processes")
+    parser.add_argument("--cache", help="Result cache database (default: etl/.validation_cache.sqlite)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Revalidate every file in full, ignoring the result cache and incremental state")
+    parser.add_argument("--report", help="Also write a machine-readable report with per-file and per-validator "
+                                         "timings, rows/sec and peak memory (.jsonl or .parquet)")
+    parser.add_argument("--report-format", choices=['jsonl', 'parquet'],
+                        help="Report format (default: from the --report extension)")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running: validate files in etl/data as they are added or changed, "
+                             "reloading validation_config.yaml when it changes")
+    parser.add_argument("--poll-interval", type=float, default=2.0,
+                        help="With --watch, seconds between checks for changes (default: 2)")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="With --watch, seconds a file must stay unchanged before it counts as fully "
+                             "written, unless its writer is seen closing it (default: 1)")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
+    if args.workers < 1:
+        print("--workers must be at least 1.")
+        return
+
     # Paths
     base_dir = os.path.dirname(os.path.abspath(__file__))
     etl_dir = os.path.dirname(base_dir)
@@ -21,33 +98,94 @@ def main():
         return
 
     config = load_config(config_path)
+
+    if args.watch:
+        from validator.daemon import run
+        run(args, etl_dir, data_dir, config_path, config)
+        return
     
     # Iterate over files in data directory
-    csv_files = glob.glob(os.path.join(data_dir, "*.csv"))
+    csv_files = data_files(data_dir)
     
     if not csv_files:
-        print(f"No CSV files found in {data_dir}")
+        print(f"No CSV or Parquet files found in {data_dir}")
         return
 
-    print(f"Found {len(csv_files)} CSV files.")
+    print(f"Found {len(csv_files)} data files.")
+    # Section of the config for each file, by exact name or glob pattern
+    file_configs = {f: find_config(config, os.path.basename(f)) for f in csv_files}
 
-    for file_path in csv_files:
-        file_name = os.path.basename(file_path)
-        print(f"\nProcessing {file_name}...")
-        
-        if file_name in config:
-            file_config = config[file_name]
-            validator = FileValidator(file_config)
-            errors = validator.validate_file(file_path)
+    # Files unchanged since the last run, under the same config, reuse its verdict.
+    # Files configured as incremental keep their state in state_dir.
+    cache = None
+    cached = {}
+    state_dir = None
+    if not args.no_cache:
+        state_dir = os.path.join(etl_dir, '.validation_state')
+        cache = ResultCache(args.cache or os.path.join(etl_dir, '.validation_cache.sqlite'))
+        cache.prune(csv_files)
+        for file_path in csv_files:
+            if file_configs[file_path] is not None:
+                errors = cache.get(file_path, file_configs[file_path])
+                if errors is not None:
+                    cached[file_path] = errors
+
+    # With several workers, every file to validate is submitted up front, largest
+    # first so a big file doesn't start last and hold up the run. Results are
+    # still reported in file name order.
+    futures = {}
+    records = []
+    executor = None
+    if args.workers > 1:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = ProcessPoolExecutor(max_workers=args.workers)
+        pending = [f for f in csv_files if file_configs[f] is not None and f not in cached]
+        for file_path in sorted(pending, key=os.path.getsize, reverse=True):
+            futures[file_path] = executor.submit(
+                validate_file, file_path, file_configs[file_path], cache is not None, state_dir)
+
+    try:
+        for file_path in csv_files:
+            file_name = os.path.basename(file_path)
+            file_config = file_configs[file_path]
+            print(f"\nProcessing {file_name}...")
             
-            if errors:
-                print(f"Validation FAILED for {file_name}:")
-                for error in errors:
-                    print(f"  - {error}")
+            if file_config is not None:
+                stats = None
+                if file_path in cached:
+                    print("Unchanged since last run, using cached result.")
+                    errors = cached[file_path]
+                else:
+                    if executor:
+                        try:
+                            errors, file_print, stats = futures[file_path].result()
+                        except Exception as e:
+                            errors = [message('main', f"Worker failed while validating {file_name}: {str(e)}", 'failed')]
+                            file_print = None
+                    else:
+                        errors, file_print, stats = validate_file(
+                            file_path, file_config, cache is not None, state_dir)
+                    if cache and file_print:
+                        cache.put(file_path, file_config, file_print, errors)
+                
+                print_result(file_name, errors)
+                status = 'cached' if file_path in cached else 'failed' if errors else 'passed'
+                records.append(file_record(file_path, status, errors, stats))
             else:
-                print(f"Validation PASSED for {file_name}")
-        else:
-            print(f"No configuration found for {file_name}, skipping.")
+                print(f"No configuration found for {file_name}, skipping.")
+                records.append(file_record(file_path, 'skipped', [], None))
+
+        if args.report:
+            try:
+                write_report(args.report, records, args.report_format)
+                print(f"\nReport written to {args.report}")
+            except Exception as e:
+                print(f"Warning: Could not write report {args.report}: {str(e)}")
+    finally:
+        if executor:
+            executor.shutdown()
+        if cache:
+            cache.close()
 
 if __name__ == "__main__":
     main()
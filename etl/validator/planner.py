@@ -0,0 +1,231 @@
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+import pandas as pd
+from .base_validator import BaseValidator
+from .column_view import ColumnView
+from .errors import ValidationError, as_error
+from .prescan import ScanChunk
+from .report import ValidatorStats
+from .validators import ColumnValidator
+
+class ValidationPlan:
+    """
+    Runs all of a file's validators as one fused pass over its chunks.
+
+    Column-wise validators are grouped by column, so each column is pulled out
+    of the chunk and converted (numeric coercion, string lengths) once, and
+    every rule on it reads the shared ColumnView. Other validators see each
+    chunk whole. Errors are still reported in configuration order.
+
+    When the file is pre-scanned (scan_columns is not None), the rules on
+    scan_columns and validators that need no columns read the scan instead.
+    """
+
+    def __init__(self, validators: List[BaseValidator], streaming: bool, scan_columns: Optional[Set[str]] = None):
+        self.validators = validators
+        self.streaming = streaming
+        self.scan_columns = scan_columns
+        # column -> column-wise validators checking it, in configuration order
+        self._by_column: Dict[str, List[ColumnValidator]] = {}
+        self._whole_frame: List[BaseValidator] = []
+        self._skipped = set()
+        # Seconds spent in each validator's calls, and data rows consumed, in
+        # all and by each validator from parsed chunks and from pre-scans
+        self._seconds: Dict[int, float] = {}
+        self._rows: Dict[int, int] = {}
+        self._scan_rows: Dict[int, int] = {}
+        self._error_counts: Dict[int, int] = {}
+        self.rows = 0
+
+        for validator in validators:
+            if isinstance(validator, ColumnValidator):
+                for col in validator.columns:
+                    if col not in (scan_columns or ()):
+                        self._by_column.setdefault(col, []).append(validator)
+            elif validator.reads_scan and validator.required_columns() == []:
+                # Only fed pre-scans
+                continue
+            elif streaming and not validator.supports_streaming:
+                print(f"Warning: {type(validator).__name__} does not support streaming mode, skipping")
+                self._skipped.add(id(validator))
+            else:
+                self._whole_frame.append(validator)
+
+        self.start()
+
+    def start(self) -> None:
+        # A validator that raises is dropped for the rest of the file
+        self._failures: Dict[int, ValidationError] = {}
+        # So is one that exceeds its error budget, though its errors are kept
+        self._exhausted = set()
+        # Errors of validators that only support validate(df)
+        self._results: Dict[int, List[ValidationError]] = {}
+        self._second_pass: Dict[int, List[str]] = {}
+        for validator in self.validators:
+            if id(validator) not in self._skipped:
+                self._run(validator, validator.start)
+
+    def save_state(self) -> Optional[List[Any]]:
+        """
+        Returns each validator's state, in configuration order, for an
+        append-aware run to resume from. None if a validator failed or
+        cannot save its state, in which case the next run starts over.
+        """
+        if self._failures or self._exhausted:
+            return None
+        states = []
+        for validator in self.validators:
+            if id(validator) in self._skipped:
+                states.append(None)
+                continue
+            try:
+                states.append(validator.save_state())
+            except NotImplementedError:
+                return None
+        return states
+
+    def load_state(self, states: List[Any]) -> None:
+        self.start()
+        for validator, state in zip(self.validators, states):
+            if id(validator) not in self._skipped:
+                self._run(validator, validator.load_state, state)
+
+    def consume(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        fed = {}
+        for col, validators in self._by_column.items():
+            live = [v for v in validators if self._live(v)]
+            if not live:
+                continue
+            fed.update((id(v), v) for v in live)
+            if col not in chunk.columns:
+                for validator in live:
+                    validator.missing_column(col)
+                continue
+            view = ColumnView(chunk[col])
+            for validator in live:
+                self._run(validator, validator.check_column, col, view)
+
+        for validator in self._whole_frame:
+            if not self._live(validator):
+                continue
+            fed[id(validator)] = validator
+            if validator.supports_streaming:
+                self._run(validator, validator.consume, chunk)
+            else:
+                # Memory mode only, where the single chunk is the whole file
+                self._results[id(validator)] = self._run(validator, validator.validate, chunk) or []
+
+        for key in fed:
+            self._rows[key] = self._rows.get(key, 0) + len(chunk)
+        self._check_budgets()
+
+    def consume_scan(self, chunk: ScanChunk) -> None:
+        """Feeds one block of a raw pre-scan to the validators that read scans."""
+        if not self.needs_rows:
+            # No rows will be parsed, so the scan is what counts them
+            self.rows += len(chunk.rows)
+        for validator in self.validators:
+            if validator.reads_scan and id(validator) not in self._skipped and self._live(validator):
+                self._scan_rows[id(validator)] = self._scan_rows.get(id(validator), 0) + len(chunk.rows)
+                self._run(validator, validator.consume_scan, chunk)
+        self._check_budgets()
+
+    @property
+    def needs_rows(self) -> bool:
+        """False if every validator reads the pre-scan alone, so the file need not be parsed."""
+        return bool(self._by_column or self._whole_frame)
+
+    @property
+    def done(self) -> bool:
+        """True once no validator needs to see more rows."""
+        return all(
+            not self._live(validator) or id(validator) in self._results
+            for validator in self.validators if id(validator) not in self._skipped
+        )
+
+    def error_count(self) -> int:
+        """Failing values found so far by all validators, for the file's error budget."""
+        return sum(validator.error_count() for validator in self.validators if id(validator) not in self._skipped)
+
+    def second_pass_columns(self) -> List[str]:
+        """Returns the union of columns any validator wants to see again."""
+        for validator in self._whole_frame:
+            if not self._live(validator) or not validator.supports_streaming:
+                continue
+            columns = self._run(validator, validator.second_pass_columns)
+            if columns:
+                self._second_pass[id(validator)] = columns
+        return sorted({col for columns in self._second_pass.values() for col in columns})
+
+    def consume_second_pass(self, chunk: pd.DataFrame) -> None:
+        for validator in self._whole_frame:
+            columns = self._second_pass.get(id(validator))
+            if columns and self._live(validator):
+                self._run(validator, validator.consume_second_pass, chunk[columns])
+
+    def finish(self, stopped_early: bool = False) -> List[ValidationError]:
+        """
+        Returns every validator's errors. stopped_early is True if the file's
+        error budget stopped reading before its end.
+        """
+        all_errors = []
+        for validator in self.validators:
+            if id(validator) in self._skipped:
+                continue
+            if (stopped_early or id(validator) in self._exhausted) and id(validator) not in self._failures:
+                self._run(validator, validator.stopped_early)
+            if id(validator) not in self._failures:
+                if id(validator) in self._results:
+                    errors = self._results[id(validator)]
+                else:
+                    errors = self._run(validator, validator.finish)
+            if id(validator) in self._failures:
+                errors = [self._failures[id(validator)]]
+            else:
+                name = type(validator).__name__
+                errors = [as_error(name, error) for error in errors]
+                if id(validator) in self._exhausted:
+                    errors.append(ValidationError(
+                        name, 'error budget', [], validator.error_count(), params={'max_errors': validator.max_errors},
+                        template="{validator} stopped early: {count} failing values exceed its budget of {max_errors}",
+                    ))
+            self._error_counts[id(validator)] = len(errors)
+            all_errors.extend(errors)
+        return all_errors
+
+    def validator_stats(self) -> List[ValidatorStats]:
+        """Returns the rows fed to, time spent in and errors reported by each validator that ran."""
+        stats = []
+        for index, validator in enumerate(self.validators):
+            if id(validator) in self._skipped:
+                continue
+            # A rule on both scanned and parsed columns sees the same rows twice
+            rows = max(self._rows.get(id(validator), 0), self._scan_rows.get(id(validator), 0))
+            seconds = self._seconds.get(id(validator), 0.0)
+            stats.append(ValidatorStats(index, type(validator).__name__, rows, seconds,
+                                        rows / seconds if seconds > 0 else None,
+                                        self._error_counts.get(id(validator), 0)))
+        return stats
+
+    def _check_budgets(self) -> None:
+        for validator in self.validators:
+            if validator.max_errors is not None and self._live(validator) \
+                    and validator.error_count() > validator.max_errors:
+                self._exhausted.add(id(validator))
+
+    def _live(self, validator: BaseValidator) -> bool:
+        return id(validator) not in self._failures and id(validator) not in self._exhausted
+
+    def _run(self, validator: BaseValidator, method: Callable, *args):
+        started = time.perf_counter()
+        try:
+            return method(*args)
+        except Exception as e:
+            self._failures[id(validator)] = ValidationError(
+                type(validator).__name__, 'failed', [], params={'message': str(e)},
+                template="Validator {validator} failed: {message}",
+            )
+            return None
+        finally:
+            self._seconds[id(validator)] = self._seconds.get(id(validator), 0.0) + time.perf_counter() - started
@@ -0,0 +1,211 @@
+"""
+Raw pre-scan of a plain CSV file over a memory map.
+
+The bytes are tokenized with vectorized NumPy operations: a delimiter or
+newline is structural when an even number of quotes precede it, which holds
+for RFC 4180 quoting (including escaped "" pairs). Per-row field counts and
+the text length of the requested columns' values come straight from the
+separator positions, without building a Python or pandas string per value.
+"""
+import mmap
+import os
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from .incremental import read_header
+from .readers import compression, is_parquet
+
+# Bytes tokenized at a time; a block grows if a single row is longer
+SCAN_BLOCK = 4 << 20
+
+_QUOTE, _COMMA, _LF, _CR = ord('"'), ord(','), ord('\n'), ord('\r')
+
+# Values pandas reads as missing by default, so they are never length-checked
+NA_VALUES = ('', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+             '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null')
+_NA_MAX = max(len(v) for v in NA_VALUES)
+
+def _pack(values: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Packs fields of at most 8 bytes into one uint64 each, zero-padded."""
+    keys = np.zeros(len(starts), dtype=np.uint64)
+    for k in range(_NA_MAX):
+        take = lengths > k
+        keys[take] |= values[starts[take] + k].astype(np.uint64) << np.uint64(8 * k)
+    return keys
+
+def _na_keys() -> np.ndarray:
+    tokens = [v.encode() for v in NA_VALUES if v]
+    values = np.frombuffer(b''.join(tokens), dtype=np.uint8)
+    lengths = np.array([len(t) for t in tokens])
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+    return np.sort(_pack(values, starts, lengths))
+
+_NA_KEYS = _na_keys()
+
+# Whether a field could be an NA token, by its first byte and by its length
+_NA_FIRST = np.zeros(256, dtype=bool)
+_NA_FIRST[[v.encode()[0] for v in NA_VALUES if v]] = True
+_NA_LENGTH = np.zeros(_NA_MAX + 1, dtype=bool)
+_NA_LENGTH[[len(v) for v in NA_VALUES]] = True
+
+class ScanChunk(NamedTuple):
+    # Global row number of each data row (blank lines are skipped, as pandas does)
+    rows: np.ndarray
+    # Fields found in each row
+    field_counts: np.ndarray
+    # Fields in the header
+    expected_fields: int
+    # Per requested column, the text length of each row's value, -1 where it
+    # is missing; None if the header has no such column
+    lengths: Dict[str, Optional[np.ndarray]]
+    # True on the last chunk if its last row opens a quote that never closes
+    open_quote: bool = False
+
+def can_scan(file_path: str) -> bool:
+    """Only uncompressed CSV files can be memory-mapped and scanned."""
+    return not is_parquet(file_path) and compression(file_path) is None
+
+def scan_csv(file_path: str, columns: List[str], start: Optional[int] = None, end: Optional[int] = None,
+             first_row: int = 0, block_size: int = SCAN_BLOCK) -> Iterator[ScanChunk]:
+    """
+    Scans a CSV file's rows in blocks of about block_size bytes.
+
+    Args:
+        columns: Columns whose value lengths are measured. Lengths count
+            characters (UTF-8 continuation bytes are skipped) of the value
+            as pandas reads it: without enclosing quotes, with "" as one
+            character, and -1 for blanks and the NA_VALUES tokens.
+        start: Byte offset of the first data row (default: just past the header).
+        end: Byte offset just past the last row to scan (default: end of file).
+        first_row: Global row number of the row at start.
+    """
+    header, header_line = read_header(file_path)
+    positions = {col: i for i, col in enumerate(header)}
+    wanted = {col: positions.get(col) for col in columns}
+    start = len(header_line) if start is None else start
+    end = os.path.getsize(file_path) if end is None else end
+    if end <= start:
+        return
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        pos, row = start, first_row
+        size = block_size
+        while pos < end:
+            stop = min(pos + size, end)
+            scanned = _scan_block(mm, pos, stop, stop == end, wanted, len(header), row)
+            if scanned is None:
+                # One row longer than the block; try again with a bigger one
+                size *= 2
+                continue
+            chunk, consumed = scanned
+            row += len(chunk.rows)
+            _release(mm, pos, pos + consumed)
+            pos += consumed
+            size = block_size
+            yield chunk
+
+def _release(mm: mmap.mmap, start: int, stop: int) -> None:
+    """Drops scanned pages from this process's resident memory; they stay in the page cache."""
+    if not hasattr(mm, 'madvise') or not hasattr(mmap, 'MADV_DONTNEED'):
+        return
+    first = start - start % mmap.PAGESIZE
+    if stop > first:
+        mm.madvise(mmap.MADV_DONTNEED, first, stop - first)
+
+def _scan_block(mm: mmap.mmap, pos: int, stop: int, last: bool, wanted: Dict[str, Optional[int]], expected: int,
+                first_row: int) -> Optional[Tuple[ScanChunk, int]]:
+    """
+    Tokenizes the whole rows in bytes [pos, stop), or all of them if `last`.
+    Returns the chunk and the bytes it covers, or None if no row ends in the block.
+    """
+    # A view into the map, which must not outlive this call or the map can't close
+    block = np.frombuffer(mm, dtype=np.uint8, count=stop - pos, offset=pos)
+    is_quote = block == _QUOTE
+    quotes = np.flatnonzero(is_quote)
+    seps = np.flatnonzero((block == _COMMA) | (block == _LF))
+    if len(quotes):
+        # Separators after an odd number of quotes are inside a quoted field
+        seps = seps[~np.bitwise_xor.accumulate(is_quote)[seps]]
+    ends_row = block[seps] == _LF
+
+    open_quote = False
+    if not last:
+        row_ends = np.flatnonzero(ends_row)
+        if len(row_ends) == 0:
+            return None
+        consumed = int(seps[row_ends[-1]]) + 1
+        seps, ends_row = seps[:row_ends[-1] + 1], ends_row[:row_ends[-1] + 1]
+        quotes = quotes[:np.searchsorted(quotes, consumed)]
+    else:
+        consumed = stop - pos
+        open_quote = len(quotes) % 2 == 1
+        if not len(seps) or not ends_row[-1] or seps[-1] != consumed - 1:
+            # The last row lacks a newline; end it at the end of the file
+            seps = np.append(seps, consumed)
+            ends_row = np.append(ends_row, True)
+
+    # UTF-8 continuation bytes, which don't count towards text lengths
+    high = np.flatnonzero(block[:consumed] >= 0x80) if wanted else np.empty(0, dtype=np.intp)
+    continuations = high[(block[high] & 0xC0) == 0x80]
+    return _tokenize(block, seps, ends_row, quotes, continuations, wanted, expected, first_row, open_quote), consumed
+
+def _tokenize(block: np.ndarray, seps: np.ndarray, ends_row: np.ndarray, quotes: np.ndarray,
+              continuations: np.ndarray, wanted: Dict[str, Optional[int]], expected: int, first_row: int,
+              open_quote: bool) -> ScanChunk:
+    """Splits whole rows into fields, given the positions of their structural separators."""
+    starts = np.concatenate(([0], seps[:-1] + 1))
+    stops = seps.copy()
+    # A CR before the newline belongs to the line ending, not to the last field
+    crlf = ends_row & (stops > starts)
+    crlf[crlf] = block[stops[crlf] - 1] == _CR
+    stops[crlf] -= 1
+
+    row_ends = np.flatnonzero(ends_row)
+    row_firsts = np.concatenate(([0], row_ends[:-1] + 1))
+    field_counts = row_ends - row_firsts + 1
+
+    # Blank lines are not rows, for pandas or pyarrow
+    keep = (field_counts > 1) | (stops[row_firsts] > starts[row_firsts])
+    rows = first_row + np.arange(int(np.count_nonzero(keep)))
+    row_firsts, field_counts = row_firsts[keep], field_counts[keep]
+
+    lengths: Dict[str, Optional[np.ndarray]] = {}
+    for col, index in wanted.items():
+        if index is None:
+            lengths[col] = None
+            continue
+        values = np.full(len(rows), -1, dtype=np.int64)
+        has_field = field_counts > index
+        fields = row_firsts[has_field] + index
+        values[has_field] = _value_lengths(block, starts[fields], stops[fields], quotes, continuations)
+        lengths[col] = values
+
+    return ScanChunk(rows, field_counts, expected, lengths, open_quote)
+
+def _count_between(positions: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """How many of the sorted positions fall in each [start, stop)."""
+    return np.searchsorted(positions, stops) - np.searchsorted(positions, starts)
+
+def _value_lengths(block: np.ndarray, starts: np.ndarray, stops: np.ndarray, quotes: np.ndarray,
+                   continuations: np.ndarray) -> np.ndarray:
+    """Text length of each field [start, stop) once unquoted, -1 for missing values."""
+    raw = stops - starts
+    lengths = raw.astype(np.int64)
+    quoted = raw > 0
+    quoted[quoted] = block[starts[quoted]] == _QUOTE
+    if quoted.any():
+        # "ab""c" reads as ab"c: the enclosing quotes go, and one of each escaped pair
+        lengths[quoted] -= _count_between(quotes, starts[quoted], stops[quoted]) // 2 + 1
+    if len(continuations):
+        lengths -= _count_between(continuations, starts, stops)
+
+    # Blanks and NA tokens are read as missing; only short fields can be one
+    byte_lengths = np.where(quoted, raw - 2, raw)
+    lengths[byte_lengths == 0] = -1
+    candidates = np.flatnonzero((byte_lengths > 0) & (byte_lengths <= _NA_MAX))
+    content_starts = starts[candidates] + quoted[candidates]
+    candidates = candidates[_NA_LENGTH[byte_lengths[candidates]] & _NA_FIRST[block[content_starts]]]
+    if len(candidates):
+        keys = _pack(block, starts[candidates] + quoted[candidates], byte_lengths[candidates])
+        pos = np.minimum(np.searchsorted(_NA_KEYS, keys), len(_NA_KEYS) - 1)
+        lengths[candidates[_NA_KEYS[pos] == keys]] = -1
+    return lengths
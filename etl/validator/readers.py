@@ -0,0 +1,221 @@
+import contextlib
+import csv
+import io
+from abc import ABC, abstractmethod
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Union
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for the pyarrow backend and Parquet files
+    pa = None
+
+# Compression of CSV files by extension; both parsers decompress while they read
+COMPRESSIONS = {'.gz': 'gzip', '.zst': 'zstd', '.zstd': 'zstd'}
+PARQUET_EXTENSIONS = ('.parquet', '.pq')
+
+class CsvReader(ABC):
+    """
+    Parses a CSV file into DataFrames, either whole or in chunks of rows.
+    Files ending in .gz or .zst are decompressed as they are read.
+    """
+
+    @abstractmethod
+    def read(self, file_path: str, usecols: Optional[Set[str]], dtypes: Dict[str, Any]) -> pd.DataFrame:
+        """
+        Reads the whole file.
+
+        Args:
+            file_path: The CSV file to read.
+            usecols: Columns to parse, or None for all. Columns missing from
+                the file are ignored; validators report them.
+            dtypes: dtype hints per column.
+        """
+        pass
+
+    @abstractmethod
+    def iter_chunks(self, source: Union[str, BinaryIO], usecols: Optional[Set[str]], dtypes: Dict[str, Any],
+                    chunksize: int, names: Optional[List[str]] = None, first_row: int = 0) -> Iterator[pd.DataFrame]:
+        """
+        Reads a file in chunks of about `chunksize` rows. Each chunk's index
+        holds its global row numbers.
+
+        Args:
+            source: A file path, or a binary stream starting with a header row.
+            names: The header's column names when source is a stream, which
+                cannot be re-read to find them.
+            first_row: Global row number of the first data row in source.
+        """
+        pass
+
+class PandasCsvReader(CsvReader):
+    """
+    pd.read_csv with the default C engine. pandas decompresses .zst files with
+    the zstandard package; with pyarrow installed, its decoder is used instead.
+    """
+
+    def read(self, file_path: str, usecols: Optional[Set[str]], dtypes: Dict[str, Any]) -> pd.DataFrame:
+        with self._open(file_path) as source:
+            return pd.read_csv(source, usecols=self._usecols(usecols), dtype=dtypes or None)
+
+    def iter_chunks(self, source: Union[str, BinaryIO], usecols: Optional[Set[str]], dtypes: Dict[str, Any],
+                    chunksize: int, names: Optional[List[str]] = None, first_row: int = 0) -> Iterator[pd.DataFrame]:
+        with self._open(source) as source, \
+                pd.read_csv(source, usecols=self._usecols(usecols), dtype=dtypes or None, chunksize=chunksize) as reader:
+            for chunk in reader:
+                if first_row:
+                    chunk.index = chunk.index + first_row
+                yield chunk
+
+    @staticmethod
+    def _open(source: Union[str, BinaryIO]):
+        if isinstance(source, str) and pa is not None and compression(source) == 'zstd':
+            return pa.input_stream(source, compression='zstd')
+        # Paths are opened by pandas, which infers their compression
+        return contextlib.nullcontext(source)
+
+    @staticmethod
+    def _usecols(usecols: Optional[Set[str]]):
+        # A callable keeps columns missing from the file from raising
+        return (lambda col: col in usecols) if usecols is not None else None
+
+class ArrowCsvReader(CsvReader):
+    """
+    Multi-threaded pyarrow.csv parser producing Arrow-backed (pd.ArrowDtype) columns.
+
+    Arrow infers column types from the first block only and fails on a later
+    value that doesn't fit, which dirty files always have. Columns without a
+    dtype hint are therefore read as Arrow strings, and validators coerce them
+    (ColumnView casts clean numeric columns natively in Arrow).
+    """
+
+    def __init__(self, block_size: Optional[int] = None):
+        if pa is None:
+            raise ImportError("the pyarrow backend requires the pyarrow package")
+        self.block_size = block_size
+
+    def read(self, file_path: str, usecols: Optional[Set[str]], dtypes: Dict[str, Any]) -> pd.DataFrame:
+        table = pa_csv.read_csv(
+            file_path,
+            read_options=self._read_options(),
+            convert_options=self._convert_options(_header(file_path), usecols, dtypes),
+        )
+        return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+    def iter_chunks(self, source: Union[str, BinaryIO], usecols: Optional[Set[str]], dtypes: Dict[str, Any],
+                    chunksize: int, names: Optional[List[str]] = None, first_row: int = 0) -> Iterator[pd.DataFrame]:
+        reader = pa_csv.open_csv(
+            source,
+            read_options=self._read_options(),
+            convert_options=self._convert_options(names or _header(source), usecols, dtypes),
+        )
+        # Arrow batches are sized in bytes; regroup them into chunks of about chunksize rows
+        batches, rows, offset = [], 0, first_row
+        for batch in reader:
+            batches.append(batch)
+            rows += batch.num_rows
+            if rows >= chunksize:
+                yield self._frame(batches, offset)
+                batches, offset, rows = [], offset + rows, 0
+        if batches:
+            yield self._frame(batches, offset)
+
+    def _read_options(self) -> 'pa_csv.ReadOptions':
+        options = pa_csv.ReadOptions(use_threads=True)
+        if self.block_size:
+            options.block_size = self.block_size
+        return options
+
+    def _convert_options(self, header: List[str], usecols: Optional[Set[str]],
+                         dtypes: Dict[str, Any]) -> 'pa_csv.ConvertOptions':
+        include = [col for col in header if usecols is None or col in usecols]
+        column_types = {col: pa.string() for col in include}
+        column_types.update({col: _arrow_type(hint) for col, hint in (dtypes or {}).items() if col in column_types})
+        # strings_can_be_null makes blanks missing values, as pd.read_csv does
+        return pa_csv.ConvertOptions(include_columns=include, column_types=column_types, strings_can_be_null=True)
+
+    @staticmethod
+    def _frame(batches: List['pa.RecordBatch'], offset: int) -> pd.DataFrame:
+        df = pa.Table.from_batches(batches).to_pandas(types_mapper=pd.ArrowDtype)
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        return df
+
+class ParquetReader(CsvReader):
+    """
+    Reads Parquet files through pyarrow.parquet, one row group at a time in
+    streaming mode. Only the columns validators need are read from disk.
+
+    Parquet columns are already typed, so dtype hints are only applied where
+    a column can be cast losslessly (e.g. an int column that is length-checked
+    as text).
+    """
+
+    def __init__(self, arrow_dtypes: bool = False):
+        if pa is None:
+            raise ImportError("Parquet files require the pyarrow package")
+        # Arrow-backed columns like ArrowCsvReader's, rather than NumPy ones
+        self.arrow_dtypes = arrow_dtypes
+
+    def read(self, file_path: str, usecols: Optional[Set[str]], dtypes: Dict[str, Any]) -> pd.DataFrame:
+        parquet = pq.ParquetFile(file_path)
+        table = parquet.read(columns=self._columns(parquet, usecols))
+        return self._frame(table, dtypes, 0)
+
+    def iter_chunks(self, source: Union[str, BinaryIO], usecols: Optional[Set[str]], dtypes: Dict[str, Any],
+                    chunksize: int, names: Optional[List[str]] = None, first_row: int = 0) -> Iterator[pd.DataFrame]:
+        parquet = pq.ParquetFile(source)
+        offset = first_row
+        # Batches never span row groups, so at most one row group is decoded at a time
+        for batch in parquet.iter_batches(batch_size=chunksize, columns=self._columns(parquet, usecols)):
+            yield self._frame(pa.Table.from_batches([batch]), dtypes, offset)
+            offset += batch.num_rows
+
+    @staticmethod
+    def _columns(parquet: 'pq.ParquetFile', usecols: Optional[Set[str]]) -> Optional[List[str]]:
+        if usecols is None:
+            return None
+        return [col for col in parquet.schema_arrow.names if col in usecols]
+
+    def _frame(self, table: 'pa.Table', dtypes: Dict[str, Any], offset: int) -> pd.DataFrame:
+        for col, hint in (dtypes or {}).items():
+            i = table.schema.get_field_index(col)
+            if i < 0:
+                continue
+            try:
+                table = table.set_column(i, col, table.column(i).cast(_arrow_type(hint)))
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError, ValueError, TypeError):
+                pass
+        df = table.to_pandas(types_mapper=pd.ArrowDtype) if self.arrow_dtypes else table.to_pandas()
+        df.index = pd.RangeIndex(offset, offset + len(df))
+        return df
+
+def is_parquet(file_path: str) -> bool:
+    return file_path.lower().endswith(PARQUET_EXTENSIONS)
+
+def compression(file_path: str) -> Optional[str]:
+    """The compression of a CSV file, from its extension, or None."""
+    for ext, codec in COMPRESSIONS.items():
+        if file_path.lower().endswith(ext):
+            return codec
+    return None
+
+def _header(file_path: str) -> List[str]:
+    # Decompresses .gz and .zst files like pa_csv.open_csv does
+    with pa.input_stream(file_path, compression='detect') as stream:
+        return next(csv.reader(io.TextIOWrapper(stream, encoding='utf-8', newline='')), [])
+
+def _arrow_type(hint: Any) -> 'pa.DataType':
+    """Maps a pandas-style dtype hint from the config to an Arrow type."""
+    if hint is str or hint in ('str', 'string', 'object'):
+        return pa.string()
+    if hint == 'category':
+        return pa.dictionary(pa.int32(), pa.string())
+    return pa.type_for_alias(str(hint))
+
+# Parse backends selectable per file with `backend:` in validation_config.yaml
+BACKENDS = {
+    'pandas': PandasCsvReader,
+    'pyarrow': ArrowCsvReader,
+}
@@ -0,0 +1,59 @@
+import os
+import threading
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from .duplicate_index import HashedKeyIndex, canonical_keys
+
+# Rows read at a time when loading a reference file
+REFERENCE_CHUNKSIZE = 1_000_000
+
+class ReferenceIndex:
+    """
+    The distinct values of one column of a reference CSV, as a sorted array of
+    64-bit text hashes (8 bytes per value).
+
+    Indexes are built once per process through load() and shared by every file
+    and validator that looks values up in the same column. A reference file
+    that changes on disk is reloaded on next use.
+    """
+
+    _loaded: Dict[Tuple[str, str], Tuple[Tuple[int, int], 'ReferenceIndex']] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, hashes: np.ndarray):
+        self.hashes = hashes
+
+    @classmethod
+    def load(cls, file_path: str, column: str) -> 'ReferenceIndex':
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        version = (stat.st_size, stat.st_mtime_ns)
+        with cls._lock:
+            cached = cls._loaded.get((path, column))
+            if cached is not None and cached[0] == version:
+                return cached[1]
+
+            index = HashedKeyIndex()
+            with pd.read_csv(path, usecols=[column], dtype=str, chunksize=REFERENCE_CHUNKSIZE) as reader:
+                for chunk in reader:
+                    index.add(text_hashes(chunk[column].dropna()))
+            reference = cls(index.snapshot())
+            index.close()
+            cls._loaded[(path, column)] = (version, reference)
+            return reference
+
+    def contains(self, keys: pd.Series) -> np.ndarray:
+        """
+        True for each value that appears in the reference column; keys are
+        non-null values already written by canonical_keys() (ColumnView.keys).
+        """
+        hashes = pd.util.hash_pandas_object(keys, index=False).to_numpy()
+        if len(self.hashes) == 0:
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.minimum(np.searchsorted(self.hashes, hashes), len(self.hashes) - 1)
+        return self.hashes[pos] == hashes
+
+def text_hashes(values: pd.Series) -> np.ndarray:
+    """Hashes non-null values by their canonical text, so '7' and 7.0 hash alike."""
+    return pd.util.hash_pandas_object(canonical_keys(values), index=False).to_numpy()
@@ -0,0 +1,75 @@
+"""
+Validator types by the name used as `type:` in validation_config.yaml.
+
+Types are registered as 'module:Class' paths and only imported when a config
+first uses them. Other packages can add types without touching this one by
+declaring an entry point in the `etl_validator.validators` group, e.g. in
+their pyproject.toml:
+
+    [project.entry-points."etl_validator.validators"]
+    checksum = "my_package.checks:ChecksumValidator"
+
+Entry points are only scanned for names not registered here.
+"""
+import importlib
+from typing import TYPE_CHECKING, Dict, List, Type, Union
+
+if TYPE_CHECKING:
+    from .base_validator import BaseValidator
+
+ENTRY_POINT_GROUP = 'etl_validator.validators'
+
+_registry: Dict[str, Union[str, Type['BaseValidator']]] = {
+    'duplicate': '.validators:DuplicateRowValidator',
+    'duplicate_profile': '.validators:DuplicateProfileValidator',
+    'datatype': '.validators:DataTypeValidator',
+    'length': '.validators:LengthValidator',
+    'regex': '.validators:PatternValidator',
+    'range': '.validators:RangeValidator',
+    'allowed_values': '.validators:AllowedValuesValidator',
+    'null_ratio': '.validators:NullRatioValidator',
+    'reference': '.validators:ReferenceValidator',
+    'structure': '.validators:StructureValidator',
+}
+
+def register(name: str, validator: Union[str, Type['BaseValidator']]) -> None:
+    """
+    Registers a validator type under `name`, replacing any existing one.
+
+    Args:
+        validator: The BaseValidator subclass, or its 'module:Class' path to
+            import on first use (relative paths resolve in this package).
+    """
+    _registry[name] = validator
+
+def get(name: str) -> Type['BaseValidator']:
+    """
+    Returns the validator class registered under `name`, importing it if needed.
+
+    Raises:
+        KeyError: If no validator type or entry point has that name.
+    """
+    if name not in _registry:
+        _load_entry_point(name)
+    target = _registry[name]
+    if isinstance(target, str):
+        module_name, _, class_name = target.partition(':')
+        target = getattr(importlib.import_module(module_name, __package__), class_name)
+        _registry[name] = target
+    return target
+
+def names() -> List[str]:
+    """Returns the registered type names, without scanning entry points."""
+    return sorted(_registry)
+
+def _load_entry_point(name: str) -> None:
+    from importlib.metadata import entry_points
+
+    eps = entry_points()
+    # entry_points() returns a dict of groups before Python 3.10
+    group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, 'select') else eps.get(ENTRY_POINT_GROUP, [])
+    for ep in group:
+        if ep.name == name:
+            _registry[name] = ep.value
+            return
+    raise KeyError(name)
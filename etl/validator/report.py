@@ -0,0 +1,149 @@
+import json
+import os
+import sys
+from typing import Any, Dict, List, NamedTuple, Optional
+from .errors import ValidationError
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+class ValidatorStats(NamedTuple):
+    # Position of the validator in the file's config
+    index: int
+    validator: str
+    # Data rows the validator was fed; fewer than the file's if it failed or
+    # ran out of error budget part way
+    rows: int
+    # Time spent in the validator's own calls. Column conversions shared by
+    # several rules are charged to the first rule that needs them.
+    seconds: float
+    rows_per_sec: Optional[float]
+    errors: int
+
+class FileStats(NamedTuple):
+    # Data rows parsed by this run (for incremental files, only the new ones)
+    rows: int
+    seconds: float
+    # Peak RSS while validating the file, in bytes; None if unknown
+    peak_memory: Optional[int]
+    validators: List[ValidatorStats]
+
+def reset_peak_memory() -> None:
+    """
+    Resets the process's peak RSS so peak_memory() covers only what follows.
+    Only possible on Linux; elsewhere the peak is the process's lifetime peak.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except OSError:
+        pass
+
+def peak_memory() -> Optional[int]:
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux but bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+def file_record(file_path: str, status: str, errors: List[ValidationError],
+                stats: Optional[FileStats]) -> Dict[str, Any]:
+    """
+    Builds the report entry for one file.
+
+    Args:
+        status: 'passed', 'failed', 'cached' (verdict reused from an earlier
+            run, so no timings) or 'skipped' (no configuration).
+    """
+    record = {
+        'file': os.path.basename(file_path),
+        'path': os.path.abspath(file_path),
+        'status': status,
+        'error_count': len(errors),
+        'rows': None,
+        'seconds': None,
+        'rows_per_sec': None,
+        'peak_memory_bytes': None,
+        'validators': [],
+        'errors': [dict(error.to_dict(), message=str(error)) for error in errors],
+    }
+    if stats is not None:
+        record.update(
+            rows=stats.rows,
+            seconds=stats.seconds,
+            rows_per_sec=stats.rows / stats.seconds if stats.seconds > 0 else None,
+            peak_memory_bytes=stats.peak_memory,
+            validators=[v._asdict() for v in stats.validators],
+        )
+    return record
+
+def append_report(path: str, record: Dict[str, Any]) -> None:
+    """Appends one entry to a JSON lines report, as a long-running watcher does per file."""
+    with open(path, 'a') as f:
+        f.write(json.dumps(record, default=str) + '\n')
+
+def write_report(path: str, records: List[Dict[str, Any]], fmt: Optional[str] = None) -> None:
+    """
+    Writes one entry per file, as JSON lines or as Parquet (one row per file,
+    with validators and errors as nested list columns). The format is taken
+    from the extension unless fmt is given.
+    """
+    fmt = fmt or ('parquet' if path.endswith('.parquet') else 'jsonl')
+    if fmt == 'jsonl':
+        with open(path, 'w') as f:
+            for record in records:
+                f.write(json.dumps(record, default=str) + '\n')
+    elif fmt == 'parquet':
+        # Imported here so runs without a Parquet report never load pyarrow
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet reports require the pyarrow package")
+        rows = []
+        for record in records:
+            # params differ per check, so they are kept as a JSON string
+            errors = [dict(error, params=json.dumps(error['params'], default=str)) for error in record['errors']]
+            rows.append(dict(record, errors=errors))
+        pq.write_table(pa.Table.from_pylist(rows, schema=_parquet_schema(pa)), path)
+    else:
+        raise ValueError(f"Unknown report format '{fmt}'")
+
+def _parquet_schema(pa) -> 'pa.Schema':
+    return pa.schema([
+        ('file', pa.string()),
+        ('path', pa.string()),
+        ('status', pa.string()),
+        ('error_count', pa.int64()),
+        ('rows', pa.int64()),
+        ('seconds', pa.float64()),
+        ('rows_per_sec', pa.float64()),
+        ('peak_memory_bytes', pa.int64()),
+        ('validators', pa.list_(pa.struct([
+            ('index', pa.int64()),
+            ('validator', pa.string()),
+            ('rows', pa.int64()),
+            ('seconds', pa.float64()),
+            ('rows_per_sec', pa.float64()),
+            ('errors', pa.int64()),
+        ]))),
+        ('errors', pa.list_(pa.struct([
+            ('validator', pa.string()),
+            ('check', pa.string()),
+            ('columns', pa.list_(pa.string())),
+            ('count', pa.int64()),
+            ('sample', pa.list_(pa.int64())),
+            ('params', pa.string()),
+            ('template', pa.string()),
+            ('message', pa.string()),
+        ]))),
+    ])
@@ -0,0 +1,131 @@
+"""
+Fixed-memory sketches over 64-bit key hashes (see duplicate_index.hash_keys).
+
+Both sketches are mergeable: sketches built over different chunks, files or
+worker processes combine into the sketch of everything they saw, as long as
+they were created with the same parameters.
+"""
+import math
+import numpy as np
+
+# Multiplier of the Fibonacci hash, to remix key hashes for the Bloom filter
+# so its bit positions don't correlate with the HyperLogLog register index
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+
+# Set bits per byte value, for NumPy versions without np.bitwise_count
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    """int.bit_length() of each uint64, exactly (float64 only holds 32-bit halves exactly)."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
+
+class HyperLogLog:
+    """
+    Estimates the number of distinct hashes added, with a relative standard
+    error of about 1.04 / sqrt(2 ** precision) in 2 ** precision bytes
+    (0.8% in 16 KB at the default precision of 14).
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 18, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> None:
+        if len(hashes) == 0:
+            return
+        p = np.uint64(self.precision)
+        index = (hashes >> (np.uint64(64) - p)).astype(np.intp)
+        # Position of the first set bit in the remaining 64 - p bits, from 1
+        rest = hashes << p
+        rank = np.where(rest == 0, 64 - self.precision + 1, 65 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            # Linear counting is more accurate while many registers are still empty
+            return m * math.log(m / zeros)
+        return float(estimate)
+
+class BloomFilter:
+    """
+    Set membership with no false negatives, sized for `capacity` distinct
+    hashes at a false positive rate of `error_rate` (about 1.2 bytes per key
+    at 1%). Past its capacity the false positive rate climbs.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        if capacity < 1 or not 0 < error_rate < 1:
+            raise ValueError("BloomFilter needs a capacity of at least 1 and an error rate between 0 and 1")
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.size = max(64, -(-bits // 64) * 64)
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = np.zeros(self.size // 8, dtype=np.uint8)
+
+    def add(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Adds hashes and returns, per hash, whether it was possibly added
+        before (always True for a hash added before, including earlier in
+        the same call).
+        """
+        seen = np.zeros(len(hashes), dtype=bool)
+        if len(hashes) == 0:
+            return seen
+        # Only a hash's first occurrence in the call is looked up
+        _, first = np.unique(hashes, return_index=True)
+        seen[:] = True
+        positions = self._positions(hashes[first])
+        byte, bit = positions >> 3, (np.uint8(1) << (positions & 7).astype(np.uint8))
+        seen[first] = np.all(self.bits[byte] & bit, axis=0)
+        np.bitwise_or.at(self.bits, byte.ravel(), bit.ravel())
+        return seen
+
+    def merge(self, other: 'BloomFilter') -> None:
+        if (other.size, other.hash_count) != (self.size, self.hash_count):
+            raise ValueError("cannot merge Bloom filters of different sizes")
+        np.bitwise_or(self.bits, other.bits, out=self.bits)
+
+    def false_positive_rate(self) -> float:
+        """Chance that a hash never added is reported as seen, at the current fill."""
+        return (self._set_bits() / self.size) ** self.hash_count
+
+    def count(self) -> float:
+        """Estimated number of distinct hashes added, from the share of bits set."""
+        filled = self._set_bits()
+        if filled >= self.size:
+            return float('inf')
+        return -self.size / self.hash_count * math.log(1 - filled / self.size)
+
+    def count_error(self) -> float:
+        """Standard error of count() (Swamidass and Baldi, 2007)."""
+        count = self.count()
+        if math.isinf(count):
+            return count
+        x = self.hash_count * count / self.size
+        return math.sqrt(self.size * (math.exp(x) - 1 - x)) / self.hash_count
+
+    def _set_bits(self) -> int:
+        if hasattr(np, 'bitwise_count'):
+            # The size is a multiple of 64 bits
+            return int(np.bitwise_count(self.bits.view(np.uint64)).sum(dtype=np.int64))
+        return int(_POPCOUNT[self.bits].sum(dtype=np.int64))
+
+    def _positions(self, hashes: np.ndarray) -> np.ndarray:
+        # Double hashing: the i-th position is h1 + i * h2, from two 32-bit halves
+        mixed = hashes * _GOLDEN
+        h1 = mixed >> np.uint64(32)
+        h2 = (mixed & np.uint64(0xFFFFFFFF)) | np.uint64(1)
+        steps = np.arange(self.hash_count, dtype=np.uint64)[:, None]
+        return ((h1 + steps * h2) % np.uint64(self.size)).astype(np.intp)
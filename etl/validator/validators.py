@@ -1,92 +1,756 @@
-from typing import List, Dict, Union
+import datetime
+import math
+from abc import abstractmethod
+from typing import Any, List, Dict, Optional, Tuple, Union
+import numpy as np
 import pandas as pd
 from .base_validator import BaseValidator
+from .column_view import ColumnView
+from .duplicate_index import HashedKeyIndex, canonical_keys, hash_keys
+from .errors import ValidationError
+from .prescan import ScanChunk
+from .reference import ReferenceIndex
+from .sketches import BloomFilter, HyperLogLog
+
+# Default number of offending row indices quoted in an error message
+MAX_SAMPLE = 5
+# Default number of duplicated keys reported one by one
+MAX_DUPLICATE_KEYS = 1000
+# Default number of distinct keys a duplicate profile's Bloom filter is sized for (about 1.2 MB)
+PROFILE_EXPECTED_KEYS = 1_000_000
+
+class ColumnValidator(BaseValidator):
+    """
+    Base class for validators that check each configured column on its own.
+
+    Columns are checked through check_column() against a shared ColumnView, which
+    lets ValidationPlan run every column-wise rule on a column in a single pass.
+    """
+    supports_streaming = True
+
+    def __init__(self, columns: Dict[str, Any], sample_size: int = MAX_SAMPLE):
+        self.columns = columns
+        self.sample_size = sample_size
+        self.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'ColumnValidator':
+        return cls(config['columns'], int(config.get('sample_size', MAX_SAMPLE)))
+
+    def validate(self, df: pd.DataFrame) -> List[ValidationError]:
+        self.start()
+        self.consume(df)
+        return self.finish()
+
+    def required_columns(self) -> Optional[List[str]]:
+        return list(self.columns)
+
+    def start(self) -> None:
+        self._missing = set()
+        # (column, check) -> failing row count and the first failing indices
+        self._counts: Dict[Tuple[str, str], int] = {}
+        self._samples: Dict[Tuple[str, str], List[int]] = {}
+
+    def consume(self, chunk: pd.DataFrame) -> None:
+        for col in self.columns:
+            if col not in chunk.columns:
+                self.missing_column(col)
+            else:
+                self.check_column(col, ColumnView(chunk[col]))
+
+    def save_state(self) -> Dict[str, Any]:
+        return {
+            'missing': set(self._missing),
+            'counts': dict(self._counts),
+            'samples': {k: list(v) for k, v in self._samples.items()},
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._missing = set(state['missing'])
+        self._counts = dict(state['counts'])
+        self._samples = {k: list(v) for k, v in state['samples'].items()}
+
+    def missing_column(self, col: str) -> None:
+        self._missing.add(col)
+
+    def error_count(self) -> int:
+        return sum(self._counts.values())
+
+    @abstractmethod
+    def check_column(self, col: str, view: ColumnView) -> None:
+        """
+        Records failures of this validator's rule for one column of a chunk.
+        """
+        pass
+
+    def _record(self, col: str, check: str, mask: pd.Series) -> None:
+        """Counts the rows where mask is True and keeps the first sample_size indices, across chunks."""
+        hits = mask.to_numpy(dtype=bool, na_value=False)
+        count = int(np.count_nonzero(hits))
+        if count == 0:
+            return
+        key = (col, check)
+        self._counts[key] = self._counts.get(key, 0) + count
+        sample = self._samples.setdefault(key, [])
+        if len(sample) < self.sample_size:
+            sample.extend(mask.index[np.flatnonzero(hits)[:self.sample_size - len(sample)]].tolist())
+
+    def _error(self, col: str, check: str, template: str, **params) -> ValidationError:
+        key = (col, check)
+        return ValidationError(type(self).__name__, check, [col], self._counts.get(key, 0),
+                               list(self._samples.get(key, [])), params, template)
+
+def _key_value(text: str) -> Union[int, float, str]:
+    """
+    A canonical key as reported: the number it writes, if it is one, else the
+    text. canonical_keys() writes whole numbers as ints and others as floats.
+    """
+    for parse in (int, float):
+        try:
+            value = parse(text)
+        except ValueError:
+            continue
+        if str(value) == text and math.isfinite(value):
+            return value
+    return text
 
 class DuplicateRowValidator(BaseValidator):
-    def __init__(self, columns: List[str]):
+    supports_streaming = True
+
+    def __init__(self, columns: List[str], spill_dir: Optional[str] = None, partitions: int = 16,
+                 max_keys: int = MAX_DUPLICATE_KEYS):
         self.columns = columns
+        # With spill_dir set, key hashes are partitioned to disk for key sets bigger than RAM
+        self.spill_dir = spill_dir
+        self.partitions = partitions
+        # Duplicated keys beyond this many are summarized in one error
+        self.max_keys = max_keys
+        self._index = None
+        self.start()
 
-    def validate(self, df: pd.DataFrame) -> List[str]:
-        errors = []
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'DuplicateRowValidator':
+        return cls(
+            config['columns'],
+            spill_dir=config.get('spill_dir'),
+            partitions=int(config.get('partitions', 16)),
+            max_keys=int(config.get('max_keys', MAX_DUPLICATE_KEYS)),
+        )
+
+    def validate(self, df: pd.DataFrame) -> List[ValidationError]:
+        self.start()
+        self.consume(df)
+        if self.second_pass_columns():
+            self.consume_second_pass(df)
+        return self.finish()
+
+    def required_columns(self) -> Optional[List[str]]:
+        return list(self.columns)
+
+    def start(self) -> None:
+        if self._index is not None:
+            self._index.close()
+        self._index = HashedKeyIndex(self.spill_dir, self.partitions)
+        self._missing_cols: List[str] = []
+        # Hashes known to repeat whose rows are all collected in _candidates
+        self._resolved = np.empty(0, dtype=np.uint64)
+        self._new_dups = None
+        self._candidates: List[pd.DataFrame] = []
+
+    def consume(self, chunk: pd.DataFrame) -> None:
         # Check if columns exist
-        missing_cols = [col for col in self.columns if col not in df.columns]
+        missing_cols = [col for col in self.columns if col not in chunk.columns]
         if missing_cols:
-            errors.append(f"DuplicateRowValidator: Missing columns for validation: {missing_cols}")
+            self._missing_cols = missing_cols
+            return
+        hashes = hash_keys(chunk, self.columns)
+        self._index.add(hashes)
+        if len(self._resolved):
+            # New rows of keys already resolved by an earlier incremental run
+            known = np.isin(hashes, self._resolved)
+            if known.any():
+                self._candidates.append(chunk.loc[known, self.columns])
+
+    def second_pass_columns(self) -> Optional[List[str]]:
+        # Only rows whose key hash repeats are candidates; a clean file needs no second pass
+        if self._missing_cols:
+            return None
+        if self._new_dups is None:
+            self._new_dups = np.setdiff1d(self._index.duplicates(), self._resolved, assume_unique=True)
+        return list(self.columns) if len(self._new_dups) else None
+
+    def consume_second_pass(self, chunk: pd.DataFrame) -> None:
+        candidates = np.isin(hash_keys(chunk, self.columns), self._new_dups)
+        if candidates.any():
+            self._candidates.append(chunk.loc[candidates, self.columns])
+
+    def save_state(self) -> Dict[str, Any]:
+        self.second_pass_columns()
+        resolved = self._resolved if self._new_dups is None else np.union1d(self._resolved, self._new_dups)
+        seen = self._index.snapshot() if not self._missing_cols else np.empty(0, dtype=np.uint64)
+        return {
+            'missing_cols': self._missing_cols,
+            'seen': seen,
+            'resolved': resolved,
+            'candidates': list(self._candidates),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self.start()
+        self._missing_cols = state['missing_cols']
+        self._resolved = state['resolved']
+        self._candidates = state['candidates']
+        self._index.restore(state['seen'], state['resolved'])
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        if self._missing_cols:
+            errors.append(ValidationError(
+                'DuplicateRowValidator', 'missing column', list(self._missing_cols),
+                template="DuplicateRowValidator: Missing columns for validation: {columns}",
+            ))
+            return errors
+        candidates = self._candidates
+        self._candidates = []
+        self._index.close()
+        if not candidates:
             return errors
 
-        duplicates = df[df.duplicated(subset=self.columns, keep=False)]
-        if not duplicates.empty:
-            # Group by the columns to show which combinations are duplicated
-            dup_groups = duplicates.groupby(self.columns).size()
-            # Filter for those with count > 1 (though keep=False already does this, this is for reporting)
-            dup_groups = dup_groups[dup_groups > 1]
-            
-            for index, count in dup_groups.items():
-                 errors.append(f"Duplicate rows found for key {dict(zip(self.columns, index if isinstance(index, tuple) else [index]))}: {count} occurrences")
-        
+        # Keys are compared by canonical text, as they were hashed, so chunks
+        # that inferred different dtypes for a key column still agree
+        duplicates = pd.concat([
+            pd.DataFrame({col: canonical_keys(c[col]) for col in self.columns}) for c in candidates
+        ])
+
+        # Group by the columns to show which combinations are duplicated
+        dup_groups = duplicates.groupby(self.columns).size()
+        # Candidates can include hash collisions, so keep only real repeats
+        dup_groups = dup_groups[dup_groups > 1]
+
+        # Only the keys that are reported individually are turned into Python objects
+        shown = dup_groups.iloc[:self.max_keys]
+        for index, count in zip(shown.index.tolist(), shown.to_numpy().tolist()):
+            key = dict(zip(self.columns, map(_key_value, index if isinstance(index, tuple) else [index])))
+            errors.append(ValidationError(
+                'DuplicateRowValidator', 'duplicate key', list(self.columns), count, params={'key': key},
+                template="Duplicate rows found for key {key}: {count} occurrences",
+            ))
+        if len(dup_groups) > len(shown):
+            rest = dup_groups.iloc[len(shown):]
+            errors.append(ValidationError(
+                'DuplicateRowValidator', 'more duplicate keys', list(self.columns), int(rest.sum()),
+                params={'keys': len(rest)},
+                template="Duplicate rows found for {keys} more keys: {count} occurrences",
+            ))
+
         return errors
 
-class DataTypeValidator(BaseValidator):
-    def __init__(self, columns: Dict[str, str]):
+class DuplicateProfileValidator(BaseValidator):
+    """
+    Approximate, fixed-memory counterpart of DuplicateRowValidator, for tables
+    too big to check exactly: estimates the distinct keys with a HyperLogLog
+    sketch and counts rows whose key was probably seen before with a Bloom
+    filter, in one pass and without a second look at the file.
+
+    Memory is 2 ** precision bytes for the sketch plus about 1.2 bytes per
+    expected key for the filter at a 1% error rate, allocated once keyed rows
+    arrive. Rows flagged only because of Bloom false positives are subtracted
+    using the filter's fill, so the file fails only when the estimated
+    duplicate rate exceeds max_duplicate_rate and the flagged rows stand out
+    from that noise.
+    Profiles of a table's parts, e.g. validated by separate workers, can be
+    combined with merge().
+    """
+    supports_streaming = True
+
+    def __init__(self, columns: List[str], precision: int = 14, expected_keys: int = PROFILE_EXPECTED_KEYS,
+                 error_rate: float = 0.01, max_duplicate_rate: float = 0.0, sample_size: int = MAX_SAMPLE):
         self.columns = columns
+        self.precision = precision
+        self.expected_keys = expected_keys
+        self.error_rate = error_rate
+        self.max_duplicate_rate = max_duplicate_rate
+        self.sample_size = sample_size
+        self.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'DuplicateProfileValidator':
+        return cls(
+            config['columns'],
+            precision=int(config.get('precision', 14)),
+            expected_keys=int(config.get('expected_keys', PROFILE_EXPECTED_KEYS)),
+            error_rate=float(config.get('error_rate', 0.01)),
+            max_duplicate_rate=float(config.get('max_duplicate_rate', 0.0)),
+            sample_size=int(config.get('sample_size', MAX_SAMPLE)),
+        )
+
+    def validate(self, df: pd.DataFrame) -> List[ValidationError]:
+        self.start()
+        self.consume(df)
+        return self.finish()
+
+    def required_columns(self) -> Optional[List[str]]:
+        return list(self.columns)
+
+    def start(self) -> None:
+        self._missing_cols: List[str] = []
+        self._distinct = HyperLogLog(self.precision)
+        # The Bloom filter, allocated by _filter() on first use
+        self._seen: Optional[BloomFilter] = None
+        self._rows = 0
+        self._flagged = 0
+        # Expected rows flagged by Bloom false positives alone
+        self._false_positives = 0.0
+        # Duplicates across merged profiles, estimated from the sketches
+        self._cross = 0.0
+        self._cross_noise = 0.0
+        self._sample: List[int] = []
+
+    def consume(self, chunk: pd.DataFrame) -> None:
+        missing_cols = [col for col in self.columns if col not in chunk.columns]
+        if missing_cols:
+            self._missing_cols = missing_cols
+            return
+        # Rows with a missing key part are never duplicates, as in DuplicateRowValidator
+        keyed = chunk.loc[chunk[self.columns].notna().all(axis=1), self.columns]
+        if keyed.empty:
+            return
+        hashes = hash_keys(keyed, self.columns)
+        self._rows += len(hashes)
+        self._distinct.add(hashes)
+
+        bloom = self._filter()
+        false_positive_rate = bloom.false_positive_rate()
+        seen = bloom.add(hashes)
+        flagged = int(np.count_nonzero(seen))
+        self._flagged += flagged
+        # Unflagged rows are new keys; for each, about false_positive_rate more were flagged wrongly
+        if false_positive_rate < 1:
+            self._false_positives += false_positive_rate * (len(hashes) - flagged) / (1 - false_positive_rate)
+        if len(self._sample) < self.sample_size:
+            self._sample.extend(keyed.index[np.flatnonzero(seen)[:self.sample_size - len(self._sample)]].tolist())
+
+    def merge(self, other: 'DuplicateProfileValidator') -> None:
+        """Adds the profile of other rows of the same table, built with the same parameters."""
+        self._distinct.merge(other._distinct)
+        if other._seen is not None:
+            # Keys seen on both sides are duplicates that neither profile counted. The
+            # filters' fill estimates their overlap far more precisely than the sketches.
+            bloom = self._filter()
+            keys, errors = bloom.count() + other._seen.count(), [bloom.count_error(), other._seen.count_error()]
+            bloom.merge(other._seen)
+            errors.append(bloom.count_error())
+            self._cross += max(0.0, keys - bloom.count())
+            self._cross_noise += 3 * math.sqrt(sum(e * e for e in errors))
+        self._cross += other._cross
+        self._cross_noise += other._cross_noise
+        self._rows += other._rows
+        self._flagged += other._flagged
+        self._false_positives += other._false_positives
+        self._missing_cols = self._missing_cols or other._missing_cols
+        self._sample = sorted(self._sample + other._sample)[:self.sample_size]
+
+    def save_state(self) -> Dict[str, Any]:
+        return {
+            'missing_cols': self._missing_cols,
+            'distinct': self._distinct,
+            'seen': self._seen,
+            'counts': (self._rows, self._flagged, self._false_positives, self._cross, self._cross_noise),
+            'sample': list(self._sample),
+        }
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._missing_cols = state['missing_cols']
+        self._distinct = state['distinct']
+        self._seen = state['seen']
+        self._rows, self._flagged, self._false_positives, self._cross, self._cross_noise = state['counts']
+        self._sample = list(state['sample'])
+
+    def _filter(self) -> BloomFilter:
+        if self._seen is None:
+            self._seen = BloomFilter(self.expected_keys, self.error_rate)
+        return self._seen
 
-    def validate(self, df: pd.DataFrame) -> List[str]:
+    def finish(self) -> List[ValidationError]:
+        if self._missing_cols:
+            return [ValidationError(
+                'DuplicateProfileValidator', 'missing column', list(self._missing_cols),
+                template="DuplicateProfileValidator: Missing columns for validation: {columns}",
+            )]
+        if not self._rows:
+            return []
+
+        duplicates = max(0.0, self._flagged - self._false_positives) + self._cross
+        # Three standard deviations of the false positive count, plus the merged sketches' error
+        noise = 3 * math.sqrt(self._false_positives) + self._cross_noise
+        if duplicates <= noise or duplicates <= self.max_duplicate_rate * self._rows:
+            return []
+        return [ValidationError(
+            'DuplicateProfileValidator', 'duplicate rate', list(self.columns), round(duplicates), list(self._sample),
+            params={'rows': self._rows, 'rate': duplicates / self._rows, 'distinct': round(self._distinct.count())},
+            template="DuplicateProfileValidator: About {count} of {rows} rows ({rate:.2%}) repeat a key of "
+                     "{columns} (about {distinct} distinct keys), e.g. at indices {sample}...",
+        )]
+
+class DataTypeValidator(ColumnValidator):
+    # Message fragment per failed check, in the order they are reported
+    CHECKS = ('non-integer', 'non-integer float', 'non-float')
+
+    def __init__(self, columns: Dict[str, str], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        expected_type = self.columns[col]
+        if expected_type == 'int':
+            # Check if can be converted to numeric and has no non-integer values
+            # The coerced values are shared with every other rule on this column
+            self._record(col, 'non-integer', view.non_numeric)
+
+            # Also check if they are floats that are not integers (e.g. 1.5)
+            # This is a bit stricter. Checked on the parsed values, as a backend may
+            # hand the column over as text. If they all parse as int64, it's fine.
+            if pd.api.types.is_float_dtype(view.numeric):
+                self._record(col, 'non-integer float', view.fractional)
+
+        elif expected_type == 'float':
+            self._record(col, 'non-float', view.non_numeric)
+
+        # Add more types as needed
+
+    def finish(self) -> List[ValidationError]:
         errors = []
-        for col, expected_type in self.columns.items():
-            if col not in df.columns:
-                errors.append(f"DataTypeValidator: Column '{col}' not found.")
+        for col in self.columns:
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "DataTypeValidator: Column '{column}' not found."))
                 continue
-            
-            if expected_type == 'int':
-                # Check if can be converted to numeric and has no non-integer values
-                # We use pd.to_numeric with errors='coerce' to find non-numerics
-                non_numeric = pd.to_numeric(df[col], errors='coerce').isna() & df[col].notna()
-                if non_numeric.any():
-                    bad_indices = df.index[non_numeric].tolist()
-                    errors.append(f"DataTypeValidator: Column '{col}' contains non-integer values at indices {bad_indices[:5]}...")
-                
-                # Also check if they are floats that are not integers (e.g. 1.5)
-                # This is a bit stricter. If the CSV loads as object or float, we need to check.
-                # If it's already int64, it's fine.
-                if pd.api.types.is_float_dtype(df[col]):
-                     non_integers = df[col] % 1 != 0
-                     if non_integers.any():
-                         bad_indices = df.index[non_integers].tolist()
-                         errors.append(f"DataTypeValidator: Column '{col}' contains non-integer float values at indices {bad_indices[:5]}...")
-
-            elif expected_type == 'float':
-                non_numeric = pd.to_numeric(df[col], errors='coerce').isna() & df[col].notna()
-                if non_numeric.any():
-                     bad_indices = df.index[non_numeric].tolist()
-                     errors.append(f"DataTypeValidator: Column '{col}' contains non-float values at indices {bad_indices[:5]}...")
-            
-            # Add more types as needed
-
+            for check in self.CHECKS:
+                if (col, check) in self._counts:
+                    errors.append(self._error(
+                        col, check, "DataTypeValidator: Column '{column}' contains {check} values at indices {sample}...",
+                    ))
         return errors
 
-class LengthValidator(BaseValidator):
-    def __init__(self, columns: Dict[str, int]):
-        self.columns = columns
+class LengthValidator(ColumnValidator):
+    # Lengths can come from a raw pre-scan, so length-only columns need not be parsed
+    reads_scan = True
+
+    def __init__(self, columns: Dict[str, int], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+
+    def text_columns(self) -> List[str]:
+        return list(self.columns)
 
-    def validate(self, df: pd.DataFrame) -> List[str]:
+    def scan_columns(self) -> List[str]:
+        return list(self.columns)
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        # Only non-null values are checked; NaN would otherwise count as 'nan'
+        self._record(col, 'too long', view.lengths > self.columns[col])
+
+    def consume_scan(self, chunk: ScanChunk) -> None:
+        for col, lengths in chunk.lengths.items():
+            if col not in self.columns:
+                continue
+            if lengths is None:
+                self.missing_column(col)
+            else:
+                # Missing values have length -1
+                self._record(col, 'too long', pd.Series(lengths > self.columns[col], index=chunk.rows))
+
+    def finish(self) -> List[ValidationError]:
         errors = []
         for col, max_length in self.columns.items():
-            if col not in df.columns:
-                errors.append(f"LengthValidator: Column '{col}' not found.")
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "LengthValidator: Column '{column}' not found."))
+            elif (col, 'too long') in self._counts:
+                errors.append(self._error(
+                    col, 'too long',
+                    "LengthValidator: Column '{column}' exceeds max length of {max_length} at indices {sample}...",
+                    max_length=max_length,
+                ))
+        return errors
+
+class StructureValidator(BaseValidator):
+    """
+    Checks that every row of a CSV file has as many fields as its header and
+    that no quoted field is left open. Works from the raw pre-scan, so no
+    column is parsed for it; files that can't be pre-scanned (compressed
+    CSV, Parquet) are not checked.
+    """
+    supports_streaming = True
+    reads_scan = True
+    CHECKS = ('too few fields', 'too many fields', 'unclosed quote')
+
+    def __init__(self, sample_size: int = MAX_SAMPLE):
+        self.sample_size = sample_size
+        self.start()
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> 'StructureValidator':
+        return cls(int(config.get('sample_size', MAX_SAMPLE)))
+
+    def validate(self, df: pd.DataFrame) -> List[ValidationError]:
+        # Parsed rows carry no trace of their raw structure
+        return []
+
+    def required_columns(self) -> Optional[List[str]]:
+        return []
+
+    def start(self) -> None:
+        self._expected: Optional[int] = None
+        self._counts: Dict[str, int] = {}
+        self._samples: Dict[str, List[int]] = {}
+
+    def consume(self, chunk: pd.DataFrame) -> None:
+        pass
+
+    def consume_scan(self, chunk: ScanChunk) -> None:
+        self._expected = chunk.expected_fields
+        self._record('too few fields', chunk.rows[chunk.field_counts < chunk.expected_fields])
+        self._record('too many fields', chunk.rows[chunk.field_counts > chunk.expected_fields])
+        if chunk.open_quote and len(chunk.rows):
+            self._record('unclosed quote', chunk.rows[-1:])
+
+    def error_count(self) -> int:
+        return sum(self._counts.values())
+
+    def save_state(self) -> Dict[str, Any]:
+        return {'expected': self._expected, 'counts': dict(self._counts),
+                'samples': {k: list(v) for k, v in self._samples.items()}}
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        self._expected = state['expected']
+        self._counts = dict(state['counts'])
+        self._samples = {k: list(v) for k, v in state['samples'].items()}
+
+    def finish(self) -> List[ValidationError]:
+        templates = {
+            'too few fields': "StructureValidator: Rows with fewer than {expected} fields at indices {sample}...",
+            'too many fields': "StructureValidator: Rows with more than {expected} fields at indices {sample}...",
+            'unclosed quote': "StructureValidator: Quoted field opened at index {sample[0]} is never closed",
+        }
+        return [
+            ValidationError('StructureValidator', check, [], self._counts[check], list(self._samples[check]),
+                            {'expected': self._expected}, templates[check])
+            for check in self.CHECKS if check in self._counts
+        ]
+
+    def _record(self, check: str, rows: np.ndarray) -> None:
+        if len(rows) == 0:
+            return
+        self._counts[check] = self._counts.get(check, 0) + len(rows)
+        sample = self._samples.setdefault(check, [])
+        if len(sample) < self.sample_size:
+            sample.extend(rows[:self.sample_size - len(sample)].tolist())
+
+class PatternValidator(ColumnValidator):
+    """Checks that every value of a column matches a regular expression in full."""
+
+    def __init__(self, columns: Dict[str, str], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+
+    def text_columns(self) -> List[str]:
+        return list(self.columns)
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        try:
+            matches = view.text.str.fullmatch(self.columns[col])
+        except (ValueError, NotImplementedError):
+            # Arrow's RE2 engine lacks some Python regex features, such as lookarounds
+            matches = view.text.astype(object).str.fullmatch(self.columns[col])
+        self._record(col, 'no match', ~matches.astype(bool))
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        for col, pattern in self.columns.items():
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "PatternValidator: Column '{column}' not found."))
+            elif (col, 'no match') in self._counts:
+                errors.append(self._error(
+                    col, 'no match', "PatternValidator: Column '{column}' has values not matching {pattern!r} at indices {sample}...",
+                    pattern=pattern,
+                ))
+        return errors
+
+class RangeValidator(ColumnValidator):
+    """
+    Checks that values of a column lie within [min, max]; either bound may be left out.
+
+    Bounds are numbers, or dates when they are written as dates in the config
+    (or `type: date` is given, optionally with a strptime `format`; ISO 8601
+    otherwise).
+    """
+    CHECKS = ('unparseable', 'out of range')
+
+    def __init__(self, columns: Dict[str, Dict[str, Any]], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+        # Parsed once, with an explicit format: inferring one per chunk warns
+        # and lets chunks of the same file parse their dates differently
+        self._formats = {col: spec.get('format') or 'ISO8601' for col, spec in columns.items()}
+        self._bounds = {col: self._parse_bounds(col) for col in columns}
+
+    def _parse_bounds(self, col: str) -> Tuple[Any, Any]:
+        spec = self.columns[col]
+        if not self._is_date(col):
+            return spec.get('min'), spec.get('max')
+        return tuple(pd.Timestamp(spec[b]) if spec.get(b) is not None else None for b in ('min', 'max'))
+
+    def _is_date(self, col: str) -> bool:
+        spec = self.columns[col]
+        if spec.get('type') == 'date':
+            return True
+        return any(isinstance(spec.get(bound), datetime.date) for bound in ('min', 'max'))
+
+    def text_columns(self) -> List[str]:
+        # Dates are parsed by the rule itself, so they are best read as written
+        return [col for col in self.columns if self._is_date(col)]
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        values = view.datetimes(self._formats[col]) if self._is_date(col) else view.numeric
+        low, high = self._bounds[col]
+
+        self._record(col, 'unparseable', values.isna() & view.notna)
+        outside = pd.Series(False, index=values.index)
+        if low is not None:
+            outside |= (values < low).fillna(False).astype(bool)
+        if high is not None:
+            outside |= (values > high).fillna(False).astype(bool)
+        self._record(col, 'out of range', outside)
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        for col, spec in self.columns.items():
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "RangeValidator: Column '{column}' not found."))
+                continue
+            kind = 'dates' if self._is_date(col) else 'numbers'
+            if (col, 'unparseable') in self._counts:
+                errors.append(self._error(
+                    col, 'unparseable', "RangeValidator: Column '{column}' contains values that are not {kind} at indices {sample}...",
+                    kind=kind,
+                ))
+            if (col, 'out of range') in self._counts:
+                # As text, as YAML dates would not serialize to JSON
+                low, high = (str(spec[b]) if spec.get(b) is not None else '' for b in ('min', 'max'))
+                errors.append(self._error(
+                    col, 'out of range', "RangeValidator: Column '{column}' has values outside [{min}, {max}] at indices {sample}...",
+                    min=low, max=high,
+                ))
+        return errors
+
+class AllowedValuesValidator(ColumnValidator):
+    """
+    Checks that every value of a column is one of a configured set, compared as
+    text; numbers match however they are written, so 7 allows '7.0' and '007'.
+    """
+
+    def __init__(self, columns: Dict[str, List[Any]], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+        self._allowed = {
+            col: pd.Index(canonical_keys(pd.Series([str(v) for v in values], dtype=object))).unique()
+            for col, values in columns.items()
+        }
+
+    def text_columns(self) -> List[str]:
+        return list(self.columns)
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        self._record(col, 'not allowed', ~view.keys.isin(self._allowed[col]))
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        for col in self.columns:
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "AllowedValuesValidator: Column '{column}' not found."))
+            elif (col, 'not allowed') in self._counts:
+                errors.append(self._error(
+                    col, 'not allowed', "AllowedValuesValidator: Column '{column}' contains values outside the allowed set at indices {sample}...",
+                ))
+        return errors
+
+class NullRatioValidator(ColumnValidator):
+    """Checks that the share of missing values in a column stays at or below a maximum."""
+
+    def __init__(self, columns: Dict[str, float], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+
+    def text_columns(self) -> List[str]:
+        # Only presence matters, so skip type inference
+        return list(self.columns)
+
+    def start(self) -> None:
+        super().start()
+        self._rows: Dict[str, int] = {}
+        self._stopped_early = False
+
+    def save_state(self) -> Dict[str, Any]:
+        return dict(super().save_state(), rows=dict(self._rows))
+
+    def load_state(self, state: Dict[str, Any]) -> None:
+        super().load_state(state)
+        self._rows = dict(state['rows'])
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        self._rows[col] = self._rows.get(col, 0) + len(view.series)
+        self._record(col, 'null', ~view.notna)
+
+    def error_count(self) -> int:
+        # A missing value only fails as part of a share of all the rows, known
+        # at the end, so none count against error budgets
+        return 0
+
+    def stopped_early(self) -> None:
+        self._stopped_early = True
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        for col, max_ratio in self.columns.items():
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "NullRatioValidator: Column '{column}' not found."))
                 continue
-            
-            # Convert to string to check length, handle NaNs
-            lengths = df[col].astype(str).str.len()
-            # Note: astype(str) converts NaN to 'nan', which has length 3. 
-            # If we want to ignore NaNs for length check, we should handle them.
-            # Assuming we validate actual values.
-            
-            # A better way might be to only check non-nulls
-            mask = df[col].notna()
-            long_values = df.loc[mask, col].astype(str).str.len() > max_length
-            
-            if long_values.any():
-                bad_indices = df.index[mask][long_values].tolist()
-                errors.append(f"LengthValidator: Column '{col}' exceeds max length of {max_length} at indices {bad_indices[:5]}...")
-        
+            if self._stopped_early:
+                # The share of the rows read says nothing about the whole file
+                continue
+            rows = self._rows.get(col, 0)
+            nulls = self._counts.get((col, 'null'), 0)
+            if rows and nulls / rows > max_ratio:
+                errors.append(self._error(
+                    col, 'null', "NullRatioValidator: Column '{column}' is {ratio:.2%} empty, above the maximum of "
+                    "{max_ratio:.2%}, e.g. at indices {sample}...",
+                    ratio=nulls / rows, max_ratio=max_ratio,
+                ))
+        return errors
+
+class ReferenceValidator(ColumnValidator):
+    """
+    Checks that every value of a column appears in a column of a reference CSV,
+    like a foreign key. Configured per column as {file: <path>, column: <name>};
+    the column defaults to the checked column's name.
+    """
+
+    def __init__(self, columns: Dict[str, Dict[str, str]], sample_size: int = MAX_SAMPLE):
+        super().__init__(columns, sample_size)
+
+    def text_columns(self) -> List[str]:
+        return list(self.columns)
+
+    def _reference(self, col: str) -> ReferenceIndex:
+        spec = self.columns[col]
+        return ReferenceIndex.load(spec['file'], spec.get('column', col))
+
+    def check_column(self, col: str, view: ColumnView) -> None:
+        found = self._reference(col).contains(view.keys)
+        self._record(col, 'not found', pd.Series(~found, index=view.keys.index))
+
+    def finish(self) -> List[ValidationError]:
+        errors = []
+        for col, spec in self.columns.items():
+            if col in self._missing:
+                errors.append(self._error(col, 'missing column', "ReferenceValidator: Column '{column}' not found."))
+            elif (col, 'not found') in self._counts:
+                errors.append(self._error(
+                    col, 'not found', "ReferenceValidator: Column '{column}' has values missing from "
+                    "{file} column '{ref_column}' at indices {sample}...",
+                    file=spec['file'], ref_column=spec.get('column', col),
+                ))
         return errors
@@ -0,0 +1,170 @@
+import ctypes
+import ctypes.util
+import fnmatch
+import os
+import select
+import struct
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# inotify event flags, from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """Minimal inotify binding through libc, watching one directory."""
+
+    def __init__(self, directory: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def read(self, timeout: float) -> List[Tuple[str, int]]:
+        """Waits up to timeout seconds; returns (file name, mask) per event."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        pos = 0
+        while pos < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += _EVENT_HEADER.size
+            name = data[pos:pos + length].rstrip(b'\0').decode(errors='surrogateescape')
+            pos += length
+            events.append((name, mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class DirectoryWatcher:
+    """
+    Reports files in a directory that are new or changed once they are fully written.
+
+    On Linux, inotify wakes the watcher as soon as a writer closes a file or
+    moves one into place. Elsewhere, or if inotify is unavailable, the
+    directory is rescanned on every poll(). Either way, a file
+    only counts as written once its size and mtime have held still for
+    `settle` seconds (a writer that closed it, or a rename into place, skips
+    the wait), so a file still being copied in is never picked up half-done.
+    """
+
+    def __init__(self, directory: str, patterns: Sequence[str] = ('*.csv',), settle: float = 1.0):
+        self.directory = directory
+        self.patterns = patterns
+        self.settle = settle
+        # Size and mtime of each file as last reported
+        self._reported: Dict[str, Tuple[int, int]] = {}
+        # Changed files not yet reported: (size, mtime) when last seen, when
+        # that was first seen, and whether a writer has closed the file since
+        self._pending: Dict[str, Tuple[Tuple[int, int], float, bool]] = {}
+        self._scanned = False
+        self._inotify: Optional[_Inotify] = None
+        try:
+            self._inotify = _Inotify(directory)
+        except (OSError, AttributeError):
+            # No inotify (not Linux, or out of watches): fall back to polling
+            pass
+
+    @property
+    def uses_inotify(self) -> bool:
+        return self._inotify is not None
+
+    def rescan(self, paths: Optional[List[str]] = None) -> None:
+        """
+        Forgets that the given files (default: all of them) were reported, so
+        they are reported again once settled.
+        """
+        if paths is None:
+            self._reported.clear()
+        else:
+            for path in paths:
+                self._reported.pop(path, None)
+        self._scanned = False
+
+    def poll(self, timeout: float) -> List[str]:
+        """
+        Waits up to timeout seconds and returns the paths of files that are
+        new or changed since last reported and now fully written, sorted.
+        Files already present are reported by the first call.
+        """
+        if not self._scanned:
+            self._scan()
+        if self._pending:
+            # Come back in time to see pending files settle
+            timeout = min(timeout, self.settle)
+
+        if self._inotify is not None:
+            for name, mask in self._inotify.read(timeout):
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped; a full scan catches up
+                    self._scan()
+                elif self._matches(name):
+                    self._touch(os.path.join(self.directory, name), closed=bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO)))
+        else:
+            time.sleep(timeout)
+            self._scan()
+        return self._settled()
+
+    def close(self) -> None:
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def _scan(self) -> None:
+        self._scanned = True
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and self._matches(entry.name):
+                self._touch(entry.path, closed=False)
+
+    def _matches(self, name: str) -> bool:
+        return any(fnmatch.fnmatch(name, pattern) for pattern in self.patterns)
+
+    def _touch(self, path: str, closed: bool) -> None:
+        version = _version(path)
+        if version is None or self._reported.get(path) == version and path not in self._pending:
+            return
+        seen = self._pending.get(path)
+        if seen is None or seen[0] != version:
+            self._pending[path] = (version, time.monotonic(), closed)
+        elif closed:
+            self._pending[path] = (version, seen[1], True)
+
+    def _settled(self) -> List[str]:
+        now = time.monotonic()
+        ready = []
+        for path, (version, since, closed) in list(self._pending.items()):
+            current = _version(path)
+            if current is None:
+                del self._pending[path]
+            elif current != version:
+                self._pending[path] = (current, now, False)
+            elif closed or now - since >= self.settle:
+                del self._pending[path]
+                self._reported[path] = version
+                ready.append(path)
+        return sorted(ready)
+
+def _version(path: str) -> Optional[Tuple[int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
@@ -0,0 +1,918 @@
+import unittest
+from unittest.mock import patch
+import argparse
+import contextlib
+import datetime
+import gzip
+import io
+import json
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import warnings
+
+# Add this directory to path to import the validator package
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import synthetic
+from validator import cache as result_cache
+from validator import daemon, registry, watcher
+from validator import main as validator_main
+from validator.duplicate_index import HashedKeyIndex
+from validator.errors import ValidationError, as_error
+from validator.file_validator import FileValidator
+from validator.main import validate_file
+from validator.planner import ValidationPlan
+from validator.prescan import scan_csv
+from validator.report import file_record, write_report
+from validator.sketches import BloomFilter, HyperLogLog
+from validator.validators import DuplicateProfileValidator
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+class ValidatorTestCase(unittest.TestCase):
+    """Writes data files to a temporary directory."""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir, ignore_errors=True)
+
+    def write_file(self, name, text, mode='w'):
+        path = os.path.join(self.data_dir, name)
+        with open(path, mode) as f:
+            f.write(text)
+        return path
+
+    def messages(self, config, path, state_dir=None):
+        return [str(error) for error in FileValidator(config, state_dir).validate_file(path)]
+
+class TestValidationError(ValidatorTestCase):
+    def test_message_formatted_on_demand(self):
+        error = ValidationError('LengthValidator', 'too long', ['code'], 3, [1, 4], {'max_length': 2},
+                                "{validator}: Column '{column}' exceeds max length of {max_length} at indices {sample}...")
+        self.assertEqual(str(error), "LengthValidator: Column 'code' exceeds max length of 2 at indices [1, 4]...")
+        # Structured fields survive a JSON round trip, and the message with them
+        restored = ValidationError.from_dict(json.loads(json.dumps(error.to_dict())))
+        self.assertEqual(restored, error)
+        self.assertEqual(str(restored), str(error))
+        # Nothing is formatted until the message is asked for
+        unformattable = error._replace(template="{no_such_param}")
+        self.assertEqual(unformattable.to_dict()['count'], 3)
+        with self.assertRaises(KeyError):
+            str(unformattable)
+
+    def test_plain_messages(self):
+        error = as_error('Custom', 'something is off')
+        self.assertEqual((error.validator, error.check, str(error)), ('Custom', 'message', 'something is off'))
+        self.assertIs(as_error('Custom', error), error)
+
+    def test_sample_cap(self):
+        path = self.write_file('bad.csv', 'id,qty\n' + ''.join(f'{i},x\n' for i in range(1000)))
+        for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 7}):
+            for sample_size, sample in ((None, [0, 1, 2, 3, 4]), (2, [0, 1]), (0, [])):
+                rule = {'type': 'datatype', 'columns': {'qty': 'int'}}
+                if sample_size is not None:
+                    rule['sample_size'] = sample_size
+                [error] = FileValidator(dict(options, validators=[rule])).validate_file(path)
+                self.assertEqual((error.count, error.sample), (1000, sample), (options, sample_size))
+
+class TestRegistry(ValidatorTestCase):
+    def setUp(self):
+        super().setUp()
+        # A plugin module no test has imported yet
+        self.write_file('plugin_checks.py', "from validator.validators import LengthValidator\n\n"
+                                            "class ShortCodeValidator(LengthValidator):\n    pass\n")
+        sys.path.insert(0, self.data_dir)
+        self.addCleanup(sys.path.remove, self.data_dir)
+        self.addCleanup(sys.modules.pop, 'plugin_checks', None)
+        patcher = patch.dict(registry._registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_lazy_import(self):
+        registry.register('short_code', 'plugin_checks:ShortCodeValidator')
+        self.assertIn('short_code', registry.names())
+        self.assertNotIn('plugin_checks', sys.modules)
+        self.assertEqual(registry.get('short_code').__name__, 'ShortCodeValidator')
+        self.assertIn('plugin_checks', sys.modules)
+
+    def test_entry_point(self):
+        from importlib.metadata import EntryPoint
+        plugin = EntryPoint('short_code', 'plugin_checks:ShortCodeValidator', registry.ENTRY_POINT_GROUP)
+        other = EntryPoint('short_code', 'no_such_module:Nothing', 'another.group')
+
+        class EntryPoints(list):
+            def select(self, group):
+                return [ep for ep in self if ep.group == group]
+
+        with patch('importlib.metadata.entry_points', return_value=EntryPoints([other, plugin])):
+            self.assertNotIn('short_code', registry.names())
+            path = self.write_file('codes.csv', 'code\nAB\nABCD\n')
+            config = {'validators': [{'type': 'short_code', 'columns': {'code': 3}}]}
+            self.assertEqual([e.validator for e in FileValidator(config).validate_file(path)], ['ShortCodeValidator'])
+            with self.assertRaises(KeyError):
+                registry.get('no_such_type')
+
+class TestValidationPlan(unittest.TestCase):
+    """The fused plan reports what each validator run on its own does."""
+
+    CONFIG = {'validators': [
+        {'type': 'datatype', 'columns': {'qty': 'int', 'price': 'float'}},
+        {'type': 'length', 'columns': {'code': 3, 'qty': 2}},
+        {'type': 'range', 'columns': {'qty': {'min': 0, 'max': 50}, 'price': {'max': 10}}},
+        {'type': 'regex', 'columns': {'code': '[A-Z]+'}},
+        {'type': 'allowed_values', 'columns': {'status': ['open', 'closed']}},
+        {'type': 'null_ratio', 'columns': {'status': 0.1}},
+        {'type': 'duplicate', 'columns': ['code']},
+        {'type': 'datatype', 'columns': {'missing': 'int'}},
+    ]}
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'qty': [1, 2.5, 'x', 70, None, 4, 100, 3],
+            'price': [1.5, 2, 'abc', 12, 3, None, 4, 5],
+            'code': ['AB', 'ABCD', 'ab1', 'AB', None, 'CD', 'EF', 'CD'],
+            'status': ['open', 'closed', 'done', None, 'open', None, 'open', 'closed'],
+        })
+        self.validators = FileValidator(self.CONFIG).validators
+
+    def test_memory(self):
+        per_validator = [str(e) for v in self.validators for e in v.validate(self.df)]
+        plan = ValidationPlan(self.validators, streaming=False)
+        plan.consume(self.df)
+        if plan.second_pass_columns():
+            plan.consume_second_pass(self.df)
+        self.assertEqual([str(e) for e in plan.finish()], per_validator)
+        self.assertEqual(len(per_validator), 15)
+
+    def test_stream(self):
+        plan = ValidationPlan(self.validators, streaming=True)
+        plan.consume(self.df)
+        plan.consume_second_pass(self.df[plan.second_pass_columns()])
+        whole = [str(e) for e in plan.finish()]
+
+        plan = ValidationPlan(self.validators, streaming=True)
+        for start in range(0, len(self.df), 3):
+            plan.consume(self.df.iloc[start:start + 3])
+        columns = plan.second_pass_columns()
+        for start in range(0, len(self.df), 3):
+            plan.consume_second_pass(self.df.iloc[start:start + 3][columns])
+        self.assertEqual([str(e) for e in plan.finish()], whole)
+
+    def test_save_state(self):
+        # A plan resumed from saved state, as an append-aware run does, ends where one unbroken run would
+        plan = ValidationPlan(self.validators, streaming=True)
+        plan.consume(self.df)
+        plan.consume_second_pass(self.df[plan.second_pass_columns()])
+        whole = [str(e) for e in plan.finish()]
+
+        # The first run saw rows 0-4, second pass included
+        head = self.df.iloc[:5]
+        plan = ValidationPlan(FileValidator(self.CONFIG).validators, streaming=True)
+        plan.consume(head)
+        plan.consume_second_pass(head[plan.second_pass_columns()])
+        states = pickle.loads(pickle.dumps(plan.save_state()))
+
+        # The resumed one parses only the new rows, then second-passes the whole file
+        resumed = ValidationPlan(FileValidator(self.CONFIG).validators, streaming=True)
+        resumed.load_state(states)
+        resumed.consume(self.df.iloc[5:])
+        resumed.consume_second_pass(self.df[resumed.second_pass_columns()])
+        self.assertEqual([str(e) for e in resumed.finish()], whole)
+
+    def test_shared_conversions(self):
+        plan = ValidationPlan(self.validators, streaming=False)
+        with patch.object(pd, 'to_numeric', wraps=pd.to_numeric) as to_numeric:
+            plan.consume(self.df)
+        # qty and price are each parsed once for their datatype and range rules
+        parsed = [call.args[0].name for call in to_numeric.call_args_list]
+        self.assertEqual(sorted(col for col in parsed if col in ('qty', 'price')), ['price', 'qty'])
+
+@unittest.skipUnless(HAS_PYARROW, "needs pyarrow")
+class TestBackendParity(ValidatorTestCase):
+    """The pandas and pyarrow backends report the same errors for the same file."""
+
+    CSV = 'id,qty,price,code\n1,7,1.5,AB\n2,13.5,2,ABC\n3,8,,AB\n4,,x,\n5,9,3,ABCD\n6,1e3,4.25,AB\n'
+
+    VALIDATORS = [
+        {'type': 'datatype', 'columns': {'id': 'int', 'qty': 'int', 'price': 'float'}},
+        {'type': 'length', 'columns': {'code': 3}},
+        {'type': 'range', 'columns': {'price': {'min': 0, 'max': 4}}},
+        {'type': 'null_ratio', 'columns': {'qty': 0.5, 'code': 0.0}},
+    ]
+
+    def assert_parity(self, **options):
+        path = self.write_file('parity.csv', self.CSV)
+        results = {}
+        for backend in ('pandas', 'pyarrow'):
+            config = dict(options, backend=backend, validators=self.VALIDATORS)
+            results[backend] = self.messages(config, path)
+        self.assertEqual(results['pandas'], results['pyarrow'])
+        return results['pandas']
+
+    def test_memory(self):
+        errors = self.assert_parity(mode='memory')
+        # 13.5 is not an integer, whichever backend parsed it; the blank in row 3 is only missing
+        self.assertIn("DataTypeValidator: Column 'qty' contains non-integer float values at indices [1]...", errors)
+
+    def test_stream(self):
+        self.assertEqual(self.assert_parity(mode='stream', chunksize=2), self.assert_parity(mode='memory'))
+
+    def test_blank_is_not_fractional(self):
+        path = self.write_file('blank.csv', 'id,qty\n1,1\n2,x\n3,\n4,3\n')
+        config = {'validators': [{'type': 'datatype', 'columns': {'qty': 'int'}}]}
+        for backend in ('pandas', 'pyarrow'):
+            self.assertEqual(self.messages(dict(config, backend=backend), path),
+                             ["DataTypeValidator: Column 'qty' contains non-integer values at indices [1]..."])
+
+    def test_text_read_as_written(self):
+        # A length rule sees '007' and '1.50' as written, whatever else checks the column
+        path = self.write_file('text.csv', 'id,v\n1,123\n2,\n3,007\n4,1.50\n')
+        length = {'type': 'length', 'columns': {'v': 3}}
+        datatype = {'type': 'datatype', 'columns': {'v': 'float'}}
+        for validators in ([length], [length, datatype], [datatype, length]):
+            for backend in ('pandas', 'pyarrow'):
+                config = {'backend': backend, 'validators': validators}
+                self.assertEqual(self.messages(config, path),
+                                 ["LengthValidator: Column 'v' exceeds max length of 3 at indices [3]..."],
+                                 (backend, validators))
+
+    def test_chunk_boundaries(self):
+        # Whatever rows a chunk holds, every backend and mode agrees with a pandas memory run
+        rng = np.random.default_rng(1)
+        pool = ['1', '2', '30', '', '4.5', '7.0', 'x', '-3', '1e2']
+        validators = [{'type': 'datatype', 'columns': {'a': 'int', 'b': 'float'}},
+                      {'type': 'range', 'columns': {'a': {'min': 0, 'max': 10}}},
+                      {'type': 'length', 'columns': {'b': 2}}]
+        for k in range(15):
+            rows = rng.choice(pool, size=(int(rng.integers(1, 12)), 2))
+            path = self.write_file(f'fuzz{k}.csv', 'a,b\n' + ''.join(f'{a},{b}\n' for a, b in rows))
+            expected = self.messages({'validators': validators}, path)
+            for backend in ('pandas', 'pyarrow'):
+                for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 2},
+                                {'mode': 'stream', 'chunksize': 3},
+                                {'incremental': True, 'chunksize': 2}):
+                    state_dir = os.path.join(self.data_dir, f'state{k}{backend}')
+                    config = dict(options, backend=backend, validators=validators)
+                    self.assertEqual(self.messages(config, path, state_dir), expected, (k, backend, options))
+
+class TestTextRules(ValidatorTestCase):
+    """Regex, allowed_values and reference rules give the same verdicts whatever else checks the column."""
+
+    CSV = 'id,v\n1,7\n2,7.0\n3,007\n4,8\n5,x\n6,\n7,1.50\n'
+
+    def assert_verdict(self, rule, expected):
+        path = self.write_file('text.csv', self.CSV)
+        others = ([], [{'type': 'range', 'columns': {'v': {'min': 0, 'max': 10}}}],
+                  [{'type': 'datatype', 'columns': {'v': 'float'}}])
+        backends = ('pandas', 'pyarrow') if HAS_PYARROW else ('pandas',)
+        for validators in others:
+            for backend in backends:
+                for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 3}):
+                    config = dict(options, backend=backend, validators=[rule] + validators)
+                    errors = [e for e in self.messages(config, path) if e.startswith(expected.split(':')[0])]
+                    self.assertEqual(errors, [expected], (backend, validators, options))
+
+    def test_regex(self):
+        # Patterns see the values as written
+        self.assert_verdict({'type': 'regex', 'columns': {'v': '[0-9]+'}},
+                            "PatternValidator: Column 'v' has values not matching '[0-9]+' at indices [1, 4, 6]...")
+
+    def test_allowed_values(self):
+        # 7.0 and 007 are the number 7; so is 1.50 the allowed 1.5
+        self.assert_verdict({'type': 'allowed_values', 'columns': {'v': [7, '1.5']}},
+                            "AllowedValuesValidator: Column 'v' contains values outside the allowed set at indices [3, 4]...")
+
+    def test_reference(self):
+        self.write_file('ref.csv', 'code\n7\n1.5\n')
+        rule = {'type': 'reference', 'columns': {'v': {'file': os.path.join(self.data_dir, 'ref.csv'), 'column': 'code'}}}
+        errors = self.messages({'validators': [rule]}, self.write_file('text.csv', self.CSV))
+        self.assertEqual(len(errors), 1)
+        self.assert_verdict(rule, errors[0])
+        self.assertIn('at indices [3, 4]...', errors[0])
+
+class TestPrescan(ValidatorTestCase):
+    """The raw pre-scan finds the rows and value lengths pandas reads."""
+
+    FILES = {
+        'quoted_newlines': b'a,b\n1,"x\ny"\n2,"he said ""hi"""\n3,"a,b"\n',
+        'crlf': b'a,b\r\n1,xy\r\n2,\r\n3,"q\r\nr"\r\n',
+        'utf8': 'a,b\n1,h\u00e9llo\n2,\u65e5\u672c\n3,\U0001f600\n'.encode(),
+        'na_tokens': b'a,b\n1,NA\n2,null\n3,NULLS\n4,n/a\n5,"NA"\n6,-nan\n7,None\n8,\n',
+        'blank_lines': b'a,b\n1,x\n\n2,yy\n\n',
+        'no_final_newline': b'a,b\n1,x\n2,yyy',
+    }
+
+    def scan(self, path, block_size):
+        chunks = list(scan_csv(path, ['b'], block_size=block_size))
+        rows = np.concatenate([c.rows for c in chunks])
+        lengths = np.concatenate([c.lengths['b'] for c in chunks])
+        field_counts = np.concatenate([c.field_counts for c in chunks])
+        return rows, lengths, field_counts
+
+    def test_matches_read_csv(self):
+        for name, data in self.FILES.items():
+            path = self.write_file(name + '.csv', data, 'wb')
+            df = pd.read_csv(path, dtype=str)
+            expected = df['b'].str.len().fillna(-1).astype(int).tolist()
+            # Small blocks put block boundaries inside quoted fields and multi-byte characters
+            for block_size in (4, 7, 64):
+                rows, lengths, field_counts = self.scan(path, block_size)
+                self.assertEqual(rows.tolist(), list(range(len(df))), (name, block_size))
+                self.assertEqual(lengths.tolist(), expected, (name, block_size))
+                self.assertTrue((field_counts == 2).all(), (name, block_size))
+
+    def test_ragged_rows(self):
+        path = self.write_file('ragged.csv', 'a,b,c\n1,22\n3,4,5,6\n7\n8,9,10\n')
+        rows, lengths, field_counts = self.scan(path, 8)
+        self.assertEqual(field_counts.tolist(), [2, 4, 1, 3])
+        # As read with usecols: a short row's missing value is NaN, a long row's extra fields are dropped
+        df = pd.read_csv(path, dtype=str, usecols=['b'])
+        self.assertEqual(lengths.tolist(), df['b'].str.len().fillna(-1).astype(int).tolist())
+        self.assertEqual(lengths.tolist(), [2, 1, -1, 1])
+
+class TestReport(ValidatorTestCase):
+    def test_validator_stats(self):
+        path = self.write_file('stats.csv', 'id,qty\n' + ''.join(f'{i},{"x" if i >= 4 else i}\n' for i in range(10)))
+        config = {'mode': 'stream', 'chunksize': 2, 'validators': [
+            {'type': 'datatype', 'columns': {'qty': 'int'}, 'max_errors': 1},
+            {'type': 'length', 'columns': {'id': 1}},
+        ]}
+        errors, _, stats = validate_file(path, config)
+        report = os.path.join(self.data_dir, 'report.jsonl')
+        write_report(report, [file_record(path, 'failed', errors, stats)])
+        with open(report) as f:
+            record = json.loads(f.read())
+
+        self.assertEqual(record['rows'], 10)
+        datatype, length = record['validators']
+        self.assertEqual((datatype['index'], datatype['validator']), (0, 'DataTypeValidator'))
+        # The datatype rule is over budget after the chunk holding its second failure, rows 4-5
+        self.assertEqual(datatype['rows'], 6)
+        self.assertEqual(length['rows'], 10)
+        for entry in (datatype, length):
+            self.assertGreater(entry['seconds'], 0)
+            self.assertAlmostEqual(entry['rows_per_sec'], entry['rows'] / entry['seconds'])
+        self.assertEqual(length['errors'], 0)
+
+        if HAS_PYARROW:
+            parquet = os.path.join(self.data_dir, 'report.parquet')
+            write_report(parquet, [file_record(path, 'failed', errors, stats)])
+            self.assertEqual(pd.read_parquet(parquet)['validators'][0][0]['rows'], 6)
+
+class TestResultCache(ValidatorTestCase):
+    """A cached verdict is reused only while the file, its config and the validator code are unchanged."""
+
+    CONFIG = {'validators': [{'type': 'range', 'columns': {'qty': {'max': 9}}}]}
+
+    def setUp(self):
+        super().setUp()
+        self.path = self.write_file('orders.csv', 'id,qty\n1,5\n2,10\n')
+        self.cache = result_cache.ResultCache(os.path.join(self.data_dir, 'cache.sqlite'))
+        self.addCleanup(self.cache.close)
+        errors, file_print, _ = validate_file(self.path, self.CONFIG, with_fingerprint=True)
+        self.cache.put(self.path, self.CONFIG, file_print, errors)
+
+    def test_unchanged(self):
+        self.assertEqual([str(e) for e in self.cache.get(self.path, self.CONFIG)],
+                         [str(e) for e in validate_file(self.path, self.CONFIG)[0]])
+
+    def test_config(self):
+        self.assertIsNone(self.cache.get(self.path, {'validators': [{'type': 'range', 'columns': {'qty': {'max': 10}}}]}))
+
+    def test_code(self):
+        with patch.object(result_cache, '_code_hash', return_value='changed'):
+            cache = result_cache.ResultCache(self.cache.db_path)
+        self.addCleanup(cache.close)
+        self.assertIsNone(cache.get(self.path, self.CONFIG))
+
+    def test_content(self):
+        # Same size, new contents and mtime
+        self.write_file('orders.csv', 'id,qty\n1,5\n2,01\n')
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 10 ** 9))
+        self.assertIsNone(self.cache.get(self.path, self.CONFIG))
+
+    def test_touched(self):
+        # Only the mtime moved, so the contents are rehashed and the verdict kept
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 10 ** 9))
+        self.assertEqual(len(self.cache.get(self.path, self.CONFIG)), 1)
+        with patch.object(result_cache, '_content_hash') as content_hash:
+            self.assertEqual(len(self.cache.get(self.path, self.CONFIG)), 1)
+        content_hash.assert_not_called()
+
+class TestReferenceCache(ValidatorTestCase):
+    def test_changed_reference_file(self):
+        # A cached verdict is only as fresh as the reference file it was checked against
+        path = self.write_file('orders.csv', 'id,country\n1,FR\n2,DE\n')
+        ref = self.write_file('countries.csv', 'code\nFR\n')
+        config = {'validators': [{'type': 'reference', 'columns': {'country': {'file': ref, 'column': 'code'}}}]}
+        cache = result_cache.ResultCache(os.path.join(self.data_dir, 'cache.sqlite'))
+        self.addCleanup(cache.close)
+        errors, file_print, _ = validate_file(path, config, with_fingerprint=True)
+        self.assertEqual(len(errors), 1)
+        cache.put(path, config, file_print, errors)
+        self.assertEqual(len(cache.get(path, config)), 1)
+
+        self.write_file('countries.csv', 'code\nFR\nDE\n')
+        self.assertIsNone(cache.get(path, config))
+        self.assertEqual(validate_file(path, config)[0], [])
+
+class TestHashedKeyIndex(ValidatorTestCase):
+    def test_spill_partitions(self):
+        rng = np.random.default_rng(2)
+        batches = [rng.integers(0, 5000, size=1000).astype(np.uint64) for _ in range(6)]
+        values, counts = np.unique(np.concatenate(batches), return_counts=True)
+
+        memory = HashedKeyIndex()
+        spilled = HashedKeyIndex(os.path.join(self.data_dir, 'spill'), partitions=4)
+        for batch in batches:
+            memory.add(batch)
+            spilled.add(batch)
+        spill_path = spilled._spill_path
+        # Each hash goes to the partition of its value modulo the partition count
+        self.assertEqual(sorted(os.listdir(spill_path)), [f'part_{p:04d}.bin' for p in range(4)])
+        for part in range(4):
+            self.assertTrue((np.fromfile(os.path.join(spill_path, f'part_{part:04d}.bin'), dtype=np.uint64) % 4 == part).all())
+
+        self.assertEqual(memory.duplicates().tolist(), values[counts > 1].tolist())
+        self.assertEqual(spilled.duplicates().tolist(), values[counts > 1].tolist())
+        with self.assertRaises(NotImplementedError):
+            spilled.snapshot()
+        spilled.close()
+        self.assertFalse(os.path.exists(spill_path))
+
+    def test_spilled_validator(self):
+        path = self.write_file('keys.csv', 'id,k\n' + ''.join(f'{i},{i % 7}\n' for i in range(20)))
+        spill = {'type': 'duplicate', 'columns': ['k'], 'spill_dir': os.path.join(self.data_dir, 'spill'),
+                 'partitions': 3}
+        expected = self.messages({'validators': [{'type': 'duplicate', 'columns': ['k']}]}, path)
+        self.assertEqual(len(expected), 7)
+        self.assertEqual(self.messages({'mode': 'stream', 'chunksize': 4, 'validators': [spill]}, path), expected)
+        self.assertEqual(os.listdir(os.path.join(self.data_dir, 'spill')), [])
+
+class TestDuplicateKeys(ValidatorTestCase):
+    """Duplicate keys read the same whatever dtype a chunk inferred for the key column."""
+
+    def test_mixed_dtypes(self):
+        # The first chunks infer ints, the last text; 7.0 and 007 are the key 7
+        path = self.write_file('keys.csv', 'id,n\n1,a\n7,b\n1,c\n7.0,d\nx,e\n007,f\nx,g\n')
+        expected = ["Duplicate rows found for key {'id': 1}: 2 occurrences",
+                    "Duplicate rows found for key {'id': 7}: 3 occurrences",
+                    "Duplicate rows found for key {'id': 'x'}: 2 occurrences"]
+        duplicate = {'type': 'duplicate', 'columns': ['id']}
+        # A length rule has the key column read as text
+        length = {'type': 'length', 'columns': {'id': 3}}
+        backends = ('pandas', 'pyarrow') if HAS_PYARROW else ('pandas',)
+        for validators in ([duplicate], [duplicate, length]):
+            for backend in backends:
+                for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 2},
+                                {'incremental': True, 'chunksize': 3}):
+                    state_dir = os.path.join(self.data_dir, f'state{len(validators)}{backend}')
+                    config = dict(options, backend=backend, validators=validators)
+                    self.assertEqual(self.messages(config, path, state_dir), expected, (validators, backend, options))
+
+class TestCompressedInput(ValidatorTestCase):
+    """Compressed CSV and Parquet files are validated as their plain CSV would be."""
+
+    CSV = 'id,qty,code\n1,7,AB\n2,x,ABCD\n3,,AB\n1,9.5,CD\n'
+    CONFIG = {'validators': [
+        {'type': 'datatype', 'columns': {'qty': 'int'}},
+        {'type': 'length', 'columns': {'code': 3}},
+        {'type': 'duplicate', 'columns': ['id']},
+    ]}
+
+    def variants(self):
+        paths = {'csv': self.write_file('data.csv', self.CSV)}
+        paths['gzip'] = self.write_file('data.csv.gz', gzip.compress(self.CSV.encode()), 'wb')
+        if HAS_PYARROW:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            paths['zstd'] = os.path.join(self.data_dir, 'data.csv.zst')
+            with pa.CompressedOutputStream(paths['zstd'], 'zstd') as out:
+                out.write(self.CSV.encode())
+            # As text, as a CSV reader would see the values
+            paths['parquet'] = os.path.join(self.data_dir, 'data.parquet')
+            pq.write_table(pa.Table.from_pandas(pd.read_csv(paths['csv'], dtype=str)), paths['parquet'])
+        return paths
+
+    def test_formats(self):
+        paths = self.variants()
+        expected = self.messages(self.CONFIG, paths['csv'])
+        self.assertEqual(len(expected), 4)
+        backends = ('pandas', 'pyarrow') if HAS_PYARROW else ('pandas',)
+        for name, path in paths.items():
+            for backend in backends:
+                for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 2}):
+                    config = dict(self.CONFIG, backend=backend, **options)
+                    self.assertEqual(self.messages(config, path), expected, (name, backend, options))
+
+    def test_compressed_files_are_not_resumed(self):
+        # Appending to a compressed stream can't be read from an offset, so it is revalidated in full
+        paths = self.variants()
+        config = dict(self.CONFIG, incremental=True)
+        state_dir = os.path.join(self.data_dir, 'state')
+        self.assertFalse(FileValidator(config, state_dir).resumes(paths['gzip']))
+        with contextlib.redirect_stdout(io.StringIO()) as output:
+            errors = self.messages(config, paths['gzip'], state_dir)
+        self.assertIn('validating', output.getvalue())
+        self.assertEqual(errors, self.messages(self.CONFIG, paths['csv']))
+
+class TestIncremental(ValidatorTestCase):
+    """Append-only feeds: each run parses only the rows appended since the last one."""
+
+    CONFIG = {
+        'incremental': True,
+        'chunksize': 2,
+        'validators': [
+            {'type': 'datatype', 'columns': {'qty': 'int'}},
+            {'type': 'duplicate', 'columns': ['id']},
+        ],
+    }
+
+    def setUp(self):
+        super().setUp()
+        self.state_dir = os.path.join(self.data_dir, 'state')
+        self.path = self.write_file('feed.csv', 'id,qty\n1,7\n2,8\n3,x\n')
+
+    def test_append(self):
+        self.assertEqual(len(self.messages(self.CONFIG, self.path, self.state_dir)), 1)
+        # Row 3 only reaches the file once its line is complete
+        self.write_file('feed.csv', '4,9\n1,10\n5,1', mode='a')
+        validator = FileValidator(self.CONFIG, self.state_dir)
+        errors = [str(error) for error in validator.validate_file(self.path)]
+        self.assertEqual(validator.stats.rows, 2)
+        # Same verdict as validating the whole file at once, including a key
+        # first seen before the append
+        full = dict(self.CONFIG, incremental=False, mode='stream')
+        self.write_file('complete.csv', 'id,qty\n1,7\n2,8\n3,x\n4,9\n1,10\n')
+        self.assertEqual(errors, self.messages(full, os.path.join(self.data_dir, 'complete.csv')))
+
+    def test_rewrite(self):
+        self.messages(self.CONFIG, self.path, self.state_dir)
+        self.write_file('feed.csv', 'id,qty\n1,7\n2,8\n3,9\n4,10\n')
+        validator = FileValidator(self.CONFIG, self.state_dir)
+        self.assertEqual(validator.validate_file(self.path), [])
+        self.assertEqual(validator.stats.rows, 4)
+
+    def test_fingerprint_reads_edges_only(self):
+        db = result_cache.ResultCache(os.path.join(self.data_dir, 'cache.sqlite'))
+        self.addCleanup(db.close)
+        with patch.object(result_cache, '_content_hash', side_effect=AssertionError("hashed the whole file")):
+            errors, file_print, _ = validate_file(self.path, self.CONFIG, True, self.state_dir)
+            db.put(self.path, self.CONFIG, file_print, errors)
+            # Re-copied unchanged: the edges are rehashed, and the verdict reused
+            os.utime(self.path, ns=(file_print.mtime_ns + 10**9, file_print.mtime_ns + 10**9))
+            self.assertEqual(db.get(self.path, self.CONFIG), errors)
+            self.write_file('feed.csv', '4,9\n', mode='a')
+            self.assertIsNone(db.get(self.path, self.CONFIG))
+
+        # Without incremental state the whole file is hashed, as before
+        _, file_print, _ = validate_file(self.path, self.CONFIG, True, None)
+        self.assertFalse(file_print.content_hash.startswith(result_cache.EDGES))
+
+class TestNullRatio(ValidatorTestCase):
+    """Missing values fail only as a share of the whole file."""
+
+    # Most of the missing notes are in the first rows
+    CSV = 'id,qty,note\n1,x,\n2,y,\n3,z,\n4,1,a\n5,2,b\n6,3,c\n7,4,d\n8,5,e\n'
+
+    def config(self, **options):
+        return dict(options, validators=[
+            {'type': 'datatype', 'columns': {'qty': 'int'}},
+            {'type': 'null_ratio', 'columns': {'note': 0.4}},
+        ])
+
+    def test_allowed_nulls_are_not_budgeted(self):
+        path = self.write_file('nulls.csv', 'id,note\n1,\n2,\n3,a\n4,b\n5,c\n')
+        config = {'mode': 'stream', 'chunksize': 2, 'max_errors': 1,
+                  'validators': [{'type': 'null_ratio', 'columns': {'note': 0.4}, 'max_errors': 1}]}
+        self.assertEqual(self.messages(config, path), [])
+
+    def test_no_ratio_once_stopped(self):
+        path = self.write_file('nulls.csv', self.CSV)
+        errors = self.messages(self.config(mode='stream', chunksize=2, max_errors=1), path)
+        self.assertFalse(any(e.startswith('NullRatioValidator') for e in errors), errors)
+        self.assertTrue(errors[-1].startswith("Validation stopped after 2 rows"), errors)
+
+    def test_ratio_over_whole_file(self):
+        path = self.write_file('nulls.csv', self.CSV)
+        self.assertEqual(self.messages(self.config(mode='stream', chunksize=2), path)[1:], [])
+        self.write_file('nulls.csv', '9,6,\n', mode='a')
+        ratio = ("NullRatioValidator: Column 'note' is 44.44% empty, above the maximum of 40.00%, e.g. at indices "
+                 "[0, 1, 2, 8]...")
+        self.assertEqual(self.messages(self.config(mode='stream', chunksize=2), path)[1:], [ratio])
+        # In memory the budget runs out only once every row has been read
+        self.assertEqual(self.messages(self.config(max_errors=1), path)[1:-1], [ratio])
+
+class TestDateRange(ValidatorTestCase):
+    """Dates parse the same way in every chunk."""
+
+    def test_iso_dates(self):
+        path = self.write_file('dates.csv', 'd\n2024-01-05\n2024-02-30\n2023-12-31\n2024-03-01T10:00:00\n')
+        validators = [{'type': 'range', 'columns': {'d': {'min': datetime.date(2024, 1, 1), 'max': '2024-12-31'}}}]
+        expected = [
+            "RangeValidator: Column 'd' contains values that are not dates at indices [1]...",
+            "RangeValidator: Column 'd' has values outside [2024-01-01, 2024-12-31] at indices [2]...",
+        ]
+        with warnings.catch_warnings():
+            # pandas warns when it has to guess a format
+            warnings.simplefilter('error')
+            for options in ({'mode': 'memory'}, {'mode': 'stream', 'chunksize': 2}, {'mode': 'stream', 'chunksize': 1}):
+                self.assertEqual(self.messages(dict(options, validators=validators), path), expected)
+
+    def test_format(self):
+        path = self.write_file('dates.csv', 'd\n05/01/2024\n13/13/2024\n31/12/2023\n')
+        validators = [{'type': 'range', 'columns': {'d': {'type': 'date', 'format': '%d/%m/%Y', 'min': '2024-01-01'}}}]
+        self.assertEqual(self.messages({'mode': 'stream', 'chunksize': 1, 'validators': validators}, path), [
+            "RangeValidator: Column 'd' contains values that are not dates at indices [1]...",
+            "RangeValidator: Column 'd' has values outside [2024-01-01, ] at indices [2]...",
+        ])
+
+    def test_cached_verdict(self):
+        path = self.write_file('dates.csv', 'd\n2023-12-31\n2024-06-01\n')
+        # As loaded from YAML, where an unquoted date is a datetime.date
+        config = {'validators': [{'type': 'range', 'columns': {'d': {'min': datetime.date(2024, 1, 1)}}}]}
+        errors, file_print, _ = validate_file(path, config, True)
+        self.assertEqual([str(e) for e in errors],
+                         ["RangeValidator: Column 'd' has values outside [2024-01-01, ] at indices [0]..."])
+
+        db = result_cache.ResultCache(os.path.join(self.data_dir, 'cache.sqlite'))
+        self.addCleanup(db.close)
+        db.put(path, config, file_print, errors)
+        self.assertEqual([str(e) for e in db.get(path, config)], [str(e) for e in errors])
+
+class TestSketches(unittest.TestCase):
+
+    def setUp(self):
+        self.hashes = np.random.default_rng(0).integers(0, 2**64, size=100_000, dtype=np.uint64)
+
+    def test_hyperloglog(self):
+        sketch = HyperLogLog(12)
+        sketch.add(self.hashes)
+        sketch.add(self.hashes[:1000])
+        # Three standard errors of 1.04 / sqrt(2 ** 12)
+        self.assertAlmostEqual(sketch.count() / 100_000, 1, delta=0.05)
+
+        halves = HyperLogLog(12), HyperLogLog(12)
+        halves[0].add(self.hashes[:60_000])
+        halves[1].add(self.hashes[40_000:])
+        halves[0].merge(halves[1])
+        np.testing.assert_array_equal(halves[0].registers, sketch.registers)
+        with self.assertRaises(ValueError):
+            sketch.merge(HyperLogLog(10))
+
+    def test_bloom_filter(self):
+        bloom = BloomFilter(100_000, 0.01)
+        seen = bloom.add(self.hashes)
+        # Each hash is new, so anything seen is a false positive
+        self.assertLess(seen.mean(), 0.01)
+        self.assertTrue(bloom.add(self.hashes[:1000]).all())
+        self.assertTrue(bloom.add(np.array([7, 7], dtype=np.uint64))[1])
+        self.assertAlmostEqual(bloom.false_positive_rate(), 0.01, delta=0.002)
+        self.assertAlmostEqual(bloom.count() / 100_000, 1, delta=0.02)
+
+class TestDuplicateProfile(unittest.TestCase):
+
+    def profile(self, df, **options):
+        validator = DuplicateProfileValidator(['key'], expected_keys=10_000, **options)
+        for start in range(0, len(df), 1000):
+            validator.consume(df.iloc[start:start + 1000])
+        return validator
+
+    def frame(self, keys):
+        return pd.DataFrame({'key': keys})
+
+    def test_unique(self):
+        self.assertEqual(self.profile(self.frame(np.arange(5000))).finish(), [])
+
+    def test_duplicates(self):
+        keys = np.concatenate([np.arange(5000), np.arange(100), [None] * 10])
+        errors = self.profile(self.frame(keys)).finish()
+        self.assertEqual(len(errors), 1)
+        self.assertAlmostEqual(errors[0].count, 100, delta=15)
+        self.assertEqual(errors[0].sample[0], 5000)
+        self.assertEqual(self.profile(self.frame(keys), max_duplicate_rate=0.05).finish(), [])
+
+    def test_merge(self):
+        # Every key of the second part also appears in the first: neither profile sees a duplicate
+        first = self.profile(self.frame(np.arange(5000)))
+        second = self.profile(self.frame(np.arange(4500, 5000)).set_axis(range(5000, 5500)))
+        self.assertEqual(second.finish(), [])
+        first.merge(second)
+        errors = first.finish()
+        self.assertEqual(len(errors), 1)
+        self.assertAlmostEqual(errors[0].count, 500, delta=75)
+
+    def test_lazy_filter(self):
+        validator = DuplicateProfileValidator(['key'])
+        # Nothing is allocated, or saved, until keyed rows arrive
+        validator.consume(self.frame([None, None]))
+        self.assertIsNone(validator.save_state()['seen'])
+        self.assertLess(len(pickle.dumps(validator.save_state())), 64 * 1024)
+        validator.consume(self.frame([1, 2]))
+        self.assertLess(validator.save_state()['seen'].bits.nbytes, 2 * 1024 * 1024)
+
+        # Merging with a profile that never saw a key leaves it as it was
+        first = self.profile(self.frame(np.concatenate([np.arange(1000), np.arange(50)])))
+        count = first.finish()[0].count
+        first = self.profile(self.frame(np.concatenate([np.arange(1000), np.arange(50)])))
+        empty = DuplicateProfileValidator(['key'], expected_keys=10_000)
+        first.merge(empty)
+        self.assertEqual(first.finish()[0].count, count)
+        empty.merge(self.profile(self.frame(np.concatenate([np.arange(1000), np.arange(50)]))))
+        self.assertEqual(empty.finish()[0].count, count)
+
+    def test_missing_column(self):
+        validator = DuplicateProfileValidator(['key', 'other'])
+        self.assertEqual([str(e) for e in validator.validate(self.frame([1, 1]))],
+                         ["DuplicateProfileValidator: Missing columns for validation: ['other']"])
+
+class TestDirectoryWatcher(ValidatorTestCase):
+    """Files are reported once fully written, with inotify and by polling."""
+
+    SETTLE = 0.2
+
+    def watch(self, inotify):
+        if inotify:
+            directory_watcher = watcher.DirectoryWatcher(self.data_dir, ('*.csv',), settle=self.SETTLE)
+            if not directory_watcher.uses_inotify:
+                directory_watcher.close()
+                self.skipTest("inotify is not available")
+        else:
+            with patch.object(watcher, '_Inotify', side_effect=OSError("no inotify")):
+                directory_watcher = watcher.DirectoryWatcher(self.data_dir, ('*.csv',), settle=self.SETTLE)
+            self.assertFalse(directory_watcher.uses_inotify)
+        self.addCleanup(directory_watcher.close)
+        return directory_watcher
+
+    def poll(self, directory_watcher, seconds):
+        """Every path reported within seconds."""
+        reported = []
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            reported += directory_watcher.poll(0.05)
+        return reported
+
+    def check_watcher(self, inotify):
+        existing = self.write_file('existing.csv', 'id\n1\n')
+        self.write_file('notes.txt', 'not data')
+        directory_watcher = self.watch(inotify)
+        self.assertEqual(self.poll(directory_watcher, 3 * self.SETTLE), [existing])
+
+        # Still being written: nothing until it holds still, then reported once
+        path = os.path.join(self.data_dir, 'landing.csv')
+        with open(path, 'w') as f:
+            for i in range(5):
+                f.write(f'{i}\n')
+                f.flush()
+                self.assertEqual(self.poll(directory_watcher, self.SETTLE / 2), [])
+        self.assertEqual(self.poll(directory_watcher, 3 * self.SETTLE), [path])
+
+        # Moved into place whole
+        staged = os.path.join(self.data_dir, 'staged.tmp')
+        with open(staged, 'w') as f:
+            f.write('id\n1\n')
+        os.replace(staged, os.path.join(self.data_dir, 'moved.csv'))
+        self.assertEqual(self.poll(directory_watcher, 3 * self.SETTLE), [os.path.join(self.data_dir, 'moved.csv')])
+
+        directory_watcher.rescan([existing])
+        self.assertEqual(self.poll(directory_watcher, 3 * self.SETTLE), [existing])
+
+    def test_inotify(self):
+        self.check_watcher(inotify=True)
+
+    def test_polling(self):
+        self.check_watcher(inotify=False)
+
+class TestMain(ValidatorTestCase):
+    """The batch run over a data directory, with etl/ relocated to a temporary one."""
+
+    CONFIG = ("'orders_*.csv':\n  validators:\n    - type: range\n      columns:\n        qty: {max: 9}\n"
+              "    - type: duplicate\n      columns: [id]\n")
+
+    def setUp(self):
+        super().setUp()
+        self.write_file('validation_config.yaml', self.CONFIG)
+        os.makedirs(os.path.join(self.data_dir, 'data'))
+        for k in range(5):
+            rows = ''.join(f'{i % (k + 3)},{i}\n' for i in range(10 * (k + 1)))
+            self.write_file(os.path.join('data', f'orders_{k}.csv'), 'id,qty\n' + rows)
+        self.write_file(os.path.join('data', 'other.csv'), 'a\n1\n')
+
+    def run_main(self, *argv):
+        report = os.path.join(self.data_dir, 'report.jsonl')
+        module_file = os.path.join(self.data_dir, 'validator', 'main.py')
+        argv = ['main.py', '--report', report, '--cache', os.path.join(self.data_dir, 'cache.sqlite')] + list(argv)
+        with patch.object(validator_main, '__file__', module_file), patch.object(sys, 'argv', argv), \
+                contextlib.redirect_stdout(io.StringIO()):
+            validator_main.main()
+        with open(report) as f:
+            return [json.loads(line) for line in f]
+
+    def test_workers(self):
+        # A process pool reports the same verdicts, in file name order, as a serial run
+        serial = self.run_main('--no-cache')
+        from concurrent.futures import ProcessPoolExecutor
+        with patch('concurrent.futures.ProcessPoolExecutor', wraps=ProcessPoolExecutor) as pool:
+            parallel = self.run_main('--no-cache', '--workers', '3')
+        pool.assert_called_once_with(max_workers=3)
+        self.assertEqual([r['file'] for r in parallel], ['orders_0.csv', 'orders_1.csv', 'orders_2.csv', 'orders_3.csv',
+                                                          'orders_4.csv', 'other.csv'])
+        for expected, record in zip(serial, parallel):
+            self.assertEqual((record['file'], record['status'], record['errors']),
+                             (expected['file'], expected['status'], expected['errors']))
+            if record['status'] != 'skipped':
+                self.assertEqual(record['rows'], expected['rows'])
+        self.assertEqual([r['status'] for r in parallel], ['failed'] * 5 + ['skipped'])
+
+    def test_cached(self):
+        first = self.run_main()
+        self.write_file(os.path.join('data', 'orders_0.csv'), 'id,qty\n1,1\n')
+        second = self.run_main()
+        self.assertEqual([r['status'] for r in second], ['passed'] + ['cached'] * 4 + ['skipped'])
+        for expected, record in zip(first[1:5], second[1:5]):
+            self.assertEqual(record['errors'], expected['errors'])
+            self.assertIsNone(record['rows'])
+
+class TestSyntheticData(ValidatorTestCase):
+    """The benchmark generator writes survey-shaped files with the requested faults."""
+
+    def write(self, name, **options):
+        path = os.path.join(self.data_dir, name)
+        # Small write chunks, so keys and faults span several of them
+        with patch.object(synthetic, 'WRITE_CHUNK', 300):
+            synthetic.write_survey_csv(path, 1000, **options)
+        return path
+
+    def test_clean(self):
+        path = self.write('clean.csv', extra_columns=3)
+        df = pd.read_csv(path)
+        self.assertEqual(df.shape, (1000, synthetic.SURVEY_COLUMNS + 3))
+        self.assertEqual(FileValidator(synthetic.survey_config(3)).validate_file(path), [])
+
+    def test_faults(self):
+        path = self.write('faulty.csv', seed=3, duplicate_rate=0.05, error_rate=0.02)
+        # The same seed writes the same file
+        with open(path) as f, open(self.write('again.csv', seed=3, duplicate_rate=0.05, error_rate=0.02)) as g:
+            self.assertEqual(f.read(), g.read())
+        checks = {error.check for error in FileValidator(synthetic.survey_config()).validate_file(path)}
+        self.assertLessEqual({'duplicate key', 'non-integer', 'too long'}, checks)
+
+class TestDaemon(ValidatorTestCase):
+    """Watch mode validates each reported file, and again when its config section changes."""
+
+    def setUp(self):
+        super().setUp()
+        self.config_path = self.write_file('validation_config.yaml', self.config(9))
+        self.path = self.write_file('orders.csv', 'id,qty\n1,5\n2,10\n')
+
+    def config(self, max_qty):
+        return f"orders.csv:\n  validators:\n    - type: range\n      columns:\n        qty: {{max: {max_qty}}}\n"
+
+    def test_run(self):
+        def poll(timeout):
+            step = len(polls)
+            polls.append(step)
+            if step == 0:
+                return [self.path]
+            if step == 1:
+                # Only the config changes; the daemon asks for the file again
+                self.write_file('validation_config.yaml', self.config(10))
+                return []
+            if step == 2:
+                return fake.rescan.call_args[0][0]
+            raise KeyboardInterrupt
+
+        polls = []
+        args = argparse.Namespace(workers=1, report=None, report_format=None, no_cache=True, cache=None,
+                                  settle=0.1, poll_interval=0.1)
+        output = io.StringIO()
+        with patch.object(daemon, 'DirectoryWatcher') as watcher_class, patch('signal.signal'), \
+                contextlib.redirect_stdout(output):
+            fake = watcher_class.return_value
+            fake.uses_inotify = True
+            fake.poll.side_effect = poll
+            daemon.run(args, self.data_dir, self.data_dir, self.config_path,
+                       daemon.load_config(self.config_path))
+
+        fake.rescan.assert_called_once_with([self.path])
+        fake.close.assert_called_once_with()
+        lines = output.getvalue().splitlines()
+        self.assertIn("Validation FAILED for orders.csv:", lines)
+        self.assertLess(lines.index("Validation FAILED for orders.csv:"), lines.index("Validation PASSED for orders.csv"))
+        self.assertEqual(lines[-1], "Stopped watching.")
+
+if __name__ == '__main__':
+    unittest.main()